@@ -0,0 +1,175 @@
+"""
+Alert aggregation for access storms
+
+Copying a decoy folder fires one event per file. Events are grouped by
+(decoy_id, username, hostname): the first event of a group alerts at
+once, later ones within `window_seconds` are only counted, and when the
+window closes a single summary alert carries the counts. A group that
+keeps receiving events rolls into another window and produces one
+summary per window; a window that closes with nothing new ends the
+group, so the next event alerts immediately again. When more than
+`max_keys` groups are open, the least recently active one is closed
+early and its summary goes out with the next due() call.
+
+Outbound volume is therefore at most one alert per group per window.
+Open groups live in memory only; their events are stored as
+"aggregated", and rebuild() turns events whose window was lost (a crash)
+back into summaries.
+"""
+import threading
+import time
+from collections import Counter, OrderedDict
+from typing import Any, Dict, Hashable, List, Optional, Tuple
+
+MAX_SUMMARY_PATHS = 20
+
+
+def aggregation_key(event: Dict[str, Any]) -> Tuple[Optional[str], Optional[str], Optional[str]]:
+    return event.get("decoy_id"), event.get("username"), event.get("hostname")
+
+
+class _Group:
+    __slots__ = ("first_event", "window_ends", "count", "event_types", "paths",
+                 "first_seen", "last_seen", "last_event", "event_ids")
+
+    def __init__(self, event: Dict[str, Any], window_ends: float):
+        self.first_event = event
+        self.window_ends = window_ends
+        self._reset()
+
+    def _reset(self):
+        self.count = 0
+        self.first_seen = None
+        self.event_types: Counter = Counter()
+        self.paths: List[str] = []
+        self.last_seen = None
+        self.last_event: Optional[Dict[str, Any]] = None
+        self.event_ids: List[str] = []
+
+    def fold(self, event: Dict[str, Any]):
+        if self.count == 0:
+            self.first_seen = event.get("timestamp")
+        self.count += 1
+        self.event_types[event.get("event_type", "unknown")] += 1
+        path = event.get("accessed_path")
+        if path and len(self.paths) < MAX_SUMMARY_PATHS and path not in self.paths:
+            self.paths.append(path)
+        self.last_seen = event.get("timestamp")
+        self.last_event = event
+        if event.get("event_id"):
+            self.event_ids.append(event["event_id"])
+
+
+class AlertAggregator:
+    """Decides which events alert now and builds summaries for the rest"""
+
+    def __init__(self, window_seconds: float = 60.0, max_keys: int = 10000):
+        self.window_seconds = window_seconds
+        self.max_keys = max(1, int(max_keys))
+        self._groups: "OrderedDict[Hashable, _Group]" = OrderedDict()
+        self._evicted: List[Dict[str, Any]] = []
+        self._lock = threading.Lock()
+        self.immediate = 0
+        self.folded = 0
+        self.summaries = 0
+        self.evicted = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.window_seconds > 0
+
+    def admit(self, event: Dict[str, Any]) -> bool:
+        """True if the event should alert now, False if it was folded into its group"""
+        if not self.enabled:
+            self.immediate += 1
+            return True
+        key = aggregation_key(event)
+        now = time.monotonic()
+        with self._lock:
+            group = self._groups.get(key)
+            if group is not None and group.count == 0 and group.window_ends <= now:
+                # Quiet window already over: this is a new burst
+                del self._groups[key]
+                group = None
+            if group is None:
+                self._groups[key] = _Group(event, now + self.window_seconds)
+                if len(self._groups) > self.max_keys:
+                    # Close the least recently active group early rather than grow without bound
+                    _, evicted = self._groups.popitem(last=False)
+                    if evicted.count:
+                        self._evicted.append(self._summary(evicted))
+                    self.evicted += 1
+                self.immediate += 1
+                return True
+            group.fold(event)
+            self._groups.move_to_end(key)
+            self.folded += 1
+            return False
+
+    def due(self, flush_all: bool = False) -> List[Dict[str, Any]]:
+        """Summary events for groups whose window has closed"""
+        now = time.monotonic()
+        with self._lock:
+            summaries, self._evicted = self._evicted, []
+            for key, group in list(self._groups.items()):
+                if not flush_all and group.window_ends > now:
+                    continue
+                if group.count == 0 or flush_all:
+                    del self._groups[key]
+                else:
+                    group.window_ends = now + self.window_seconds
+                if group.count:
+                    summaries.append(self._summary(group))
+                    group._reset()
+            self.summaries += len(summaries)
+        return summaries
+
+    def rebuild(self, events: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """One summary per group for folded events whose window was lost, oldest first"""
+        groups: "OrderedDict[Hashable, _Group]" = OrderedDict()
+        for event in events:
+            key = aggregation_key(event)
+            if key not in groups:
+                groups[key] = _Group(event, 0.0)
+            groups[key].fold(event)
+        summaries = [self._summary(group) for group in groups.values()]
+        with self._lock:
+            self.summaries += len(summaries)
+        return summaries
+
+    def next_deadline(self) -> Optional[float]:
+        """Seconds until the earliest open window closes, or None with no groups"""
+        with self._lock:
+            if self._evicted:
+                return 0.0
+            if not self._groups:
+                return None
+            return max(0.0, min(group.window_ends for group in self._groups.values()) - time.monotonic())
+
+    def _summary(self, group: _Group) -> Dict[str, Any]:
+        """An alert event describing the folded events of one window"""
+        summary = dict(group.last_event)
+        summary.pop("trace", None)
+        # Stored events the summary covers, so their delivery status can be updated
+        summary["event_ids"] = list(group.event_ids)
+        summary["aggregate"] = {
+            "count": group.count,
+            "event_types": dict(group.event_types),
+            "paths": list(group.paths),
+            "first_seen": group.first_seen,
+            "last_seen": group.last_seen,
+            "window_seconds": self.window_seconds,
+        }
+        return summary
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            open_groups = len(self._groups)
+        return {
+            "window_seconds": self.window_seconds,
+            "open_groups": open_groups,
+            "immediate": self.immediate,
+            "folded": self.folded,
+            "summaries": self.summaries,
+            "evicted": self.evicted,
+        }
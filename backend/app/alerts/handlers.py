@@ -3,21 +3,11 @@ Alerting system for Slack and Email notifications
 """
 import asyncio
 import json
-from typing import Dict, Any, Optional
+from typing import Dict, Any, List, Optional
 from datetime import datetime
 from abc import ABC, abstractmethod
 
-try:
-    import aiohttp
-except ImportError:
-    aiohttp = None
-
-try:
-    import smtplib
-    from email.mime.text import MIMEText
-    from email.mime.multipart import MIMEMultipart
-except ImportError:
-    smtplib = None
+# aiohttp, smtplib and email are imported on first send: most processes never alert
 
 from app.config.settings import (
     SLACK_WEBHOOK_URL,
@@ -25,22 +15,124 @@ from app.config.settings import (
     EMAIL_SMTP_SERVER,
     EMAIL_SMTP_PORT,
     EMAIL_SMTP_USER,
-    EMAIL_SMTP_PASSWORD
+    EMAIL_SMTP_PASSWORD,
+    SLACK_MAX_CONNECTIONS,
+    SLACK_KEEPALIVE_SECONDS,
+    SLACK_TIMEOUT_SECONDS,
+    EMAIL_TO,
+    EMAIL_SMTP_STARTTLS,
+    EMAIL_SMTP_POOL_SIZE,
+    EMAIL_SMTP_IDLE_SECONDS,
+    EMAIL_DIGEST_SECONDS,
+    EMAIL_DIGEST_MAX_EVENTS,
+    ALERT_AGGREGATION_SECONDS,
+    ALERT_AGGREGATION_MAX_KEYS
 )
+from app.alerts.aggregation import AlertAggregator
+from app.alerts.smtp import SMTPPool
+from app.monitoring.tracing import ALERT_PREFIX, stamp
 
 class AlertHandler(ABC):
     """Base class for alert handlers"""
     
+    # Handlers that batch alerts hold a send back for up to `send_delay`
+    # seconds and can have `max_in_flight` sends waiting (None: no limit of their own)
+    send_delay: float = 0.0
+    max_in_flight: Optional[int] = None
+    
     @abstractmethod
     async def send(self, event: Dict[str, Any]) -> bool:
         """Send alert for an event"""
         pass
+    
+    async def send_now(self, event: Dict[str, Any]) -> bool:
+        """Send alert for an event without batching it"""
+        return await self.send(event)
+    
+    async def flush(self):
+        """Send anything held back for batching now"""
+        pass
+    
+    async def start(self):
+        """Open long-lived clients (called on startup)"""
+        pass
+    
+    async def close(self):
+        """Release long-lived clients (called on shutdown)"""
+        pass
 
 class SlackAlertHandler(AlertHandler):
-    """Send alerts to Slack"""
+    """Send alerts to Slack
+    
+    Posts go through one pooled aiohttp session with keep-alive, so a burst
+    of alerts reuses a few connections instead of paying DNS, TCP and TLS
+    setup for each one. The session is opened by start() (or on first send)
+    and belongs to the event loop that opened it: sends from another loop
+    are refused while that loop runs.
+    """
     
-    def __init__(self, webhook_url: str):
+    def __init__(self, webhook_url: str,
+                 max_connections: int = SLACK_MAX_CONNECTIONS,
+                 keepalive_seconds: float = SLACK_KEEPALIVE_SECONDS,
+                 timeout_seconds: float = SLACK_TIMEOUT_SECONDS):
         self.webhook_url = webhook_url
+        self.max_connections = max_connections
+        self.keepalive_seconds = keepalive_seconds
+        self.timeout_seconds = timeout_seconds
+        self._session = None
+        self._loop = None
+    
+    async def start(self):
+        """Open the pooled session"""
+        self._get_session()
+    
+    async def close(self):
+        """Close the pooled session and its connections, on the loop that owns them"""
+        session, self._session = self._session, None
+        if session is None or session.closed:
+            return
+        owner = self._loop
+        if owner is asyncio.get_running_loop():
+            await session.close()
+        elif owner.is_running():
+            await asyncio.wrap_future(asyncio.run_coroutine_threadsafe(session.close(), owner))
+        else:
+            self._abandon(session)
+    
+    @staticmethod
+    def _abandon(session):
+        """Drop a session whose loop no longer runs
+        
+        Closing it would need that loop, so the session is only detached
+        from its connector and the connections are released with their
+        transports.
+        """
+        session.detach()
+    
+    def _get_session(self):
+        """The pooled session for the running loop, created on first use"""
+        try:
+            import aiohttp
+        except ImportError:
+            raise ImportError("aiohttp is required")
+        
+        loop = asyncio.get_running_loop()
+        if self._session is not None and not self._session.closed and self._loop is not loop:
+            if self._loop.is_running():
+                raise RuntimeError("Slack session belongs to another running event loop")
+            self._abandon(self._session)
+        if self._session is None or self._session.closed:
+            connector = aiohttp.TCPConnector(
+                limit=self.max_connections,
+                keepalive_timeout=self.keepalive_seconds,
+                ttl_dns_cache=300,
+            )
+            self._session = aiohttp.ClientSession(
+                connector=connector,
+                timeout=aiohttp.ClientTimeout(total=self.timeout_seconds),
+            )
+            self._loop = loop
+        return self._session
     
     async def send(self, event: Dict[str, Any]) -> bool:
         """Send alert to Slack webhook"""
@@ -48,15 +140,13 @@ class SlackAlertHandler(AlertHandler):
             return False
         
         try:
-            if aiohttp is None:
-                raise ImportError("aiohttp is required")
-            
             # Format message
             message = self._format_message(event)
             
-            async with aiohttp.ClientSession() as session:
-                async with session.post(self.webhook_url, json=message) as resp:
-                    return resp.status == 200
+            async with self._get_session().post(self.webhook_url, json=message) as resp:
+                # Read the body so the connection goes back to the pool
+                await resp.read()
+                return resp.status == 200
         except Exception as e:
             print(f"Slack alert failed: {e}")
             return False
@@ -75,20 +165,32 @@ class SlackAlertHandler(AlertHandler):
         if event_type == "accessed":
             color = "#FFA500"  # Orange for warning
         
+        text = "🚨 DecoyDNA Honeyfile Access Detected"
+        fields = [
+            {"title": "Decoy ID", "value": decoy_id[:16], "short": True},
+            {"title": "Event Type", "value": event_type, "short": True},
+            {"title": "Username", "value": username, "short": True},
+            {"title": "Hostname", "value": hostname, "short": True},
+            {"title": "Process", "value": process_name, "short": True},
+            {"title": "Timestamp", "value": str(timestamp), "short": True},
+            {"title": "Path", "value": event.get("accessed_path", "N/A"), "short": False},
+        ]
+        
+        aggregate = event.get("aggregate")
+        if aggregate:
+            text = f"🔁 DecoyDNA: {aggregate['count']} more honeyfile event{'s' if aggregate['count'] != 1 else ''} since the last alert"
+            fields[1] = {"title": "Event Types", "short": True,
+                         "value": ", ".join(f"{name} ×{count}" for name, count in aggregate["event_types"].items())}
+            fields[5] = {"title": "Between", "short": True,
+                         "value": f"{aggregate['first_seen']} – {aggregate['last_seen']}"}
+            fields[6] = {"title": "Paths", "value": "\n".join(aggregate["paths"]) or "N/A", "short": False}
+        
         return {
-            "text": "🚨 DecoyDNA Honeyfile Access Detected",
+            "text": text,
             "attachments": [
                 {
                     "color": color,
-                    "fields": [
-                        {"title": "Decoy ID", "value": decoy_id[:16], "short": True},
-                        {"title": "Event Type", "value": event_type, "short": True},
-                        {"title": "Username", "value": username, "short": True},
-                        {"title": "Hostname", "value": hostname, "short": True},
-                        {"title": "Process", "value": process_name, "short": True},
-                        {"title": "Timestamp", "value": str(timestamp), "short": True},
-                        {"title": "Path", "value": event.get("accessed_path", "N/A"), "short": False},
-                    ],
+                    "fields": fields,
                     "footer": "DecoyDNA Enterprise Monitoring",
                     "ts": int(datetime.utcnow().timestamp())
                 }
@@ -96,7 +198,15 @@ class SlackAlertHandler(AlertHandler):
         }
 
 class EmailAlertHandler(AlertHandler):
-    """Send alerts via Email"""
+    """Send alerts via Email
+    
+    Messages go out over pooled, already authenticated SMTP connections
+    (see SMTPPool). With `digest_seconds` set, alerts are collected per
+    recipient for that long (or until `digest_max_events`) and sent as one
+    digest message instead of one email each. send() then returns once the
+    digest holding the alert was mailed, so a queued alert is not reported
+    as delivered before it actually went out.
+    """
     
     def __init__(self, 
                  smtp_server: str,
@@ -104,48 +214,174 @@ class EmailAlertHandler(AlertHandler):
                  smtp_user: str,
                  smtp_password: str,
                  from_address: str,
-                 to_addresses: list):
+                 to_addresses: list,
+                 starttls: bool = EMAIL_SMTP_STARTTLS,
+                 pool_size: int = EMAIL_SMTP_POOL_SIZE,
+                 idle_seconds: float = EMAIL_SMTP_IDLE_SECONDS,
+                 digest_seconds: float = EMAIL_DIGEST_SECONDS,
+                 digest_max_events: int = EMAIL_DIGEST_MAX_EVENTS):
         self.smtp_server = smtp_server
         self.smtp_port = smtp_port
         self.smtp_user = smtp_user
         self.smtp_password = smtp_password
         self.from_address = from_address
         self.to_addresses = to_addresses
+        self.pool = SMTPPool(smtp_server, smtp_port, smtp_user, smtp_password,
+                             starttls=starttls, max_size=pool_size, idle_timeout=idle_seconds)
+        self.digest_seconds = digest_seconds
+        self.digest_max_events = max(1, digest_max_events)
+        self._digest: Dict[str, List[Dict[str, Any]]] = {}
+        self._digest_waiters: List[asyncio.Future] = []
+        self._digest_timer: Optional[asyncio.Task] = None
+        self._flushes: set = set()
+        self.digests_sent = 0
+        if digest_seconds > 0:
+            self.send_delay = digest_seconds
+            self.max_in_flight = self.digest_max_events
     
     async def send(self, event: Dict[str, Any]) -> bool:
-        """Send alert via email"""
+        """Send alert via email (or as part of the next digest)"""
         if not self.to_addresses:
             return False
         
+        if self.digest_seconds > 0:
+            return await self._queue_for_digest(event)
+        
+        return await self.send_now(event)
+    
+    async def send_now(self, event: Dict[str, Any]) -> bool:
+        """Send alert via email as its own message"""
+        if not self.to_addresses:
+            return False
+        subject, body = self._format_message(event)
+        return await self._deliver(self.to_addresses, subject, body)
+    
+    async def _deliver(self, recipients: List[str], subject: str, body: str) -> bool:
+        """Build an HTML email and send it over a pooled connection"""
         try:
-            if smtplib is None:
-                raise ImportError("smtplib is required")
-            
-            # Format message
-            subject, body = self._format_message(event)
+            from email.mime.text import MIMEText
+            from email.mime.multipart import MIMEMultipart
             
             # Create email
             msg = MIMEMultipart("alternative")
             msg["Subject"] = subject
             msg["From"] = self.from_address
-            msg["To"] = ", ".join(self.to_addresses)
+            msg["To"] = ", ".join(recipients)
             
             # Attach HTML body
             msg.attach(MIMEText(body, "html"))
             
-            # Send email (non-blocking simulation)
-            await asyncio.to_thread(self._send_smtp, msg)
+            await asyncio.to_thread(self.pool.send, self.from_address, recipients, msg.as_string())
             return True
         except Exception as e:
             print(f"Email alert failed: {e}")
             return False
     
-    def _send_smtp(self, msg):
-        """Send SMTP message (blocking)"""
-        with smtplib.SMTP(self.smtp_server, self.smtp_port) as server:
-            server.starttls()
-            server.login(self.smtp_user, self.smtp_password)
-            server.sendmail(self.from_address, self.to_addresses, msg.as_string())
+    # ==================== DIGEST ====================
+    def _queue_for_digest(self, event: Dict[str, Any]) -> asyncio.Future:
+        """Add an event to every recipient's pending digest; resolves to whether it was mailed"""
+        for recipient in self.to_addresses:
+            self._digest.setdefault(recipient, []).append(event)
+        waiter = asyncio.get_running_loop().create_future()
+        self._digest_waiters.append(waiter)
+        
+        if max(len(events) for events in self._digest.values()) >= self.digest_max_events:
+            if self._digest_timer is not None:
+                self._digest_timer.cancel()
+                self._digest_timer = None
+            self._spawn_flush()
+        elif self._digest_timer is None:
+            self._digest_timer = asyncio.create_task(self._flush_after_window())
+        return waiter
+    
+    async def _flush_after_window(self):
+        await asyncio.sleep(self.digest_seconds)
+        self._digest_timer = None
+        self._spawn_flush()
+    
+    def _spawn_flush(self):
+        """Take the pending digests now and send them in the background"""
+        pending, self._digest = self._digest, {}
+        waiters, self._digest_waiters = self._digest_waiters, []
+        task = asyncio.create_task(self._send_digests(pending, waiters))
+        self._flushes.add(task)
+        task.add_done_callback(self._flushes.discard)
+    
+    async def flush(self) -> bool:
+        """Send pending digests now"""
+        if self._digest_timer is not None:
+            self._digest_timer.cancel()
+            self._digest_timer = None
+        pending, self._digest = self._digest, {}
+        waiters, self._digest_waiters = self._digest_waiters, []
+        return await self._send_digests(pending, waiters)
+    
+    async def _send_digests(self, pending: Dict[str, List[Dict[str, Any]]],
+                            waiters: List[asyncio.Future]) -> bool:
+        """One message per distinct event list; recipients with the same events share it"""
+        groups: Dict[tuple, tuple] = {}
+        for recipient, events in pending.items():
+            key = tuple(id(event) for event in events)
+            groups.setdefault(key, (events, []))[1].append(recipient)
+        
+        ok = True
+        for events, recipients in groups.values():
+            subject, body = self._format_digest(events)
+            delivered = await self._deliver(recipients, subject, body)
+            self.digests_sent += delivered
+            ok = ok and delivered
+        for waiter in waiters:
+            if not waiter.done():
+                waiter.set_result(ok)
+        return ok
+    
+    async def close(self):
+        """Send any pending digest, then close pooled SMTP connections"""
+        if self._flushes:
+            await asyncio.gather(*self._flushes, return_exceptions=True)
+        await self.flush()
+        await asyncio.to_thread(self.pool.close)
+    
+    @staticmethod
+    def _digest_event_label(event: Dict[str, Any]) -> str:
+        aggregate = event.get("aggregate")
+        if aggregate:
+            return f"{aggregate['count']} MORE ({', '.join(name.upper() for name in aggregate['event_types'])})"
+        return str(event.get('event_type', 'unknown')).upper()
+    
+    @staticmethod
+    def _format_digest(events: List[Dict[str, Any]]) -> tuple:
+        """Format several events as one email"""
+        subject = f"🚨 DecoyDNA ALERT: {len(events)} honeyfile access event{'s' if len(events) != 1 else ''}"
+        cell = 'style="padding: 6px; border: 1px solid #ddd;"'
+        rows = "".join(
+            f"<tr><td {cell}>{event.get('timestamp', 'Unknown')}</td>"
+            f"<td {cell}>{EmailAlertHandler._digest_event_label(event)}</td>"
+            f"<td {cell}><code>{event.get('decoy_id', 'Unknown')}</code></td>"
+            f"<td {cell}>{event.get('username', 'unknown')}@{event.get('hostname', 'unknown')}</td>"
+            f"<td {cell}>{event.get('process_name', 'N/A')}</td>"
+            f"<td {cell}><code>{event.get('accessed_path', 'N/A')}</code></td></tr>"
+            for event in events
+        )
+        body = f"""
+        <html>
+            <body style="font-family: Arial, sans-serif;">
+                <div style="background: #f0f0f0; padding: 20px; border-radius: 5px;">
+                    <h2 style="color: #d9534f;">DECOY DNA SECURITY ALERT DIGEST</h2>
+                    <table style="width: 100%; border-collapse: collapse; background: #fff;">
+                        <tr><th {cell}>Timestamp</th><th {cell}>Event</th><th {cell}>Decoy ID</th>
+                            <th {cell}>User@Host</th><th {cell}>Process</th><th {cell}>Path</th></tr>
+                        {rows}
+                    </table>
+                    <p style="margin-top: 20px; color: #666; font-size: 12px;">
+                        This is an automated alert from DecoyDNA Enterprise Monitoring System.
+                        Immediate investigation is recommended.
+                    </p>
+                </div>
+            </body>
+        </html>
+        """
+        return subject, body
     
     @staticmethod
     def _format_message(event: Dict[str, Any]) -> tuple:
@@ -155,9 +391,19 @@ class EmailAlertHandler(AlertHandler):
         username = event.get("username", "unknown")
         hostname = event.get("hostname", "unknown")
         timestamp = event.get("timestamp", "Unknown")
+        path = f"<code>{event.get('accessed_path', 'N/A')}</code>"
+        alert_type = "Honeyfile Access Detected"
         
         subject = f"🚨 DecoyDNA ALERT: Honeyfile {event_type} Detected"
         
+        aggregate = event.get("aggregate")
+        if aggregate:
+            subject = f"🔁 DecoyDNA ALERT: {aggregate['count']} more honeyfile event{'s' if aggregate['count'] != 1 else ''} on {decoy_id[:16]}"
+            event_type = ", ".join(f"{name.upper()} ×{count}" for name, count in aggregate["event_types"].items())
+            timestamp = f"{aggregate['first_seen']} – {aggregate['last_seen']}"
+            path = "<br>".join(f"<code>{p}</code>" for p in aggregate["paths"]) or "N/A"
+            alert_type = f"Repeated Access Summary ({aggregate['count']} events)"
+        
         body = f"""
         <html>
             <body style="font-family: Arial, sans-serif;">
@@ -166,7 +412,7 @@ class EmailAlertHandler(AlertHandler):
                     <table style="width: 100%; border-collapse: collapse;">
                         <tr style="background: #fff;">
                             <td style="padding: 10px; border: 1px solid #ddd;"><strong>Alert Type:</strong></td>
-                            <td style="padding: 10px; border: 1px solid #ddd;">Honeyfile Access Detected</td>
+                            <td style="padding: 10px; border: 1px solid #ddd;">{alert_type}</td>
                         </tr>
                         <tr style="background: #f9f9f9;">
                             <td style="padding: 10px; border: 1px solid #ddd;"><strong>Event Type:</strong></td>
@@ -194,7 +440,7 @@ class EmailAlertHandler(AlertHandler):
                         </tr>
                         <tr style="background: #f9f9f9;">
                             <td style="padding: 10px; border: 1px solid #ddd;"><strong>Path:</strong></td>
-                            <td style="padding: 10px; border: 1px solid #ddd;"><code>{event.get('accessed_path', 'N/A')}</code></td>
+                            <td style="padding: 10px; border: 1px solid #ddd;">{path}</td>
                         </tr>
                     </table>
                     <p style="margin-top: 20px; color: #666; font-size: 12px;">
@@ -209,10 +455,18 @@ class EmailAlertHandler(AlertHandler):
         return subject, body
 
 class AlertManager:
-    """Manage multiple alert handlers"""
+    """Manage multiple alert handlers
     
-    def __init__(self):
+    Detected events are delivered by the alert outbox, which folds
+    repeats with `aggregator` and calls the handlers per channel;
+    send_alert() sends one alert directly to every handler.
+    """
+    
+    def __init__(self,
+                 aggregation_seconds: float = ALERT_AGGREGATION_SECONDS,
+                 aggregation_max_keys: int = ALERT_AGGREGATION_MAX_KEYS):
         self.handlers: Dict[str, AlertHandler] = {}
+        self.aggregator = AlertAggregator(aggregation_seconds, aggregation_max_keys)
         self._initialize_handlers()
     
     def _initialize_handlers(self):
@@ -221,19 +475,19 @@ class AlertManager:
         if SLACK_WEBHOOK_URL:
             self.handlers["slack"] = SlackAlertHandler(SLACK_WEBHOOK_URL)
         
-        # Email handler
-        if EMAIL_SMTP_USER and EMAIL_SMTP_PASSWORD:
+        # Email handler (an unauthenticated relay only needs recipients)
+        if (EMAIL_SMTP_USER and EMAIL_SMTP_PASSWORD) or EMAIL_TO:
             self.handlers["email"] = EmailAlertHandler(
                 smtp_server=EMAIL_SMTP_SERVER,
                 smtp_port=EMAIL_SMTP_PORT,
                 smtp_user=EMAIL_SMTP_USER,
                 smtp_password=EMAIL_SMTP_PASSWORD,
                 from_address=EMAIL_FROM,
-                to_addresses=[]  # Will be configured later
+                to_addresses=list(EMAIL_TO)
             )
     
     async def send_alert(self, event: Dict[str, Any]) -> Dict[str, bool]:
-        """Send alert through all enabled handlers"""
+        """Send one alert through all enabled handlers right away (no retries)"""
         results = {}
         
         tasks = []
@@ -247,13 +501,31 @@ class AlertManager:
                                 event: Dict[str, Any], results: Dict[str, bool]):
         """Send alert with timeout"""
         try:
-            result = await asyncio.wait_for(handler.send(event), timeout=10)
+            result = await asyncio.wait_for(handler.send_now(event), timeout=10)
             results[name] = result
         except asyncio.TimeoutError:
             results[name] = False
         except Exception as e:
             results[name] = False
             print(f"Error sending {name} alert: {e}")
+        finally:
+            stamp(event, ALERT_PREFIX + name)
+    
+    async def start(self):
+        """Open every handler's long-lived clients"""
+        for name, handler in self.handlers.items():
+            try:
+                await handler.start()
+            except Exception as e:
+                print(f"Error starting {name} alerts: {e}")
+    
+    async def close(self):
+        """Close every handler's long-lived clients"""
+        for name, handler in self.handlers.items():
+            try:
+                await handler.close()
+            except Exception as e:
+                print(f"Error closing {name} alerts: {e}")
     
     def add_handler(self, name: str, handler: AlertHandler):
         """Add a custom alert handler"""
@@ -262,3 +534,7 @@ class AlertManager:
     def get_enabled_handlers(self) -> list:
         """Get list of enabled alert handlers"""
         return list(self.handlers.keys())
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """Aggregation counters"""
+        return {"aggregation": self.aggregator.get_stats()}
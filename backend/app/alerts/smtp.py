@@ -0,0 +1,145 @@
+"""
+Pooled SMTP sender for email alerts
+
+Connecting, STARTTLS and AUTH cost several round trips, and relays
+throttle clients that reconnect for every message. SMTPPool keeps up to
+`max_size` authenticated connections open and hands them to worker
+threads; a connection that sat idle is checked with NOOP before reuse
+and replaced if the server dropped it.
+"""
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+
+class SMTPPool:
+    """Bounded pool of logged-in smtplib.SMTP connections (blocking API)"""
+
+    def __init__(self, host: str, port: int, user: str = "", password: str = "",
+                 starttls: bool = True, max_size: int = 2, idle_timeout: float = 60.0,
+                 check_after: float = 5.0, timeout: float = 10.0,
+                 factory: Optional[Callable[..., Any]] = None):
+        self.host = host
+        self.port = port
+        self.user = user
+        self.password = password
+        self.starttls = starttls
+        self.max_size = max(1, int(max_size))
+        self.idle_timeout = idle_timeout
+        self.check_after = check_after
+        self.timeout = timeout
+        self._factory = factory
+        self._slots = threading.BoundedSemaphore(self.max_size)
+        self._idle: List[tuple] = []  # (connection, returned_at)
+        self._lock = threading.Lock()
+        self._closed = False
+        self.connects = 0
+        self.reuses = 0
+        self.health_check_failures = 0
+        self.sent = 0
+        self.failures = 0
+
+    def _connect(self):
+        """Open, secure and authenticate a new connection"""
+        if self._factory is None:
+            import smtplib
+            self._factory = smtplib.SMTP
+        connection = self._factory(self.host, self.port, timeout=self.timeout)
+        try:
+            connection.ehlo()
+            if self.starttls:
+                connection.starttls()
+                connection.ehlo()
+            if self.user:
+                connection.login(self.user, self.password)
+        except Exception:
+            self._discard(connection)
+            raise
+        self.connects += 1
+        return connection
+
+    @staticmethod
+    def _discard(connection):
+        try:
+            connection.quit()
+        except Exception:
+            try:
+                connection.close()
+            except Exception:
+                pass
+
+    def _healthy(self, connection) -> bool:
+        try:
+            return connection.noop()[0] == 250
+        except Exception:
+            return False
+
+    def _acquire(self) -> tuple:
+        """(connection, reused): an idle connection that passed its checks, or a new one"""
+        now = time.monotonic()
+        while True:
+            with self._lock:
+                if not self._idle:
+                    break
+                connection, returned_at = self._idle.pop()
+            idle_for = now - returned_at
+            if idle_for > self.idle_timeout:
+                self._discard(connection)
+                continue
+            if idle_for > self.check_after and not self._healthy(connection):
+                self.health_check_failures += 1
+                self._discard(connection)
+                continue
+            self.reuses += 1
+            return connection, True
+        return self._connect(), False
+
+    def _release(self, connection):
+        with self._lock:
+            if not self._closed:
+                self._idle.append((connection, time.monotonic()))
+                return
+        self._discard(connection)
+
+    def send(self, from_address: str, to_addresses: List[str], message: str):
+        """Send one message; a pooled connection the server dropped is replaced once"""
+        import smtplib
+        with self._slots:
+            for attempt in (1, 2):
+                connection, reused = self._acquire()
+                try:
+                    connection.sendmail(from_address, to_addresses, message)
+                except Exception as e:
+                    self._discard(connection)
+                    # A reused connection may have been dropped by the server since the
+                    # last check; retry that once. Anything else is a real failure.
+                    # (SMTPException subclasses OSError, so only bare socket errors count)
+                    dropped = isinstance(e, smtplib.SMTPServerDisconnected) or \
+                        (isinstance(e, OSError) and not isinstance(e, smtplib.SMTPException)) or \
+                        getattr(e, "smtp_code", None) == 421
+                    if attempt == 1 and reused and dropped:
+                        continue
+                    self.failures += 1
+                    raise
+                self._release(connection)
+                self.sent += 1
+                return
+
+    def close(self):
+        """QUIT every idle connection; connections in use are closed on release"""
+        with self._lock:
+            self._closed = True
+            idle, self._idle = self._idle, []
+        for connection, _ in idle:
+            self._discard(connection)
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "idle": len(self._idle),
+            "max_size": self.max_size,
+            "connects": self.connects,
+            "reuses": self.reuses,
+            "health_check_failures": self.health_check_failures,
+            "sent": self.sent,
+            "failures": self.failures,
+        }
@@ -0,0 +1,40 @@
+"""
+Fast JSON responses for list endpoints
+"""
+import json
+from datetime import date, datetime
+from typing import Any
+
+from fastapi.responses import Response
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+def _default(obj: Any) -> Any:
+    """Fallback encoder for the stdlib json path"""
+    if isinstance(obj, (datetime, date)):
+        return obj.isoformat()
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+def dumps(content: Any) -> bytes:
+    """Serialize plain rows to JSON bytes, using orjson when available"""
+    if orjson is not None:
+        return orjson.dumps(content)
+    return json.dumps(content, default=_default, separators=(",", ":")).encode("utf-8")
+
+
+class FastJSONResponse(Response):
+    """JSON response that skips per-row model construction and validation
+
+    Routes keep their `response_model` for the OpenAPI schema but return
+    this directly, so rows fetched as plain dicts are encoded in one pass.
+    The caller is responsible for producing rows that match the schema.
+    """
+    media_type = "application/json"
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
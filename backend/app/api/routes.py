@@ -1,15 +1,25 @@
 """
 FastAPI routes for DecoyDNA
 """
-from fastapi import APIRouter, Depends, HTTPException, WebSocket, Query
+from fastapi import APIRouter, Depends, HTTPException, WebSocket, Query, Header, Request, Response
+from fastapi.responses import PlainTextResponse, StreamingResponse
 from sqlalchemy.orm import Session
 from typing import List, Optional
 import asyncio
 import json
 
 from app.db.database import get_db
+from app.api.responses import FastJSONResponse, dumps
+from app.config.settings import (
+    SHARE_STATS_MAX_DAYS, SSE_KEEPALIVE_SECONDS, SSE_REPLAY_LIMIT, BATCH_MAX_ITEMS, BATCH_INLINE_LIMIT,
+    LATENCY_TRACE_BUFFER, PROFILER_ENABLED, PROFILER_INTERVAL_MS, PROFILER_MAX_SECONDS, RATE_LIMIT_ENABLED,
+    ADMIN_TOKEN
+)
+from app.db.database import SessionLocal, table_versions
+from app.db.versions import Validators
 from app.models.schemas import (
-    HoneyfileCreateRequest, HoneyfileResponse,
+    HoneyfileCreateRequest, HoneyfileResponse, HoneyfileCreateResponse,
+    HoneyfileBatchCreateRequest, HoneyfileBatchJobResponse,
     AccessEventResponse, AlertSettingsRequest, AlertSettingsResponse,
     MonitoringStatusRequest, MonitoringStatusResponse,
     DashboardStats, WebSocketEvent,
@@ -17,81 +27,158 @@ from app.models.schemas import (
 )
 from app.services.business import (
     HoneyfileService, EventService, MonitoringService,
-    AlertService, DashboardService, monitoring_engine, alert_manager
+    AlertService, DashboardService, monitoring_engine,
+    event_hub, event_pipeline, rate_limiter, write_gate,
+    HONEYFILE_LIST_TABLES, FILE_SHARE_LIST_TABLES, DASHBOARD_TABLES
 )
+from app.monitoring.hub import pump, SubscriptionClosed, build_envelope, format_sse
+from app.monitoring.client import MonitorError, MonitorUnavailable
 from app.services.file_sharing import FileShareService
+from app.services.batch import batch_service
+from app.utils.profiler import ProfilerBusy, StackSampler, is_admin, profiler_service
 
 router = APIRouter(prefix="/api", tags=["DecoyDNA"])
 
+# ==================== ADMISSION CONTROL ====================
+def _too_many_requests(detail: str, retry_after: float) -> HTTPException:
+    return HTTPException(status_code=429, detail=detail,
+                         headers={"Retry-After": str(max(1, int(retry_after + 0.999)))})
+
+def _charge_rate_limit(request: Request, limit: str, cost: int = 1):
+    """Take `cost` tokens from the client's bucket for `limit`, or raise 429"""
+    if not RATE_LIMIT_ENABLED:
+        return
+    client = request.client.host if request.client else "unknown"
+    retry_after = rate_limiter.check(limit, client, cost)
+    if retry_after:
+        raise _too_many_requests("Rate limit exceeded", retry_after)
+
+def admit_write(limit: Optional[str] = None):
+    """Dependency for DB-writing routes: optional per-client rate limit, then the write cap
+    
+    Both checks reject at once with 429 rather than queueing the request.
+    """
+    async def dependency(request: Request):
+        if limit:
+            _charge_rate_limit(request, limit)
+        if not write_gate.try_acquire():
+            raise _too_many_requests("Server busy, retry shortly", 1)
+        try:
+            yield
+        finally:
+            write_gate.release()
+    return dependency
+
+# ==================== CONDITIONAL GET ====================
+def _not_modified(request: Request, validators: Validators) -> Optional[Response]:
+    """A 304 response if the client's cached copy is still current"""
+    if validators.is_fresh(request.headers):
+        return Response(status_code=304, headers=validators.headers)
+    return None
+
 # ==================== WEBSOCKET ====================
+def _split_filter(value: Optional[str]) -> Optional[List[str]]:
+    """Parse a comma-separated filter query parameter"""
+    if not value:
+        return None
+    return [item.strip() for item in value.split(",") if item.strip()]
+
 @router.websocket("/ws/events")
-async def websocket_events(websocket: WebSocket, db: Session = Depends(get_db)):
+async def websocket_events(
+    websocket: WebSocket,
+    decoy_id: Optional[str] = Query(None),
+    event_type: Optional[str] = Query(None),
+    severity: Optional[str] = Query(None)
+):
     """WebSocket endpoint for real-time event streaming"""
     await websocket.accept()
     
-    # Store original callback
-    original_callback = monitoring_engine.alert_callback
-    
-    # Create callback that sends to WebSocket
-    async def ws_callback(forensic_context):
-        try:
-            event = WebSocketEvent(
-                event_type="file_access",
-                timestamp=forensic_context.get("timestamp"),
-                data=forensic_context,
-                severity="critical"
-            )
-            await websocket.send_json(event.dict())
-            
-            # Also save to database and send alerts
-            EventService.create_event(db, forensic_context)
-            await AlertService.send_alert(forensic_context)
-        except Exception as e:
-            print(f"WebSocket error: {e}")
-    
-    # Monkey-patch the callback
-    monitoring_engine.alert_callback = ws_callback
+    # Each connection only reads from its own bounded queue on the hub
+    subscription = event_hub.subscribe(
+        decoy_ids=_split_filter(decoy_id),
+        event_types=_split_filter(event_type),
+        severities=_split_filter(severity)
+    )
+    sender = asyncio.create_task(pump(subscription, websocket.send_text))
+    receiver = asyncio.create_task(_receive_pings(websocket))
     
     try:
-        while True:
-            # Keep connection open
-            data = await websocket.receive_text()
-            if data == "ping":
-                await websocket.send_text("pong")
+        done, _ = await asyncio.wait({sender, receiver}, return_when=asyncio.FIRST_COMPLETED)
+        for task in done:
+            if isinstance(task.exception(), SubscriptionClosed):
+                # Dropped by the hub for falling too far behind
+                await websocket.close(code=1013)
     except Exception as e:
         print(f"WebSocket connection error: {e}")
     finally:
-        # Restore original callback
-        monitoring_engine.alert_callback = original_callback
+        sender.cancel()
+        receiver.cancel()
+        event_hub.unsubscribe(subscription)
+
+async def _receive_pings(websocket: WebSocket):
+    """Keep the connection open and answer keepalive pings"""
+    while True:
+        data = await websocket.receive_text()
+        if data == "ping":
+            await websocket.send_text("pong")
 
 # ==================== HONEYFILES ====================
-@router.post("/honeyfiles/create", response_model=HoneyfileResponse)
+@router.post("/honeyfiles/create", response_model=HoneyfileCreateResponse,
+             dependencies=[Depends(admit_write("honeyfile_create"))])
 async def create_honeyfile(
     request: HoneyfileCreateRequest,
     db: Session = Depends(get_db)
 ):
     """Create a new honeyfile"""
     try:
-        result = HoneyfileService.create_honeyfile(
+        # Generation, planting and (in daemon mode) registering with the daemon all block
+        result = await asyncio.to_thread(
+            HoneyfileService.create_honeyfile,
             db,
             request.file_name,
             request.file_type,
             request.template_type,
-            request.seed_locations
+            request.seed_locations,
+            request.row_count
         )
-        return HoneyfileResponse(**result)
+        return HoneyfileCreateResponse(**result)
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
 
+@router.post("/honeyfiles/batch", response_model=HoneyfileBatchJobResponse)
+async def create_honeyfiles_batch(batch: HoneyfileBatchCreateRequest, request: Request):
+    """Create many honeyfiles; small batches complete inline, large ones return a job to poll"""
+    if len(batch.items) > BATCH_MAX_ITEMS:
+        raise HTTPException(status_code=400, detail=f"Batch exceeds {BATCH_MAX_ITEMS} items")
+    # Each item costs as much as a single create; the job takes its write slot when it stores
+    _charge_rate_limit(request, "honeyfile_create", len(batch.items))
+    
+    job = batch_service.submit([item.model_dump() for item in batch.items])
+    if job.total <= BATCH_INLINE_LIMIT:
+        await job.done.wait()
+    return job.to_dict()
+
+@router.get("/honeyfiles/batch/{job_id}", response_model=HoneyfileBatchJobResponse)
+async def get_honeyfiles_batch(job_id: str, include_results: bool = Query(True)):
+    """Get progress and results of a batch creation job"""
+    job = batch_service.get_job(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Batch job not found")
+    return job.to_dict(include_results=include_results)
+
 @router.get("/honeyfiles/list", response_model=List[HoneyfileResponse])
 async def list_honeyfiles(
+    request: Request,
     skip: int = Query(0, ge=0),
     limit: int = Query(100, ge=1, le=1000),
     db: Session = Depends(get_db)
 ):
     """List all honeyfiles"""
-    honeyfiles = HoneyfileService.list_honeyfiles(db, skip, limit)
-    return [HoneyfileResponse(**hf) for hf in honeyfiles]
+    validators = table_versions.validators(HONEYFILE_LIST_TABLES, skip, limit)
+    not_modified = _not_modified(request, validators)
+    if not_modified:
+        return not_modified
+    return FastJSONResponse(HoneyfileService.list_honeyfile_rows(db, skip, limit), headers=validators.headers)
 
 @router.get("/honeyfiles/search/{query}", response_model=List[HoneyfileResponse])
 async def search_honeyfiles(
@@ -124,8 +211,93 @@ async def get_event_logs(
     db: Session = Depends(get_db)
 ):
     """Get access event logs"""
-    events = EventService.get_events(db, skip, limit, decoy_id, hours)
-    return [AccessEventResponse(**e) for e in events]
+    return FastJSONResponse(EventService.get_event_rows(db, skip, limit, decoy_id, hours))
+
+@router.get("/events/stream")
+async def stream_events(
+    last_event_id: Optional[int] = Header(None, alias="Last-Event-ID"),
+    since: Optional[int] = Query(None, description="Resume after this sequence when no Last-Event-ID header is sent"),
+    decoy_id: Optional[str] = Query(None),
+    event_type: Optional[str] = Query(None),
+    severity: Optional[str] = Query(None)
+):
+    """Server-Sent Events stream of detections, resumable via Last-Event-ID"""
+    resume_after = last_event_id if last_event_id is not None else since
+    
+    # Subscribe before replaying so nothing published meanwhile is missed
+    subscription = event_hub.subscribe(
+        decoy_ids=_split_filter(decoy_id),
+        event_types=_split_filter(event_type),
+        severities=_split_filter(severity)
+    )
+    
+    async def event_source():
+        last_sent = resume_after if resume_after is not None else -1
+        try:
+            if resume_after is not None:
+                async for sequence, payload in _replay_events(resume_after, subscription):
+                    if sequence is None:
+                        # Gap exceeded SSE_REPLAY_LIMIT; the client should re-sync via /events/logs
+                        yield "event: replay_truncated\ndata: {}\n\n"
+                    elif sequence > last_sent:
+                        last_sent = sequence
+                        yield format_sse(sequence, payload)
+            while True:
+                try:
+                    sequence, payload = await asyncio.wait_for(
+                        subscription.get_message(), timeout=SSE_KEEPALIVE_SECONDS
+                    )
+                except asyncio.TimeoutError:
+                    yield ": keepalive\n\n"
+                    continue
+                if sequence is not None:
+                    if sequence <= last_sent:
+                        continue
+                    last_sent = sequence
+                yield format_sse(sequence, payload)
+        except SubscriptionClosed:
+            return
+        finally:
+            event_hub.unsubscribe(subscription)
+    
+    return StreamingResponse(
+        event_source(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+async def _replay_events(after: int, subscription):
+    """Yield (sequence, payload) missed since `after`: ring buffer first, DB only for older gaps"""
+    buffered = event_hub.replay(after)
+    if buffered is None:
+        # Gap is older than the buffer: page the missing range out of the database
+        before = event_hub.buffer.oldest_sequence()
+        replayed = 0
+        cursor = after
+        while replayed < SSE_REPLAY_LIMIT:
+            page = await asyncio.to_thread(_load_events_after, cursor, before, min(500, SSE_REPLAY_LIMIT - replayed))
+            if not page:
+                break
+            for forensic_context in page:
+                envelope = build_envelope(forensic_context)
+                cursor = forensic_context["sequence"]
+                if subscription.matches(envelope):
+                    yield cursor, dumps(envelope).decode("utf-8")
+            replayed += len(page)
+        else:
+            yield None, None
+        buffered = event_hub.replay(cursor) or []
+    for sequence, envelope, payload in buffered:
+        if subscription.matches(envelope):
+            yield sequence, payload
+
+def _load_events_after(after: int, before: Optional[int], limit: int):
+    """Load persisted events for SSE catch-up (worker thread)"""
+    db = SessionLocal()
+    try:
+        return EventService.get_events_after_sequence(db, after, before, limit)
+    finally:
+        db.close()
 
 @router.get("/events/count")
 async def get_event_count(
@@ -149,13 +321,13 @@ async def start_monitoring(
 @router.post("/monitor/stop")
 async def stop_monitoring():
     """Stop file monitoring"""
-    result = MonitoringService.stop_monitoring()
+    result = await asyncio.to_thread(MonitoringService.stop_monitoring)
     return result
 
 @router.get("/monitor/status", response_model=MonitoringStatusResponse)
 async def get_monitoring_status(db: Session = Depends(get_db)):
     """Get monitoring status"""
-    status = MonitoringService.get_monitoring_status(db)
+    status = await asyncio.to_thread(MonitoringService.get_monitoring_status, db)
     return MonitoringStatusResponse(
         is_running=status["is_running"],
         started_at=status.get("started_at"),
@@ -164,6 +336,34 @@ async def get_monitoring_status(db: Session = Depends(get_db)):
         error_count=0  # Could be tracked separately
     )
 
+@router.get("/monitor/pipeline")
+async def get_pipeline_stats():
+    """Get event pipeline and broadcast hub statistics"""
+    return event_pipeline.get_stats()
+
+@router.get("/monitor/latency")
+async def get_detection_latency():
+    """Per-stage detection latency percentiles, from filesystem event to alert delivery"""
+    try:
+        return await asyncio.to_thread(MonitoringService.get_latency_stats)
+    except (MonitorUnavailable, MonitorError) as e:
+        raise HTTPException(status_code=503, detail=str(e))
+
+@router.get("/monitor/latency/trace")
+async def export_latency_trace(
+    min_total_ms: float = Query(0.0, ge=0),
+    limit: int = Query(100, ge=1, le=LATENCY_TRACE_BUFFER)
+):
+    """Slowest recent events as a Chrome trace (chrome://tracing, Perfetto)"""
+    try:
+        trace = await asyncio.to_thread(MonitoringService.get_latency_trace, min_total_ms, limit)
+    except (MonitorUnavailable, MonitorError) as e:
+        raise HTTPException(status_code=503, detail=str(e))
+    return FastJSONResponse(
+        trace,
+        headers={"Content-Disposition": 'attachment; filename="decoydna-latency-trace.json"'}
+    )
+
 # ==================== ALERTS ====================
 @router.get("/alerts/settings", response_model=dict)
 async def get_alert_settings(db: Session = Depends(get_db)):
@@ -171,7 +371,7 @@ async def get_alert_settings(db: Session = Depends(get_db)):
     settings = AlertService.get_alert_settings(db)
     return settings
 
-@router.post("/alerts/settings")
+@router.post("/alerts/settings", dependencies=[Depends(admit_write())])
 async def update_alert_settings(
     request: AlertSettingsRequest,
     db: Session = Depends(get_db)
@@ -185,7 +385,7 @@ async def update_alert_settings(
     )
     return result
 
-@router.post("/alerts/test")
+@router.post("/alerts/test", dependencies=[Depends(admit_write("alert_test"))])
 async def test_alert(
     alert_type: str = Query(...),
     db: Session = Depends(get_db)
@@ -204,11 +404,31 @@ async def test_alert(
     result = await AlertService.send_alert(test_event)
     return {"test_sent": result}
 
+@router.get("/alerts/outbox")
+async def get_alert_outbox(db: Session = Depends(get_db)):
+    """Get alert delivery status and dead letters"""
+    return AlertService.get_outbox(db)
+
+@router.post("/alerts/outbox/retry", dependencies=[Depends(admit_write())])
+async def retry_dead_alerts(
+    channel: Optional[str] = Query(None),
+    db: Session = Depends(get_db)
+):
+    """Requeue dead-lettered alert deliveries"""
+    return {"requeued": AlertService.retry_dead_alerts(db, channel)}
+
 # ==================== DASHBOARD ====================
 @router.get("/dashboard/stats", response_model=DashboardStats)
-async def get_dashboard_stats(db: Session = Depends(get_db)):
+async def get_dashboard_stats(request: Request, response: Response, db: Session = Depends(get_db)):
     """Get dashboard statistics"""
-    stats = DashboardService.get_dashboard_stats(db)
+    window = DashboardService.cache_window()
+    validators = table_versions.validators(DASHBOARD_TABLES, window,
+                                           changed_at=DashboardService.window_started(window))
+    not_modified = _not_modified(request, validators)
+    if not_modified:
+        return not_modified
+    response.headers.update(validators.headers)
+    stats = await asyncio.to_thread(DashboardService.get_dashboard_stats, db, window)
     return DashboardStats(
         total_honeyfiles=stats["total_honeyfiles"],
         total_events=stats["total_events"],
@@ -217,6 +437,17 @@ async def get_dashboard_stats(db: Session = Depends(get_db)):
         events_last_hour=stats["events_last_hour"]
     )
 
+# ==================== CACHE ====================
+@router.get("/cache/stats")
+async def get_cache_stats():
+    """Get in-process cache hit/miss statistics"""
+    return {
+        "honeyfiles": HoneyfileService.get_cache_stats(),
+        "skeletons": HoneyfileService.get_generator_stats(),
+        "dashboard": DashboardService.get_cache_stats(),
+        "table_versions": table_versions.get_stats(),
+    }
+
 # ==================== HEALTH ====================
 @router.get("/health")
 async def health_check():
@@ -227,8 +458,49 @@ async def health_check():
         "version": "1.0.0"
     }
 
+# ==================== ADMIN ====================
+async def require_admin(request: Request, x_admin_token: Optional[str] = Header(None)):
+    """Dependency for /admin routes: the ADMIN_TOKEN, or a loopback client when none is set"""
+    if not PROFILER_ENABLED:
+        raise HTTPException(status_code=404, detail="Profiler is disabled")
+    if not is_admin(request.client.host if request.client else None, x_admin_token, ADMIN_TOKEN):
+        raise HTTPException(status_code=403, detail="Admin access required")
+
+def _profile_response(sampler: StackSampler, output: str):
+    """Render a finished profile as collapsed stacks or a JSON summary"""
+    if output == "json":
+        return sampler.summary()
+    return PlainTextResponse(sampler.collapsed())
+
+@router.post("/admin/profile", dependencies=[Depends(require_admin)])
+async def profile_process(
+    seconds: float = Query(5.0, gt=0, le=PROFILER_MAX_SECONDS),
+    interval_ms: float = Query(PROFILER_INTERVAL_MS, ge=1, le=1000),
+    output: str = Query("collapsed", pattern="^(collapsed|json)$")
+):
+    """Sample every thread's stack for `seconds` and return the aggregated stacks"""
+    try:
+        sampler = await asyncio.to_thread(profiler_service.profile, seconds, interval_ms / 1000)
+    except ProfilerBusy as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    return _profile_response(sampler, output)
+
+@router.get("/admin/profile/{profile_id}", dependencies=[Depends(require_admin)])
+async def get_request_profile(
+    profile_id: str,
+    output: str = Query("collapsed", pattern="^(collapsed|json)$")
+):
+    """Profile recorded for a request sent with `X-Profile: 1`"""
+    sampler = profiler_service.get(profile_id)
+    if sampler is None:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    # The sampler thread finishes within one interval of the response starting
+    await asyncio.to_thread(sampler.wait)
+    return _profile_response(sampler, output)
+
 # ==================== FILE SHARING ====================
-@router.post("/file-shares/create", response_model=FileShareResponse)
+@router.post("/file-shares/create", response_model=FileShareResponse,
+             dependencies=[Depends(admit_write())])
 async def create_file_share(
     request: FileShareCreateRequest,
     db: Session = Depends(get_db)
@@ -250,14 +522,46 @@ async def create_file_share(
 
 @router.get("/file-shares/list", response_model=List[FileShareResponse])
 async def list_file_shares(
+    request: Request,
+    response: Response,
     skip: int = Query(0, ge=0),
     limit: int = Query(100, ge=1, le=1000),
     db: Session = Depends(get_db)
 ):
     """List all file shares"""
+    validators = table_versions.validators(FILE_SHARE_LIST_TABLES, skip, limit)
+    not_modified = _not_modified(request, validators)
+    if not_modified:
+        return not_modified
+    response.headers.update(validators.headers)
     shares = FileShareService.list_shares(db, skip, limit)
     return [FileShareResponse(**s) for s in shares]
 
+@router.get("/file-shares/by-user/{username}", response_model=List[FileShareResponse])
+async def list_shares_for_user(
+    username: str,
+    groups: Optional[List[str]] = Query(None, description="Groups the user belongs to"),
+    sensitive_only: bool = Query(False),
+    skip: int = Query(0, ge=0),
+    limit: int = Query(100, ge=1, le=1000),
+    db: Session = Depends(get_db)
+):
+    """List shares a user can reach directly or through their groups"""
+    shares = FileShareService.find_shares_for_user(db, username, groups, sensitive_only, skip, limit)
+    return [FileShareResponse(**s) for s in shares]
+
+@router.get("/file-shares/by-group/{group_name}", response_model=List[FileShareResponse])
+async def list_shares_for_group(
+    group_name: str,
+    sensitive_only: bool = Query(False),
+    skip: int = Query(0, ge=0),
+    limit: int = Query(100, ge=1, le=1000),
+    db: Session = Depends(get_db)
+):
+    """List shares shared with a group"""
+    shares = FileShareService.find_shares_for_group(db, group_name, sensitive_only, skip, limit)
+    return [FileShareResponse(**s) for s in shares]
+
 @router.get("/file-shares/{share_id}", response_model=FileShareResponse)
 async def get_file_share(
     share_id: str,
@@ -269,7 +573,8 @@ async def get_file_share(
         raise HTTPException(status_code=404, detail="File share not found")
     return FileShareResponse(**share)
 
-@router.post("/file-shares/{share_id}/update", response_model=FileShareResponse)
+@router.post("/file-shares/{share_id}/update", response_model=FileShareResponse,
+             dependencies=[Depends(admit_write())])
 async def update_file_share(
     share_id: str,
     request: FileShareCreateRequest,
@@ -290,7 +595,7 @@ async def update_file_share(
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
 
-@router.delete("/file-shares/{share_id}")
+@router.delete("/file-shares/{share_id}", dependencies=[Depends(admit_write())])
 async def delete_file_share(
     share_id: str,
     db: Session = Depends(get_db)
@@ -302,7 +607,7 @@ async def delete_file_share(
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
 
-@router.post("/file-shares/{share_id}/log-access")
+@router.post("/file-shares/{share_id}/log-access", dependencies=[Depends(admit_write("share_log_access"))])
 async def log_share_access(
     share_id: str,
     username: str = Query(...),
@@ -337,10 +642,11 @@ async def get_share_access_logs(
 @router.get("/file-shares/{share_id}/stats", response_model=ShareStatsResponse)
 async def get_file_share_stats(
     share_id: str,
+    days: int = Query(7, ge=1, le=SHARE_STATS_MAX_DAYS),
     db: Session = Depends(get_db)
 ):
     """Get file share statistics"""
-    stats = FileShareService.get_share_stats(db, share_id)
+    stats = FileShareService.get_share_stats(db, share_id, days)
     if not stats:
         raise HTTPException(status_code=404, detail="File share not found")
     return ShareStatsResponse(**stats)
@@ -6,7 +6,9 @@ from pathlib import Path
 from typing import Optional
 
 # ==================== DATABASE ====================
-DATABASE_URL = "sqlite:///./decoydna.db"
+DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///./decoydna.db")
+# How long a connection waits for another connection's write lock before failing
+DATABASE_BUSY_TIMEOUT_MS = float(os.getenv("DATABASE_BUSY_TIMEOUT_MS", "5000"))
 HONEYFILES_DIR = os.path.join(os.path.expanduser("~"), ".decoydna", "honeyfiles")
 FORENSIC_LOGS_DIR = os.path.join(os.path.expanduser("~"), ".decoydna", "forensics")
 
@@ -17,6 +19,29 @@ EMAIL_SMTP_SERVER = os.getenv("EMAIL_SMTP_SERVER", "smtp.gmail.com")
 EMAIL_SMTP_PORT = int(os.getenv("EMAIL_SMTP_PORT", "587"))
 EMAIL_SMTP_USER = os.getenv("EMAIL_SMTP_USER", "")
 EMAIL_SMTP_PASSWORD = os.getenv("EMAIL_SMTP_PASSWORD", "")
+EMAIL_TO = [address.strip() for address in os.getenv("EMAIL_TO", "").split(",") if address.strip()]
+EMAIL_SMTP_STARTTLS = os.getenv("EMAIL_SMTP_STARTTLS", "true").lower() == "true"
+# Pooled SMTP connections; idle ones are NOOP-checked before reuse and dropped after the idle limit
+EMAIL_SMTP_POOL_SIZE = int(os.getenv("EMAIL_SMTP_POOL_SIZE", "2"))
+EMAIL_SMTP_IDLE_SECONDS = float(os.getenv("EMAIL_SMTP_IDLE_SECONDS", "60"))
+# Digest mode: batch alerts per recipient for this many seconds (0 = one email per alert)
+EMAIL_DIGEST_SECONDS = float(os.getenv("EMAIL_DIGEST_SECONDS", "0"))
+EMAIL_DIGEST_MAX_EVENTS = int(os.getenv("EMAIL_DIGEST_MAX_EVENTS", "50"))
+# Pooled Slack webhook client: open connections and how long idle ones are kept
+SLACK_MAX_CONNECTIONS = int(os.getenv("SLACK_MAX_CONNECTIONS", "10"))
+SLACK_KEEPALIVE_SECONDS = float(os.getenv("SLACK_KEEPALIVE_SECONDS", "30"))
+SLACK_TIMEOUT_SECONDS = float(os.getenv("SLACK_TIMEOUT_SECONDS", "10"))
+# Repeat accesses by one user/host to one decoy within this window fold into a summary alert (0 = off)
+ALERT_AGGREGATION_SECONDS = float(os.getenv("ALERT_AGGREGATION_SECONDS", "60"))
+ALERT_AGGREGATION_MAX_KEYS = int(os.getenv("ALERT_AGGREGATION_MAX_KEYS", "10000"))
+# Alert outbox: detected events queue alerts in the database; a dispatcher delivers them
+ALERT_CHANNEL_CONCURRENCY = int(os.getenv("ALERT_CHANNEL_CONCURRENCY", "4"))  # in-flight sends per channel
+ALERT_SEND_TIMEOUT_SECONDS = float(os.getenv("ALERT_SEND_TIMEOUT_SECONDS", "10"))
+ALERT_MAX_ATTEMPTS = int(os.getenv("ALERT_MAX_ATTEMPTS", "8"))  # then the delivery is dead-lettered
+ALERT_RETRY_BASE_SECONDS = float(os.getenv("ALERT_RETRY_BASE_SECONDS", "2"))
+ALERT_RETRY_MAX_SECONDS = float(os.getenv("ALERT_RETRY_MAX_SECONDS", "600"))
+ALERT_OUTBOX_POLL_SECONDS = float(os.getenv("ALERT_OUTBOX_POLL_SECONDS", "5"))
+ALERT_CLAIM_LEASE_SECONDS = float(os.getenv("ALERT_CLAIM_LEASE_SECONDS", "300"))  # then a "sending" row is requeued
 
 # ==================== MONITORING ====================
 MONITORING_ENABLED = False
@@ -25,6 +50,82 @@ MONITORED_DIRECTORIES = [
     os.path.expanduser("~") + "/Desktop",
     os.path.expanduser("~") + "/Downloads",
 ]
+# "embedded" runs the engine inside the API process; "daemon" talks to
+# `python -m app.monitoring.daemon` over MONITOR_SOCKET_PATH so the API can run several workers
+MONITORING_MODE = os.getenv("MONITORING_MODE", "embedded")
+MONITOR_SOCKET_PATH = os.getenv(
+    "MONITOR_SOCKET_PATH", os.path.join(os.path.expanduser("~"), ".decoydna", "monitor.sock")
+)
+MONITOR_STREAM_QUEUE_SIZE = int(os.getenv("MONITOR_STREAM_QUEUE_SIZE", "4096"))
+
+# ==================== EVENT STREAMING ====================
+WS_QUEUE_SIZE = int(os.getenv("WS_QUEUE_SIZE", "256"))
+WS_SLOW_CONSUMER_POLICY = os.getenv("WS_SLOW_CONSUMER_POLICY", "drop_oldest")  # drop_oldest, disconnect
+EVENT_BUFFER_SIZE = int(os.getenv("EVENT_BUFFER_SIZE", "1000"))
+SSE_KEEPALIVE_SECONDS = float(os.getenv("SSE_KEEPALIVE_SECONDS", "15"))
+SSE_REPLAY_LIMIT = int(os.getenv("SSE_REPLAY_LIMIT", "5000"))
+# Detection latency: per-stage samples kept for percentiles, full traces kept for export
+LATENCY_SAMPLE_SIZE = int(os.getenv("LATENCY_SAMPLE_SIZE", "2048"))
+LATENCY_TRACE_BUFFER = int(os.getenv("LATENCY_TRACE_BUFFER", "500"))
+
+# ==================== CACHING ====================
+HONEYFILE_CACHE_SIZE = int(os.getenv("HONEYFILE_CACHE_SIZE", "1024"))
+HONEYFILE_CACHE_TTL_SECONDS = float(os.getenv("HONEYFILE_CACHE_TTL_SECONDS", "300"))
+
+# ==================== GENERATION ====================
+# Stamp per-decoy fields into cached pre-rendered documents instead of rebuilding each file
+HONEYFILE_STAMPING_ENABLED = os.getenv("HONEYFILE_STAMPING_ENABLED", "true").lower() == "true"
+
+# Upper bound for generated spreadsheet datasets (row_count on create requests)
+DATASET_MAX_ROWS = int(os.getenv("DATASET_MAX_ROWS", "1000000"))
+
+# Seeding tries these in order per destination filesystem: reflink, hardlink, copy.
+# Hardlinked copies share one inode, so opening or touching one changes them all; opt in explicitly
+SEED_STRATEGIES = [s.strip() for s in os.getenv("SEED_STRATEGIES", "reflink,copy").split(",") if s.strip()]
+SEED_WORKERS = int(os.getenv("SEED_WORKERS", "8"))
+
+# ==================== BATCH CREATION ====================
+BATCH_WORKERS = int(os.getenv("BATCH_WORKERS", str(min(4, os.cpu_count() or 1))))
+BATCH_MAX_ITEMS = int(os.getenv("BATCH_MAX_ITEMS", "5000"))
+BATCH_INLINE_LIMIT = int(os.getenv("BATCH_INLINE_LIMIT", "10"))
+BATCH_MAX_JOBS = int(os.getenv("BATCH_MAX_JOBS", "100"))
+
+# ==================== CONDITIONAL GET ====================
+# Dashboard stats are cached per table-version snapshot for at most this long,
+# since "last hour" and "today" counts also change with the clock
+DASHBOARD_CACHE_TTL_SECONDS = float(os.getenv("DASHBOARD_CACHE_TTL_SECONDS", "5"))
+
+# ==================== FILE SHARING ====================
+SHARE_STATS_MAX_DAYS = int(os.getenv("SHARE_STATS_MAX_DAYS", "365"))
+SHARE_COUNTER_FLUSH_SECONDS = float(os.getenv("SHARE_COUNTER_FLUSH_SECONDS", "2"))
+
+# ==================== METRICS ====================
+# Request/query latency histograms and the /metrics endpoint
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "true").lower() == "true"
+
+# ==================== PROFILING ====================
+# Admin sampling profiler (/api/admin/profile, X-Profile header); off unless enabled
+PROFILER_ENABLED = os.getenv("PROFILER_ENABLED", "false").lower() == "true"
+PROFILER_MAX_SECONDS = float(os.getenv("PROFILER_MAX_SECONDS", "30"))
+PROFILER_INTERVAL_MS = float(os.getenv("PROFILER_INTERVAL_MS", "5"))
+# Required as X-Admin-Token on /api/admin/*; when unset only loopback clients are allowed
+ADMIN_TOKEN = os.getenv("ADMIN_TOKEN", "")
+
+# ==================== ADMISSION CONTROL ====================
+# Token buckets per client: (requests per second, burst)
+RATE_LIMIT_ENABLED = os.getenv("RATE_LIMIT_ENABLED", "true").lower() == "true"
+RATE_LIMITS = {
+    "share_log_access": (float(os.getenv("RATE_LIMIT_SHARE_LOG_ACCESS_RATE", "20")),
+                         float(os.getenv("RATE_LIMIT_SHARE_LOG_ACCESS_BURST", "50"))),
+    "honeyfile_create": (float(os.getenv("RATE_LIMIT_HONEYFILE_CREATE_RATE", "2")),
+                         float(os.getenv("RATE_LIMIT_HONEYFILE_CREATE_BURST", "10"))),
+    "alert_test": (float(os.getenv("RATE_LIMIT_ALERT_TEST_RATE", "0.2")),
+                   float(os.getenv("RATE_LIMIT_ALERT_TEST_BURST", "3"))),
+}
+RATE_LIMIT_MAX_CLIENTS = int(os.getenv("RATE_LIMIT_MAX_CLIENTS", "10000"))
+# Concurrent DB-writing requests; the reserved slots are left for detection events
+WRITE_CONCURRENCY_LIMIT = int(os.getenv("WRITE_CONCURRENCY_LIMIT", "8"))
+WRITE_RESERVED_FOR_DETECTION = int(os.getenv("WRITE_RESERVED_FOR_DETECTION", "2"))
 
 # ==================== API ====================
 API_HOST = "127.0.0.1"
@@ -34,6 +135,14 @@ API_DEBUG = True
 # ==================== WATERMARKING ====================
 WATERMARK_SEED = "DecoyDNA_Enterprise_v1"
 
-# Create necessary directories
-os.makedirs(HONEYFILES_DIR, exist_ok=True)
-os.makedirs(FORENSIC_LOGS_DIR, exist_ok=True)
+# ==================== DATA DIRECTORIES ====================
+_data_dirs_ready = False
+
+def ensure_data_dirs():
+    """Create the data directories on first use instead of at import"""
+    global _data_dirs_ready
+    if _data_dirs_ready:
+        return
+    os.makedirs(HONEYFILES_DIR, exist_ok=True)
+    os.makedirs(FORENSIC_LOGS_DIR, exist_ok=True)
+    _data_dirs_ready = True
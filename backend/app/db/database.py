@@ -1,34 +1,99 @@
 """
 Database connection and session management
 """
-from sqlalchemy import create_engine, event
+from sqlalchemy import create_engine, event, inspect, text
+from sqlalchemy.engine import make_url
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy.orm import Session, sessionmaker
 from sqlalchemy.pool import StaticPool
 import os
+import time
 
-from app.config.settings import DATABASE_URL
+from app.config.settings import DATABASE_URL, DATABASE_BUSY_TIMEOUT_MS, METRICS_ENABLED, MONITORING_MODE
+from app.db.versions import TableVersions
+from app.utils.metrics import describe_statement, observe_query
 
 # ==================== BASE & MODELS ====================
 Base = declarative_base()
 
 # ==================== ENGINE & SESSION ====================
+_database_file = make_url(DATABASE_URL).database if DATABASE_URL.startswith("sqlite") else None
+_in_memory = _database_file in (None, "", ":memory:")
+
+# Each session gets its own pooled connection, so one thread's rollback can never
+# discard another thread's uncommitted writes. WAL lets readers run alongside the
+# single writer; busy_timeout makes writers wait for the lock instead of failing.
+# Only an in-memory database (one connection or nothing) keeps the shared StaticPool.
 engine = create_engine(
     DATABASE_URL,
-    connect_args={"check_same_thread": False},
-    poolclass=StaticPool,
+    connect_args={"check_same_thread": False, "timeout": DATABASE_BUSY_TIMEOUT_MS / 1000},
+    poolclass=StaticPool if _in_memory else None,
     echo=False,
 )
 
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
-# ==================== SQLITE FOREIGN KEY ENFORCEMENT ====================
+# ==================== SQLITE PRAGMAS ====================
 @event.listens_for(engine, "connect")
 def set_sqlite_pragma(dbapi_conn, connection_record):
     cursor = dbapi_conn.cursor()
     cursor.execute("PRAGMA foreign_keys=ON")
+    if not _in_memory:
+        cursor.execute("PRAGMA journal_mode=WAL")
+        cursor.execute("PRAGMA synchronous=NORMAL")
+    cursor.execute(f"PRAGMA busy_timeout={int(DATABASE_BUSY_TIMEOUT_MS)}")
     cursor.close()
 
+def begin_write(db: Session):
+    """Start the session's transaction with the write lock already held
+    
+    For transactions that read and then write: a deferred SQLite transaction
+    that read an older snapshot cannot be upgraded once another connection
+    has committed, and fails at once instead of waiting for busy_timeout.
+    """
+    db.execute(text("BEGIN IMMEDIATE"))
+
+# ==================== TABLE VERSIONS ====================
+# In daemon mode the daemon and other workers write to the same file too
+table_versions = TableVersions(
+    database_path=None if _in_memory else _database_file,
+    track_external=MONITORING_MODE == "daemon",
+)
+
+@event.listens_for(engine, "after_cursor_execute")
+def _record_written_table(conn, cursor, statement, parameters, context, executemany):
+    operation, table = describe_statement(statement)
+    if operation in ("INSERT", "UPDATE", "DELETE") and table and cursor.rowcount != 0:
+        conn.info.setdefault("written_tables", set()).add(table)
+
+@event.listens_for(engine, "commit")
+def _bump_committed_tables(conn):
+    # Bumped only once the rows are visible, so a version never tags pre-commit data
+    tables = conn.info.pop("written_tables", None)
+    if tables:
+        table_versions.bump(*tables)
+
+@event.listens_for(engine, "rollback")
+def _bump_rolled_back_tables(conn):
+    # Readers sharing the connection may have seen the discarded rows
+    tables = conn.info.pop("written_tables", None)
+    if tables:
+        table_versions.bump(*tables)
+
+# ==================== QUERY METRICS ====================
+if METRICS_ENABLED:
+    @event.listens_for(engine, "before_cursor_execute")
+    def _start_query_timer(conn, cursor, statement, parameters, context, executemany):
+        # Kept on the execution context: the single pooled connection is shared across threads
+        if context is not None:
+            context._query_started = time.perf_counter()
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _record_query(conn, cursor, statement, parameters, context, executemany):
+        started = getattr(context, "_query_started", None)
+        if started is not None:
+            observe_query(statement, time.perf_counter() - started)
+
 # ==================== DEPENDENCY ====================
 def get_db():
     """Get database session for dependency injection"""
@@ -41,3 +106,31 @@ def get_db():
 def init_db():
     """Initialize database tables"""
     Base.metadata.create_all(bind=engine)
+    _ensure_columns()
+    _ensure_indexes()
+
+def _ensure_columns():
+    """Add nullable columns added to models after their tables already existed"""
+    inspector = inspect(engine)
+    with engine.begin() as conn:
+        for table in Base.metadata.sorted_tables:
+            existing = {column["name"] for column in inspector.get_columns(table.name)}
+            for column in table.columns:
+                if column.name in existing or not column.nullable:
+                    continue
+                column_type = column.type.compile(dialect=engine.dialect)
+                conn.execute(text(f'ALTER TABLE "{table.name}" ADD COLUMN "{column.name}" {column_type}'))
+
+# Indexes removed from the models, dropped from databases created while they existed
+_RETIRED_INDEXES = (
+    "ix_share_access_logs_share_id",  # prefix of ix_share_access_logs_share_time
+)
+
+def _ensure_indexes():
+    """Create indexes added to models after their tables already existed, drop retired ones"""
+    for table in Base.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(bind=engine, checkfirst=True)
+    with engine.begin() as conn:
+        for name in _RETIRED_INDEXES:
+            conn.execute(text(f'DROP INDEX IF EXISTS "{name}"'))
@@ -0,0 +1,131 @@
+"""
+Per-table version stamps for conditional GETs
+
+Every committed transaction whose INSERT/UPDATE/DELETE touched rows bumps
+an in-memory counter for each table it wrote (see the hooks in
+app.db.database). Read endpoints build
+an ETag from the counters of the tables they read, so an unchanged
+resource can answer 304 Not Modified without running its queries.
+
+Counters live in this process only. They start from a random boot id so
+ETags from before a restart never match, and writes made by another
+process (the monitoring daemon, other API workers) are picked up through
+SQLite's `PRAGMA data_version` when `track_external` is enabled.
+"""
+import sqlite3
+import threading
+import time
+import uuid
+from email.utils import formatdate
+from typing import Any, Dict, Iterable, Mapping, Optional, Tuple
+
+
+class Validators:
+    """ETag and Last-Modified of one representation"""
+
+    def __init__(self, etag: str, last_modified: float):
+        self.etag = etag
+        self.last_modified = last_modified
+
+    @property
+    def headers(self) -> Dict[str, str]:
+        # no-cache: clients may store the response but must revalidate each time
+        return {
+            "ETag": self.etag,
+            "Last-Modified": formatdate(self.last_modified, usegmt=True),
+            "Cache-Control": "no-cache",
+        }
+
+    def is_fresh(self, request_headers: Mapping[str, str]) -> bool:
+        """True when the client's cached copy is current
+
+        Only If-None-Match is honored. If-Modified-Since has one-second
+        resolution, so a write in the same second as the cached response
+        would still look fresh; the ETag carries the exact table versions.
+        """
+        if_none_match = request_headers.get("if-none-match")
+        if if_none_match is None:
+            return False
+        if if_none_match.strip() == "*":
+            return True
+        # Weak comparison: W/ prefixes are ignored
+        tags = {tag.strip().removeprefix("W/") for tag in if_none_match.split(",")}
+        return self.etag.removeprefix("W/") in tags
+
+
+class TableVersions:
+    """Write counters per table, bumped by the database hooks"""
+
+    def __init__(self, database_path: Optional[str] = None, track_external: bool = False):
+        self.boot_id = uuid.uuid4().hex[:8]
+        self.started_at = time.time()
+        self._versions: Dict[str, int] = {}
+        self._modified: Dict[str, float] = {}
+        self._lock = threading.Lock()
+        self._database_path = database_path
+        self.track_external = track_external and bool(database_path)
+        self._watcher: Optional[sqlite3.Connection] = None
+        self._watcher_lock = threading.Lock()
+        self._external_version = 0
+        self._external_modified = self.started_at
+
+    def bump(self, *tables: str):
+        """Record a write to each table"""
+        now = time.time()
+        with self._lock:
+            for table in tables:
+                self._versions[table] = self._versions.get(table, 0) + 1
+                self._modified[table] = now
+
+    def _external(self) -> Tuple[int, float]:
+        """SQLite's data_version as seen by a dedicated connection
+
+        It changes whenever any other connection commits to the database
+        file, including this process's own engine, so it is only used when
+        other processes write too.
+        """
+        with self._watcher_lock:
+            try:
+                if self._watcher is None:
+                    self._watcher = sqlite3.connect(self._database_path, check_same_thread=False)
+                version = self._watcher.execute("PRAGMA data_version").fetchone()[0]
+            except sqlite3.Error as e:
+                print(f"data_version check failed: {e}")
+                return self._external_version, time.time()
+            if version != self._external_version:
+                self._external_version = version
+                self._external_modified = time.time()
+            return self._external_version, self._external_modified
+
+    def key(self, tables: Iterable[str], *extra: Any) -> Tuple:
+        """Hashable snapshot of the given tables' versions plus extra parts"""
+        tables = tuple(tables)
+        with self._lock:
+            versions = tuple(self._versions.get(table, 0) for table in tables)
+        external = self._external()[0] if self.track_external else 0
+        return (versions, external) + extra
+
+    def validators(self, tables: Iterable[str], *extra: Any, changed_at: Optional[float] = None) -> Validators:
+        """ETag/Last-Modified for a representation built from `tables`
+
+        `extra` covers anything else the body depends on, such as query
+        parameters or a time bucket; `changed_at` is when that last
+        changed (e.g. the bucket's start) and counts toward Last-Modified.
+        """
+        tables = tuple(tables)
+        with self._lock:
+            versions = [self._versions.get(table, 0) for table in tables]
+            modified = max([self._modified.get(table, self.started_at) for table in tables] or [self.started_at])
+        if self.track_external:
+            external, external_modified = self._external()
+            versions.append(external)
+            modified = max(modified, external_modified)
+        if changed_at is not None:
+            modified = max(modified, changed_at)
+        parts = [self.boot_id, ".".join(map(str, versions))] + [str(part) for part in extra]
+        return Validators('W/"' + "-".join(parts) + '"', modified)
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {"boot_id": self.boot_id, "tables": dict(self._versions),
+                    "track_external": self.track_external}
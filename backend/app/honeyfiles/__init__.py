@@ -0,0 +1 @@
+"""Honeyfile generation package"""
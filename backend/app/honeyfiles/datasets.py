@@ -0,0 +1,264 @@
+"""
+Synthetic data for large spreadsheet decoys
+
+Rows are produced a column at a time in batches from a seeded
+random.Random, then streamed into an openpyxl write-only workbook, so
+memory stays flat no matter how many rows a decoy has.
+"""
+import io
+import os
+import random
+import re
+import zipfile
+from datetime import date, datetime, timedelta
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+from xml.sax.saxutils import escape
+
+from openpyxl import Workbook
+from openpyxl.cell import WriteOnlyCell
+from openpyxl.comments import Comment
+from openpyxl.utils import get_column_letter
+
+from app.config.settings import HONEYFILES_DIR, WATERMARK_SEED, ensure_data_dirs
+from app.utils.crypto import HashingWriter, generate_decoy_id, generate_zero_width_watermark
+
+BATCH_ROWS = 10000
+EXCEL_EPOCH = date(1899, 12, 30)
+# Attributes (style, type) of each cell in a rendered row, keyed by column letter
+_SAMPLE_CELL = re.compile(r'<c r="([A-Z]+)\d+"((?: (?!r=)[a-z]+="[^"]*")*)>')
+
+FIRST_NAMES = [
+    "James", "Mary", "Robert", "Patricia", "John", "Jennifer", "Michael", "Linda", "David", "Elizabeth",
+    "William", "Barbara", "Richard", "Susan", "Joseph", "Jessica", "Thomas", "Sarah", "Charles", "Karen",
+    "Christopher", "Lisa", "Daniel", "Nancy", "Matthew", "Betty", "Anthony", "Sandra", "Mark", "Margaret",
+    "Priya", "Wei", "Carlos", "Fatima", "Hiroshi", "Olga", "Ahmed", "Sofia", "Raj", "Mei",
+]
+LAST_NAMES = [
+    "Smith", "Johnson", "Williams", "Brown", "Jones", "Garcia", "Miller", "Davis", "Rodriguez", "Martinez",
+    "Hernandez", "Lopez", "Gonzalez", "Wilson", "Anderson", "Thomas", "Taylor", "Moore", "Jackson", "Martin",
+    "Lee", "Perez", "Thompson", "White", "Harris", "Sanchez", "Clark", "Ramirez", "Lewis", "Robinson",
+    "Patel", "Chen", "Kumar", "Nguyen", "Tanaka", "Ivanova", "Khan", "Rossi", "Singh", "Kim",
+]
+# (department, headcount weight, median base salary, titles)
+DEPARTMENTS = [
+    ("Engineering", 30, 135000, ["Software Engineer", "Senior Engineer", "Staff Engineer", "Engineering Manager"]),
+    ("Sales", 18, 95000, ["Account Executive", "Sales Manager", "Sales Director"]),
+    ("Finance", 8, 110000, ["Financial Analyst", "Controller", "Finance Director"]),
+    ("Human Resources", 6, 85000, ["HR Generalist", "HR Business Partner", "HR Director"]),
+    ("Marketing", 10, 98000, ["Marketing Specialist", "Product Marketing Manager", "Marketing Director"]),
+    ("Operations", 14, 80000, ["Operations Analyst", "Operations Manager"]),
+    ("Legal", 4, 150000, ["Counsel", "Senior Counsel", "General Counsel"]),
+    ("Executive", 1, 320000, ["Vice President", "Chief Financial Officer", "Chief Technology Officer"]),
+]
+SYSTEMS = [
+    "Active Directory", "VPN Gateway", "AWS Console", "Azure Portal", "Oracle DB", "SAP ERP", "Salesforce",
+    "Jenkins", "GitLab", "Payroll Portal", "Backup Server", "Firewall Admin", "Jira", "Confluence", "Okta",
+]
+PROJECT_WORDS = [
+    "Aurora", "Blackbird", "Cobalt", "Daybreak", "Ember", "Falcon", "Glacier", "Helix", "Ironwood", "Jupiter",
+    "Keystone", "Lighthouse", "Monarch", "Nebula", "Orion", "Phoenix", "Quartz", "Redwood", "Sentinel", "Titan",
+]
+PROJECT_STATUSES = ["Planning", "In Progress", "At Risk", "On Hold", "Launched"]
+PASSWORD_WORDS = ["Summer", "Winter", "Welcome", "Company", "Admin", "Secure", "Spring", "Dragon", "Monkey", "Access"]
+
+
+def _random_hex(rng: random.Random, count: int, length: int) -> List[str]:
+    """`count` random hex strings of `length` characters in one call"""
+    size = (count * length + 1) // 2
+    blob = rng.getrandbits(size * 8).to_bytes(size, "big").hex()
+    return [blob[i * length:(i + 1) * length] for i in range(count)]
+
+
+def _names(rng: random.Random, count: int) -> Tuple[List[str], List[str]]:
+    first = rng.choices(FIRST_NAMES, k=count)
+    last = rng.choices(LAST_NAMES, k=count)
+    return first, last
+
+
+def _dates(rng: random.Random, count: int, start: date, days: int) -> List[date]:
+    return [start + timedelta(days=offset) for offset in rng.choices(range(days), k=count)]
+
+
+def _salaries_columns(rng: random.Random, offset: int, count: int) -> List[List[Any]]:
+    departments = rng.choices(DEPARTMENTS, weights=[d[1] for d in DEPARTMENTS], k=count)
+    first, last = _names(rng, count)
+    base = [round(d[2] * rng.lognormvariate(0, 0.18), -2) for d in departments]
+    bonus_rates = rng.choices([0, 0.05, 0.1, 0.15, 0.25], weights=[20, 35, 25, 15, 5], k=count)
+    return [
+        [f"E{100000 + offset + i}" for i in range(count)],
+        [f"{f} {l}" for f, l in zip(first, last)],
+        [f"{f}.{l}@corp.local".lower() for f, l in zip(first, last)],
+        [d[0] for d in departments],
+        [rng.choice(d[3]) for d in departments],
+        base,
+        [round(b * r, -2) for b, r in zip(base, bonus_rates)],
+        _dates(rng, count, date(2010, 1, 1), 5400),
+    ]
+
+
+def _passwords_columns(rng: random.Random, offset: int, count: int) -> List[List[Any]]:
+    first, last = _names(rng, count)
+    words = rng.choices(PASSWORD_WORDS, k=count)
+    numbers = rng.choices(range(10, 10000), k=count)
+    symbols = rng.choices("!@#$%&*", k=count)
+    return [
+        rng.choices(SYSTEMS, k=count),
+        [f"{f[0]}{l}".lower() for f, l in zip(first, last)],
+        [f"{w}{n}{s}" for w, n, s in zip(words, numbers, symbols)],
+        _random_hex(rng, count, 64),
+        _dates(rng, count, date.today() - timedelta(days=720), 720),
+        [f"{f} {l}" for f, l in zip(first, last)],
+    ]
+
+
+def _project_secrets_columns(rng: random.Random, offset: int, count: int) -> List[List[Any]]:
+    first, last = _names(rng, count)
+    codenames = rng.choices(PROJECT_WORDS, k=count)
+    return [
+        [f"PRJ-{2000 + offset + i}" for i in range(count)],
+        [f"Project {c} {rng.randint(1, 99)}" for c in codenames],
+        [round(rng.lognormvariate(13.5, 0.8), -3) for _ in range(count)],
+        rng.choices(PROJECT_STATUSES, weights=[15, 45, 10, 10, 20], k=count),
+        [f"sk_live_{key}" for key in _random_hex(rng, count, 32)],
+        [f"{f} {l}" for f, l in zip(first, last)],
+        _dates(rng, count, date.today(), 540),
+    ]
+
+
+# template_type -> (sheet title, headers, column batch builder)
+DATASETS: Dict[str, Tuple[str, List[str], Callable[[random.Random, int, int], List[List[Any]]]]] = {
+    "salaries": ("Payroll", ["Employee ID", "Name", "Email", "Department", "Title",
+                             "Base Salary", "Bonus", "Start Date"], _salaries_columns),
+    "passwords": ("Credentials", ["System", "Username", "Password", "SHA256",
+                                  "Last Rotated", "Owner"], _passwords_columns),
+    "project_secrets": ("Projects", ["Project ID", "Codename", "Budget", "Status",
+                                     "API Key", "Owner", "Launch Date"], _project_secrets_columns),
+}
+
+
+def generate_rows(template_type: str,
+                  row_count: int,
+                  seed: Optional[int] = None,
+                  batch_rows: int = BATCH_ROWS) -> Iterator[List[tuple]]:
+    """Yield batches of synthetic rows for a template"""
+    if template_type not in DATASETS:
+        raise ValueError(f"No dataset for template type: {template_type}")
+    build_columns = DATASETS[template_type][2]
+    rng = random.Random(seed)
+    for offset in range(0, row_count, batch_rows):
+        count = min(batch_rows, row_count - offset)
+        yield list(zip(*build_columns(rng, offset, count)))
+
+
+def _cell_writers(sample_row: str, sample_values: tuple) -> List[Callable[[int, Any], str]]:
+    """Per-column cell serializers copying the attributes openpyxl used for the sample row"""
+    attributes = dict(_SAMPLE_CELL.findall(sample_row))
+    writers = []
+    for index, value in enumerate(sample_values):
+        column = get_column_letter(index + 1)
+        attrs = attributes.get(column, "")
+        if isinstance(value, str):
+            writers.append(lambda r, v, c=column, a=attrs: f'<c r="{c}{r}"{a}><is><t>{escape(v)}</t></is></c>')
+        elif isinstance(value, date):
+            writers.append(lambda r, v, c=column, a=attrs: f'<c r="{c}{r}"{a}><v>{(v - EXCEL_EPOCH).days}</v></c>')
+        else:
+            writers.append(lambda r, v, c=column, a=attrs: f'<c r="{c}{r}"{a}><v>{v!r}</v></c>')
+    return writers
+
+
+def write_dataset_workbook(out, template_type: str, row_count: int, decoy_id: str,
+                           seed: Optional[int] = None):
+    """Stream a watermarked dataset workbook to a binary file object
+
+    openpyxl (write-only) renders the workbook with the header and the
+    first data row, which fixes the package parts, styles and watermark
+    objects. The remaining rows are serialized in batches straight into
+    the worksheet part while the archive is written, bypassing openpyxl's
+    per-cell objects.
+    """
+    title, headers, _ = DATASETS[template_type]
+    batches = generate_rows(template_type, row_count, seed)
+    first_batch = next(batches, [])
+
+    workbook = Workbook(write_only=True)
+    workbook.properties.keywords = decoy_id
+    workbook.properties.description = f"DecoyDNA:{decoy_id}"
+    sheet = workbook.create_sheet(title)
+
+    # Watermarks: hidden trailing column, header comment, zero-width marks
+    reference_column = len(headers) + 1
+    sheet.column_dimensions[get_column_letter(reference_column)].hidden = True
+    sheet.protection.sheet = True
+
+    header_cells = []
+    for index, header in enumerate(headers):
+        cell = WriteOnlyCell(sheet, value=header + (generate_zero_width_watermark(decoy_id) if index == 0 else ""))
+        if index == 0:
+            cell.comment = Comment(f"Ref {decoy_id}", "IT Administration")
+        header_cells.append(cell)
+    header_cells.append(WriteOnlyCell(sheet, value=decoy_id))
+    sheet.append(header_cells)
+    if first_batch:
+        sheet.append(first_batch[0])
+
+    skeleton = io.BytesIO()
+    workbook.save(skeleton)
+    sheet_part = "xl/worksheets/sheet1.xml"
+
+    with zipfile.ZipFile(skeleton) as source, zipfile.ZipFile(out, "w", zipfile.ZIP_DEFLATED) as target:
+        for info in source.infolist():
+            data = source.read(info)
+            if info.filename != sheet_part or not first_batch:
+                target.writestr(info, data)
+                continue
+
+            xml = data.decode("utf-8")
+            # Row count is known up front, so readers get the used range without a scan
+            dimension = f'<dimension ref="A1:{get_column_letter(reference_column)}{row_count + 1}"/>'
+            xml = xml.replace("<sheetViews>", dimension + "<sheetViews>", 1)
+            sample_start = xml.index('<row r="2"')
+            split = xml.index("</row>", sample_start) + len("</row>")
+            writers = _cell_writers(xml[sample_start:split], first_batch[0])
+            with target.open(zipfile.ZipInfo(info.filename, info.date_time), "w") as part:
+                part.write(xml[:split].encode("utf-8"))
+                row_number = 3
+                for batch in _remaining(first_batch[1:], batches):
+                    chunks = []
+                    for row in batch:
+                        chunks.append(f'<row r="{row_number}">')
+                        chunks.extend(write(row_number, value) for write, value in zip(writers, row))
+                        chunks.append("</row>")
+                        row_number += 1
+                    part.write("".join(chunks).encode("utf-8"))
+                part.write(xml[split:].encode("utf-8"))
+
+
+def _remaining(first: List[tuple], batches: Iterator[List[tuple]]) -> Iterator[List[tuple]]:
+    if first:
+        yield first
+    yield from batches
+
+
+def generate_dataset_honeyfile(file_name: str, template_type: str, row_count: int,
+                               seed: Optional[int] = None) -> Dict[str, Any]:
+    """Create a large XLSX decoy; the result matches HoneyfileGenerator.generate_honeyfile
+
+    The dataset is seeded from the decoy ID unless `seed` is given, so the
+    same rows can be regenerated later for comparison.
+    """
+    ensure_data_dirs()
+    decoy_id = generate_decoy_id(WATERMARK_SEED)
+    file_path = os.path.join(HONEYFILES_DIR, file_name)
+    created_at = datetime.utcnow()
+    with open(file_path, "wb") as f:
+        out = HashingWriter(f)
+        write_dataset_workbook(out, template_type, row_count, decoy_id,
+                               seed if seed is not None else int(decoy_id, 16))
+    return {
+        "decoy_id": decoy_id,
+        "file_path": file_path,
+        "expected_hash": out.hexdigest(),
+        "watermark_techniques": ["metadata", "hidden_column", "cell_comment", "zero_width", "sheet_protection"],
+        "created_at": created_at.isoformat(),
+        "row_count": row_count,
+    }
@@ -0,0 +1,263 @@
+"""
+Planting honeyfile copies into seed locations
+"""
+import errno
+import hashlib
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Set, Tuple
+
+from app.config.settings import SEED_STRATEGIES, SEED_WORKERS
+from app.utils.crypto import calculate_sha256
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+COPY_CHUNK_SIZE = 1024 * 1024
+# Sources up to this size are read once and shared by every copy
+IN_MEMORY_LIMIT = 8 * 1024 * 1024
+# linux/fs.h: _IOW(0x94, 9, int)
+FICLONE = 0x40049409
+# "name (1).docx" ... tried when the destination name is taken
+MAX_NAME_ATTEMPTS = 100
+
+REFLINK = "reflink"
+HARDLINK = "hardlink"
+COPY = "copy"
+
+# Errors meaning "this filesystem cannot do that", not "this path is broken"
+_UNSUPPORTED_ERRNOS = {
+    errno.EXDEV, errno.EOPNOTSUPP, errno.ENOTTY, errno.EINVAL, errno.EPERM, errno.EMLINK,
+    getattr(errno, "ENOTSUP", errno.EOPNOTSUPP), getattr(errno, "ENOSYS", errno.EOPNOTSUPP),
+}
+
+_executor: Optional[ThreadPoolExecutor] = None
+_executor_lock = threading.Lock()
+# (strategy, st_dev) pairs that already failed as unsupported
+_unsupported: Set[Tuple[str, int]] = set()
+
+
+def _get_executor() -> ThreadPoolExecutor:
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=SEED_WORKERS, thread_name_prefix="seed")
+        return _executor
+
+
+def seed_destinations(file_path: str, seed_locations: List[str]) -> List[str]:
+    """Paths a honeyfile is planted at, one per existing seed directory"""
+    source = Path(file_path).resolve()
+    destinations = []
+    seen = set()
+    for seed_dir in seed_locations or []:
+        if not os.path.isdir(seed_dir):
+            continue
+        destination = Path(seed_dir, source.name).resolve()
+        if destination == source or destination in seen:
+            continue
+        seen.add(destination)
+        destinations.append(str(destination))
+    return destinations
+
+
+class _Source:
+    """The file being planted, read at most once for all buffered copies"""
+
+    def __init__(self, file_path: str):
+        self.path = file_path
+        stat = os.stat(file_path)
+        self.size = stat.st_size
+        self.device = stat.st_dev
+        self._data: Optional[bytes] = None
+        self._lock = threading.Lock()
+
+    def data(self) -> Optional[bytes]:
+        """Whole file contents if small enough to share between copies"""
+        if self.size > IN_MEMORY_LIMIT:
+            return None
+        with self._lock:
+            if self._data is None:
+                with open(self.path, "rb") as f:
+                    self._data = f.read()
+            return self._data
+
+
+def _create(destination: str, write: Callable[[str], Any]) -> Tuple[str, Any]:
+    """Create `destination`, or "name (n).ext" next to it if taken; returns (path, write result)
+
+    `write` must create its path exclusively (O_EXCL / link()), so an
+    existing file is never replaced.
+    """
+    stem, extension = os.path.splitext(destination)
+    for attempt in range(MAX_NAME_ATTEMPTS):
+        path = destination if attempt == 0 else f"{stem} ({attempt}){extension}"
+        try:
+            return path, write(path)
+        except FileExistsError:
+            continue
+    raise FileExistsError(errno.EEXIST, "No free name for the copy", destination)
+
+
+def _reflink(source: _Source, destination: str) -> Tuple[str, Any]:
+    if fcntl is None:
+        raise OSError(errno.EOPNOTSUPP, "reflinks need fcntl")
+
+    def write(path: str):
+        try:
+            with open(source.path, "rb") as src, open(path, "xb") as dst:
+                fcntl.ioctl(dst.fileno(), FICLONE, src.fileno())
+        except FileExistsError:
+            raise
+        except OSError:
+            _remove_quietly(path)
+            raise
+
+    return _create(destination, write)
+
+
+def _hardlink(source: _Source, destination: str) -> Tuple[str, Any]:
+    return _create(destination, lambda path: os.link(source.path, path))
+
+
+def _copy(source: _Source, destination: str) -> Tuple[str, int]:
+    data = source.data()
+
+    def write(path: str) -> int:
+        written = 0
+        try:
+            with open(path, "xb") as dst:
+                if data is not None:
+                    return dst.write(data)
+                with open(source.path, "rb") as src:
+                    for chunk in iter(lambda: src.read(COPY_CHUNK_SIZE), b""):
+                        written += dst.write(chunk)
+                return written
+        except FileExistsError:
+            raise
+        except OSError:
+            _remove_quietly(path)
+            raise
+
+    return _create(destination, write)
+
+
+def _remove_quietly(path: str):
+    try:
+        os.remove(path)
+    except OSError:
+        pass
+
+
+def _plant_one(source: _Source, destination: str, strategies: List[str]) -> Tuple[str, str, int]:
+    """Plant one copy with the first strategy the destination filesystem supports
+
+    Returns (path planted at, strategy, bytes written).
+    """
+    device = os.stat(os.path.dirname(destination)).st_dev
+    for strategy in strategies:
+        if strategy == COPY:
+            break
+        if (strategy, device) in _unsupported:
+            continue
+        if strategy == HARDLINK and device != source.device:
+            continue
+        try:
+            if strategy == REFLINK:
+                path, _ = _reflink(source, destination)
+            elif strategy == HARDLINK:
+                path, _ = _hardlink(source, destination)
+            else:
+                continue
+            return path, strategy, 0
+        except OSError as e:
+            if e.errno not in _UNSUPPORTED_ERRNOS:
+                raise
+            _unsupported.add((strategy, device))
+    path, written = _copy(source, destination)
+    return path, COPY, written
+
+
+def _attempt(source: _Source, destination: str, strategies: List[str]):
+    try:
+        return _plant_one(source, destination, strategies)
+    except OSError as e:
+        return e
+
+
+def _attempt_all(source: _Source, destinations: List[str], strategies: List[str]) -> list:
+    return [_attempt(source, destination, strategies) for destination in destinations]
+
+
+def remove_copies(paths: List[str]):
+    """Delete planted copies whose honeyfile was never recorded"""
+    for path in paths:
+        try:
+            os.unlink(path)
+        except FileNotFoundError:
+            pass
+        except OSError as e:
+            print(f"Could not remove planted copy {path}: {e}")
+
+
+def plant_copies(file_path: str,
+                 seed_locations: List[str],
+                 expected_hash: Optional[str] = None,
+                 strategies: Optional[List[str]] = None) -> Dict[str, Any]:
+    """Plant a honeyfile into each seed directory
+
+    Each destination is reflinked (FICLONE) or hardlinked where its
+    filesystem supports it and otherwise gets a buffered copy of the
+    source, which is read from disk once and shared. Directories are
+    seeded concurrently. A file already at the destination is never
+    replaced; the copy goes to "name (1).ext" and so on instead. All copies are byte-identical, so they share the
+    honeyfile's expected_hash; it is only computed here when not given.
+    """
+    started = time.perf_counter()
+    strategies = strategies or SEED_STRATEGIES
+    destinations = seed_destinations(file_path, seed_locations)
+    source = _Source(file_path)
+
+    if expected_hash is None:
+        data = source.data()
+        expected_hash = hashlib.sha256(data).hexdigest() if data is not None else calculate_sha256(file_path)
+
+    planted: List[str] = []
+    errors: List[Dict[str, str]] = []
+    methods = {REFLINK: 0, HARDLINK: 0, COPY: 0}
+    bytes_written = 0
+
+    if len(destinations) <= 1:
+        outcomes = [_attempt(source, destination, strategies) for destination in destinations]
+    else:
+        # A few large chunks per worker keep executor overhead off the per-file path
+        executor = _get_executor()
+        chunk_size = max(1, -(-len(destinations) // (SEED_WORKERS * 4)))
+        futures = [
+            executor.submit(_attempt_all, source, destinations[i:i + chunk_size], strategies)
+            for i in range(0, len(destinations), chunk_size)
+        ]
+        outcomes = [outcome for future in futures for outcome in future.result()]
+
+    for destination, outcome in zip(destinations, outcomes):
+        if isinstance(outcome, OSError):
+            errors.append({"path": destination, "error": str(outcome)})
+            continue
+        path, method, written = outcome
+        methods[method] += 1
+        bytes_written += written
+        planted.append(path)
+
+    return {
+        "planted": planted,
+        "expected_hash": expected_hash,
+        "bytes_written": bytes_written,
+        "methods": methods,
+        "seconds": round(time.perf_counter() - started, 6),
+        "errors": errors,
+    }
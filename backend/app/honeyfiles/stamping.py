@@ -0,0 +1,575 @@
+"""
+Template-stamping honeyfile generation
+
+Between two decoys of the same file type and template only the decoy ID,
+its zero-width watermark and a handful of timestamps differ. The stamping
+generator renders each (file_type, template_type) with the full generator
+once, splits every document part around those per-decoy fields, and then
+creates new decoys by filling the fields in and streaming the archive or
+PDF straight to disk. Templates it cannot stamp safely fall back to full
+generation.
+"""
+import base64
+import hashlib
+import io
+import logging
+import os
+import re
+import struct
+import threading
+import uuid
+import zipfile
+import zlib
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+from app.config.settings import WATERMARK_SEED, ensure_data_dirs
+from app.utils.crypto import HashingWriter, generate_decoy_id, generate_zero_width_watermark
+
+logger = logging.getLogger(__name__)
+
+Field = Tuple[Any, ...]
+
+# Keys of a generator result that are produced per decoy
+_PER_DECOY_KEYS = ("decoy_id", "file_path", "expected_hash", "created_at")
+
+_FIELD_ENCODINGS = ("utf-8", "utf-16-be")
+_TIMESTAMP_PATTERN = rb"\d{4}-\d\d-\d\dT\d\d:\d\d:\d\d(?:\.\d{1,6})?|D:\d{14}"
+# Timestamps further than this from the render time are template content
+_TIMESTAMP_WINDOW = timedelta(days=1)
+_ZIP32_LIMIT = 0xFFFFFFFF
+
+
+class Unstampable(Exception):
+    """Raised when a rendered document cannot be turned into a skeleton"""
+
+
+def _round_offset(delta: timedelta) -> int:
+    """Round a clock offset to whole quarter hours (time zones), in minutes"""
+    return int(round(delta.total_seconds() / 900.0)) * 15
+
+
+def _parse_timestamp(text: bytes) -> Optional[datetime]:
+    try:
+        if text.startswith(b"D:"):
+            return datetime.strptime(text[2:].decode("ascii"), "%Y%m%d%H%M%S")
+        return datetime.fromisoformat(text.decode("ascii"))
+    except ValueError:
+        return None
+
+
+def _parse_created_at(value: Any) -> Optional[datetime]:
+    if isinstance(value, datetime):
+        return value.replace(tzinfo=None)
+    try:
+        return datetime.fromisoformat(str(value)).replace(tzinfo=None)
+    except ValueError:
+        return None
+
+
+class _Template:
+    """Byte chunks with per-decoy fields between them"""
+    __slots__ = ("chunks", "fields")
+
+    def __init__(self, chunks: List[bytes], fields: List[Field]):
+        self.chunks = chunks
+        self.fields = fields
+
+    def render(self, values: Dict[Field, bytes]) -> bytes:
+        if not self.fields:
+            return self.chunks[0]
+        parts = [self.chunks[0]]
+        for field, chunk in zip(self.fields, self.chunks[1:]):
+            parts.append(values[field])
+            parts.append(chunk)
+        return b"".join(parts)
+
+    def __eq__(self, other) -> bool:
+        return isinstance(other, _Template) and self.chunks == other.chunks and self.fields == other.fields
+
+    def __hash__(self) -> int:
+        return hash((tuple(self.chunks), tuple(self.fields)))
+
+
+class _FieldScanner:
+    """Split rendered bytes around one decoy's ID, watermark and timestamps"""
+
+    def __init__(self, decoy_id: str, rendered_at: datetime):
+        self.rendered_at = rendered_at
+        self.literals: Dict[bytes, Field] = {}
+        watermark = generate_zero_width_watermark(decoy_id)
+        # The watermark goes first so its embedded letters are never split off
+        for value, kind in ((watermark, "watermark"), (decoy_id, "decoy")):
+            for encoding in _FIELD_ENCODINGS:
+                self.literals[value.encode(encoding)] = (kind, encoding)
+        alternatives = [re.escape(literal) for literal in self.literals] + [_TIMESTAMP_PATTERN]
+        self.pattern = re.compile(b"|".join(alternatives))
+        self.fields: Set[Field] = set()
+
+    def template(self, data: bytes) -> _Template:
+        chunks: List[bytes] = []
+        fields: List[Field] = []
+        last = 0
+        for match in self.pattern.finditer(data):
+            text = match.group()
+            field = self.literals.get(text) or self._timestamp_field(text)
+            if field is None:
+                continue
+            chunks.append(data[last:match.start()])
+            fields.append(field)
+            last = match.end()
+        chunks.append(data[last:])
+        self.fields.update(fields)
+        return _Template(chunks, fields)
+
+    def _timestamp_field(self, text: bytes) -> Optional[Field]:
+        timestamp = _parse_timestamp(text)
+        if timestamp is None:
+            return None
+        timestamp = timestamp.replace(tzinfo=None)
+        if abs(timestamp - self.rendered_at) > _TIMESTAMP_WINDOW:
+            return None
+        kind = "pdf" if text.startswith(b"D:") else "iso"
+        return ("time", kind, len(text), _round_offset(timestamp - self.rendered_at))
+
+    def time_offset(self, value: datetime) -> Optional[int]:
+        """Offset of a non-textual timestamp (zip entry dates) if it is per decoy"""
+        if abs(value - self.rendered_at) > _TIMESTAMP_WINDOW:
+            return None
+        return _round_offset(value - self.rendered_at)
+
+
+def _field_values(fields: Set[Field], decoy_id: str, created: datetime) -> Dict[Field, bytes]:
+    """Bytes to fill into each field for one decoy"""
+    watermark = generate_zero_width_watermark(decoy_id)
+    values: Dict[Field, bytes] = {}
+    for field in fields:
+        if field[0] == "decoy":
+            values[field] = decoy_id.encode(field[1])
+        elif field[0] == "watermark":
+            values[field] = watermark.encode(field[1])
+        else:
+            _, kind, length, offset = field
+            timestamp = created + timedelta(minutes=offset)
+            if kind == "pdf":
+                values[field] = timestamp.strftime("D:%Y%m%d%H%M%S").encode("ascii")
+            else:
+                values[field] = timestamp.strftime("%Y-%m-%dT%H:%M:%S.%f")[:length].encode("ascii")
+    return values
+
+
+# ==================== ZIP (DOCX / XLSX) ====================
+_LOCAL_HEADER = struct.Struct("<4s2B4HL2L2H")
+_CENTRAL_HEADER = struct.Struct("<4s4B4HL2L5H2L")
+_END_RECORD = struct.Struct("<4s4H2LH")
+
+
+def _dos_datetime(value: Tuple[int, ...]) -> Tuple[int, int]:
+    year, month, day, hour, minute, second = value[:6]
+    return (hour << 11 | minute << 5 | second // 2), ((year - 1980) << 9 | month << 5 | day)
+
+
+class _ZipSkeleton:
+    """Office Open XML archive split into constant and stamped entries
+
+    Constant entries keep their original compressed bytes and are copied
+    as-is; only parts holding decoy fields are re-deflated per decoy.
+    """
+
+    def __init__(self, data: bytes, scanner: _FieldScanner):
+        self.entries: List[Tuple[zipfile.ZipInfo, _Template, Optional[bytes], Optional[int]]] = []
+        with zipfile.ZipFile(io.BytesIO(data)) as archive:
+            self.comment = archive.comment
+            for info in archive.infolist():
+                if info.flag_bits & 0x1:
+                    raise Unstampable("encrypted archive entry")
+                if info.compress_type not in (zipfile.ZIP_STORED, zipfile.ZIP_DEFLATED):
+                    raise Unstampable(f"unsupported compression {info.compress_type}")
+                if info.file_size >= _ZIP32_LIMIT or info.compress_size >= _ZIP32_LIMIT:
+                    raise Unstampable("zip64 archive")
+                template = scanner.template(archive.read(info))
+                raw = None if template.fields else self._raw_data(data, info)
+                time_offset = scanner.time_offset(datetime(*info.date_time))
+                self.entries.append((info, template, raw, time_offset))
+        if len(self.entries) >= 0xFFFF:
+            raise Unstampable("too many archive entries")
+
+    @staticmethod
+    def _raw_data(data: bytes, info: zipfile.ZipInfo) -> bytes:
+        header = _LOCAL_HEADER.unpack_from(data, info.header_offset)
+        start = info.header_offset + _LOCAL_HEADER.size + header[10] + header[11]
+        return data[start:start + info.compress_size]
+
+    def signature(self) -> List[Any]:
+        return [(info.filename, template, time_offset) for info, template, _, time_offset in self.entries]
+
+    def write(self, out, values: Dict[Field, bytes], created: datetime):
+        offset = 0
+        central: List[bytes] = []
+        for info, template, raw, time_offset in self.entries:
+            if raw is None:
+                content = template.render(values)
+                crc = zlib.crc32(content)
+                size = len(content)
+                if info.compress_type == zipfile.ZIP_DEFLATED:
+                    compressor = zlib.compressobj(6, zlib.DEFLATED, -15)
+                    payload = compressor.compress(content) + compressor.flush()
+                else:
+                    payload = content
+            else:
+                crc, size, payload = info.CRC, info.file_size, raw
+
+            if time_offset is None:
+                date_time = info.date_time
+            else:
+                date_time = (created + timedelta(minutes=time_offset)).timetuple()
+            dos_time, dos_date = _dos_datetime(date_time)
+
+            try:
+                name = info.filename.encode("ascii")
+                flags = info.flag_bits & ~0x808
+            except UnicodeEncodeError:
+                name = info.filename.encode("utf-8")
+                flags = (info.flag_bits & ~0x8) | 0x800
+
+            header = _LOCAL_HEADER.pack(
+                b"PK\x03\x04", info.extract_version, info.reserved, flags, info.compress_type,
+                dos_time, dos_date, crc, len(payload), size, len(name), len(info.extra)
+            )
+            out.write(header)
+            out.write(name)
+            out.write(info.extra)
+            out.write(payload)
+
+            central.append(_CENTRAL_HEADER.pack(
+                b"PK\x01\x02", info.create_version, info.create_system, info.extract_version,
+                info.reserved, flags, info.compress_type, dos_time, dos_date, crc, len(payload), size,
+                len(name), len(info.extra), len(info.comment), 0, info.internal_attr,
+                info.external_attr, offset
+            ) + name + info.extra + info.comment)
+            offset += len(header) + len(name) + len(info.extra) + len(payload)
+
+        directory = b"".join(central)
+        out.write(directory)
+        out.write(_END_RECORD.pack(
+            b"PK\x05\x06", 0, 0, len(central), len(central), len(directory), offset, len(self.comment)
+        ))
+        out.write(self.comment)
+
+
+# ==================== PDF ====================
+_PDF_OBJECT = re.compile(rb"(\d+)\s+(\d+)\s+obj\b")
+_PDF_LENGTH = re.compile(rb"/Length\s+(\d+)(?!\s+\d+\s+R)")
+_PDF_FILTER = re.compile(rb"/Filter\s*(\[[^\]]*\]|/[A-Za-z0-9]+)")
+_PDF_STREAM_END = re.compile(rb"\s*endstream\s*endobj")
+_PDF_TRAILER = re.compile(rb"trailer\s*(<<.*>>)\s*startxref", re.DOTALL)
+_PDF_ID = re.compile(rb"\s*/ID\s*\[[^\]]*\]")
+
+
+def _decode_stream(raw: bytes, filters: List[bytes]) -> Optional[bytes]:
+    """Undo ASCII85/Flate filters; None for anything else"""
+    for name in filters:
+        if name == b"/FlateDecode":
+            raw = zlib.decompress(raw)
+        elif name == b"/ASCII85Decode":
+            raw = raw.strip()
+            if raw.startswith(b"<~"):
+                raw = raw[2:]
+            if raw.endswith(b"~>"):
+                raw = raw[:-2]
+            raw = base64.a85decode(raw)
+        else:
+            return None
+    return raw
+
+
+class _PdfObject:
+    """One indirect object, kept verbatim unless it holds decoy fields"""
+    __slots__ = ("number", "generation", "verbatim", "head", "body", "compress", "signature")
+
+    def __init__(self, number: int, generation: int, verbatim: bytes,
+                 head: Optional[_Template] = None, body: Optional[_Template] = None,
+                 compress: bool = False, signature: Any = None):
+        self.number = number
+        self.generation = generation
+        self.verbatim = verbatim
+        self.head = head
+        self.body = body
+        self.compress = compress
+        self.signature = signature
+
+    def render(self, values: Dict[Field, bytes]) -> bytes:
+        if self.body is None:
+            return self.head.render(values) if self.head is not None else self.verbatim
+        content = self.body.render(values)
+        head = self.head.render(values)
+        if self.compress:
+            content = zlib.compress(content)
+            head = _PDF_FILTER.sub(b"/Filter /FlateDecode", head, count=1)
+        head = _PDF_LENGTH.sub(b"/Length %d" % len(content), head, count=1)
+        return head + b"stream\n" + content + b"\nendstream\nendobj"
+
+
+class _PdfSkeleton:
+    """Classic-xref PDF split into objects; the xref table is rebuilt per decoy"""
+
+    def __init__(self, data: bytes, scanner: _FieldScanner):
+        if data.count(b"startxref") != 1 or b"/ObjStm" in data or b"/XRef" in data:
+            raise Unstampable("incremental updates or cross-reference streams")
+        first = _PDF_OBJECT.search(data)
+        if first is None:
+            raise Unstampable("no PDF objects")
+        self.header = data[:first.start()]
+        self.objects: List[_PdfObject] = []
+
+        position = first.start()
+        while True:
+            position = self._skip_filler(data, position)
+            match = _PDF_OBJECT.match(data, position)
+            if match is None:
+                break
+            pdf_object, position = self._parse_object(data, match, scanner)
+            self.objects.append(pdf_object)
+
+        trailer = _PDF_TRAILER.search(data, position)
+        if trailer is None:
+            raise Unstampable("missing trailer")
+        trailer_dict = trailer.group(1)
+        self.has_id = _PDF_ID.search(trailer_dict) is not None
+        self.trailer = scanner.template(_PDF_ID.sub(b"", trailer_dict))
+        self.size = max(pdf_object.number for pdf_object in self.objects) + 1
+
+    @staticmethod
+    def _skip_filler(data: bytes, position: int) -> int:
+        while position < len(data):
+            if data[position:position + 1].isspace():
+                position += 1
+            elif data[position:position + 1] == b"%":
+                end = data.find(b"\n", position)
+                position = len(data) if end == -1 else end + 1
+            else:
+                break
+        return position
+
+    @staticmethod
+    def _parse_object(data: bytes, match, scanner: _FieldScanner) -> Tuple[_PdfObject, int]:
+        number, generation = int(match.group(1)), int(match.group(2))
+        start = match.start()
+        end_object = data.find(b"endobj", match.end())
+        stream = data.find(b"stream", match.end())
+        if end_object == -1:
+            raise Unstampable(f"object {number} is not terminated")
+
+        if stream == -1 or stream > end_object:
+            end = end_object + len(b"endobj")
+            template = scanner.template(data[start:end])
+            head = template if template.fields else None
+            return _PdfObject(number, generation, data[start:end], head=head, signature=template), end
+
+        head_bytes = data[start:stream]
+        length = _PDF_LENGTH.search(head_bytes)
+        if length is None:
+            raise Unstampable(f"object {number} has an indirect stream length")
+        content_start = stream + len(b"stream")
+        if data[content_start:content_start + 2] == b"\r\n":
+            content_start += 2
+        elif data[content_start:content_start + 1] in (b"\n", b"\r"):
+            content_start += 1
+        raw = data[content_start:content_start + int(length.group(1))]
+        tail = _PDF_STREAM_END.match(data, content_start + len(raw))
+        if tail is None:
+            raise Unstampable(f"object {number} has a bad stream length")
+        end = tail.end()
+
+        filter_spec = _PDF_FILTER.search(head_bytes)
+        filters = re.findall(rb"/[A-Za-z0-9]+", filter_spec.group(1)) if filter_spec else []
+        decoded = None if b"/DecodeParms" in head_bytes else _decode_stream(raw, filters)
+        if decoded is None:
+            template = scanner.template(data[start:end])
+            if template.fields:
+                raise Unstampable(f"object {number} holds decoy fields in an opaque stream")
+            return _PdfObject(number, generation, data[start:end], signature=template), end
+
+        head = scanner.template(head_bytes)
+        body = scanner.template(decoded)
+        # The encoded length differs between renders even when the content does not
+        signature = (scanner.template(_PDF_LENGTH.sub(b"/Length", head_bytes, count=1)), body)
+        pdf_object = _PdfObject(number, generation, data[start:end], signature=signature)
+        if head.fields or body.fields:
+            pdf_object.head = head
+            pdf_object.body = body
+            pdf_object.compress = bool(filters)
+        return pdf_object, end
+
+    def signature(self) -> List[Any]:
+        return [self.header, self.trailer, self.has_id] + [
+            (pdf_object.number, pdf_object.generation, pdf_object.signature) for pdf_object in self.objects
+        ]
+
+    def write(self, out, values: Dict[Field, bytes], created: datetime):
+        out.write(self.header)
+        offset = len(self.header)
+        offsets: Dict[int, Tuple[int, int]] = {}
+        for pdf_object in self.objects:
+            rendered = pdf_object.render(values) + b"\n"
+            offsets[pdf_object.number] = (offset, pdf_object.generation)
+            out.write(rendered)
+            offset += len(rendered)
+
+        xref = [b"xref\n0 %d\n" % self.size, b"0000000000 65535 f \n"]
+        for number in range(1, self.size):
+            if number in offsets:
+                xref.append(b"%010d %05d n \n" % offsets[number])
+            else:
+                xref.append(b"0000000000 00000 f \n")
+        out.write(b"".join(xref))
+
+        trailer = re.sub(rb"/Size\s+\d+", b"/Size %d" % self.size, self.trailer.render(values), count=1)
+        if self.has_id:
+            document_id = hashlib.md5(values[("decoy", "utf-8")] + created.isoformat().encode()).hexdigest()
+            trailer = trailer[:trailer.rfind(b">>")] + b" /ID [<%s> <%s>] >>" % (
+                document_id.encode("ascii"), document_id.encode("ascii")
+            )
+        out.write(b"trailer\n" + trailer + b"\nstartxref\n%d\n%%%%EOF\n" % offset)
+
+
+# ==================== GENERATOR ====================
+class _Skeleton:
+    """Pre-rendered (file_type, template_type) ready for stamping"""
+
+    def __init__(self, document, fields: Set[Field], output_dir: str,
+                 created_offset: int, result_template: Dict[str, Any]):
+        self.document = document
+        self.fields = fields | {("decoy", "utf-8")}
+        self.output_dir = output_dir
+        self.created_offset = created_offset
+        self.result_template = result_template
+
+    def stamp(self, file_path: str, decoy_id: str) -> Tuple[datetime, str]:
+        """Write one decoy to `file_path`; return its creation time and SHA256"""
+        created = datetime.utcnow() + timedelta(minutes=self.created_offset)
+        values = _field_values(self.fields, decoy_id, created)
+        with open(file_path, "wb") as f:
+            out = HashingWriter(f)
+            self.document.write(out, values, created)
+        return created, out.hexdigest()
+
+
+class StampingHoneyfileGenerator:
+    """Drop-in HoneyfileGenerator that stamps cached skeletons
+
+    The first request for a (file_type, template_type) renders it twice
+    with the wrapped generator. The skeleton is only used when both
+    renders are identical once their decoy fields are taken out, so any
+    per-decoy content the stamper does not know about forces full
+    generation instead of being silently copied.
+    """
+
+    def __init__(self, generator):
+        self.generator = generator
+        self._skeletons: Dict[Tuple[str, str], Optional[_Skeleton]] = {}
+        self._lock = threading.Lock()
+        self.stamped = 0
+        self.fallbacks = 0
+
+    def generate_honeyfile(self, file_name: str, file_type: str, template_type: str) -> Dict[str, Any]:
+        """Generate a honeyfile, stamping a cached skeleton when possible"""
+        skeleton = self._get_skeleton(file_type, template_type)
+        if skeleton is not None:
+            decoy_id = generate_decoy_id(WATERMARK_SEED)
+            file_path = os.path.join(skeleton.output_dir, file_name)
+            try:
+                created, expected_hash = skeleton.stamp(file_path, decoy_id)
+            except Exception as e:
+                logger.warning(f"Stamping {file_type}/{template_type} failed, regenerating: {e}")
+            else:
+                self.stamped += 1
+                result = dict(skeleton.result_template)
+                result.update({
+                    "decoy_id": decoy_id,
+                    "file_path": file_path,
+                    "expected_hash": expected_hash,
+                    "created_at": created.isoformat(),
+                })
+                return result
+
+        self.fallbacks += 1
+        return self.generator.generate_honeyfile(file_name, file_type, template_type)
+
+    def _get_skeleton(self, file_type: str, template_type: str) -> Optional[_Skeleton]:
+        key = (file_type, template_type)
+        if key in self._skeletons:
+            return self._skeletons[key]
+        with self._lock:
+            if key not in self._skeletons:
+                self._skeletons[key] = self._build_skeleton(file_type, template_type)
+            return self._skeletons[key]
+
+    def _build_skeleton(self, file_type: str, template_type: str) -> Optional[_Skeleton]:
+        try:
+            renders = [self._render(file_type, template_type) for _ in range(2)]
+            parsed = [self._parse(data, result, started) for result, data, started in renders]
+            (first, fields, created_offset), (second, _, _) = parsed
+            if first.signature() != second.signature():
+                raise Unstampable("renders differ outside the decoy fields")
+            if not any(field[0] == "decoy" for field in fields):
+                raise Unstampable("decoy ID not found in the document")
+        except Unstampable as e:
+            logger.info(f"Full generation for {file_type}/{template_type}: {e}")
+            return None
+        except Exception as e:
+            logger.warning(f"Could not build {file_type}/{template_type} skeleton: {e}")
+            return None
+
+        result = renders[0][0]
+        result_template = {key: value for key, value in result.items() if key not in _PER_DECOY_KEYS}
+        return _Skeleton(first, fields, os.path.dirname(result["file_path"]), created_offset, result_template)
+
+    def _render(self, file_type: str, template_type: str) -> Tuple[Dict[str, Any], bytes, datetime]:
+        name = f".skeleton-{uuid.uuid4().hex}.{file_type}"
+        started = datetime.utcnow()
+        result = self.generator.generate_honeyfile(name, file_type, template_type)
+        try:
+            with open(result["file_path"], "rb") as f:
+                data = f.read()
+        finally:
+            os.remove(result["file_path"])
+        if os.path.basename(result["file_path"]) != name:
+            raise Unstampable("generator does not keep the requested file name")
+        return result, data, started
+
+    @staticmethod
+    def _parse(data: bytes, result: Dict[str, Any], started: datetime):
+        rendered_at = _parse_created_at(result.get("created_at")) or started
+        scanner = _FieldScanner(result["decoy_id"], rendered_at)
+        if data.startswith(b"PK\x03\x04"):
+            document = _ZipSkeleton(data, scanner)
+        elif data.startswith(b"%PDF"):
+            document = _PdfSkeleton(data, scanner)
+        else:
+            raise Unstampable("unknown document format")
+        return document, scanner.fields, _round_offset(rendered_at - started)
+
+    def clear(self):
+        """Drop cached skeletons, e.g. after templates change"""
+        with self._lock:
+            self._skeletons.clear()
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get stamping counters and which templates are stamped"""
+        return {
+            "stamped": self.stamped,
+            "fallbacks": self.fallbacks,
+            "skeletons": {
+                f"{file_type}/{template_type}": skeleton is not None
+                for (file_type, template_type), skeleton in self._skeletons.items()
+            },
+        }
+
+
+def create_honeyfile_generator(stamping: bool = True):
+    """Build the generator used by the services"""
+    from app.honeyfiles.generator import HoneyfileGenerator
+    ensure_data_dirs()
+    generator = HoneyfileGenerator()
+    return StampingHoneyfileGenerator(generator) if stamping else generator
@@ -3,18 +3,29 @@ Main FastAPI application for DecoyDNA
 """
 from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, PlainTextResponse
+import asyncio
 import logging
 from contextlib import asynccontextmanager
 
-from app.config.settings import API_HOST, API_PORT, API_DEBUG
-from app.db.database import init_db
+from app.config.settings import (
+    API_HOST, API_PORT, API_DEBUG, METRICS_ENABLED,
+    PROFILER_ENABLED, PROFILER_INTERVAL_MS, PROFILER_MAX_SECONDS, ADMIN_TOKEN, ensure_data_dirs
+)
+from app.utils.metrics import MetricsMiddleware, render_metrics
+from app.utils.profiler import RequestProfileMiddleware, profiler_service
+from app.db.database import init_db, SessionLocal, begin_write
 
 # Import all models to register with Base (must be after database import)
 from app.models.database_models import Honeyfile, AccessEvent, AlertSetting
-from app.models.file_sharing import FileShare, ShareAccessLog
+from app.models.file_sharing import (
+    FileShare, ShareAccessLog, ShareAccessDailyRollup, ShareUserMember, ShareGroupMember
+)
+from app.services.file_sharing import FileShareService, share_access_counter
 
 from app.api import routes
+from app.services.business import AlertService, event_pipeline
+from app.services.batch import batch_service
 
 # Configure logging
 logging.basicConfig(
@@ -24,16 +35,46 @@ logging.basicConfig(
 logger = logging.getLogger(__name__)
 
 # ==================== LIFESPAN ====================
+def migrate_share_data(db):
+    """Backfill rollups, migrate legacy memberships and reconcile counters
+    
+    Several workers may start at once, so each step takes the database
+    write lock before it looks; the workers after the first find the work
+    already done.
+    """
+    begin_write(db)
+    if FileShareService.ensure_share_rollups(db):
+        logger.info("Share access rollups rebuilt from access logs")
+    db.commit()
+    begin_write(db)
+    if FileShareService.migrate_legacy_memberships(db):
+        logger.info("Legacy share memberships migrated")
+    db.commit()
+    share_access_counter.reconcile(db)
+
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     """Application lifespan events"""
     # Startup
     logger.info("DecoyDNA API starting up...")
+    ensure_data_dirs()
     init_db()
     logger.info("Database initialized")
+    db = SessionLocal()
+    try:
+        migrate_share_data(db)
+    finally:
+        db.close()
+    share_access_counter.start()
+    event_pipeline.attach(asyncio.get_running_loop())
+    await AlertService.start_clients()
     yield
     # Shutdown
     logger.info("DecoyDNA API shutting down...")
+    await event_pipeline.detach()
+    await AlertService.close_clients()
+    share_access_counter.stop()
+    batch_service.shutdown()
 
 # ==================== APPLICATION ====================
 app = FastAPI(
@@ -51,6 +92,16 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+if METRICS_ENABLED:
+    app.add_middleware(MetricsMiddleware)
+if PROFILER_ENABLED:
+    app.add_middleware(
+        RequestProfileMiddleware,
+        service=profiler_service,
+        interval=PROFILER_INTERVAL_MS / 1000,
+        max_seconds=PROFILER_MAX_SECONDS,
+        admin_token=ADMIN_TOKEN
+    )
 
 # ==================== ERROR HANDLERS ====================
 @app.exception_handler(Exception)
@@ -75,6 +126,15 @@ async def root():
         "openapi": "/openapi.json"
     }
 
+# ==================== METRICS ====================
+@app.get("/metrics", response_class=PlainTextResponse, include_in_schema=False)
+async def metrics():
+    """Prometheus text-format metrics"""
+    if not METRICS_ENABLED:
+        return PlainTextResponse("Metrics are disabled\n", status_code=404)
+    text = await asyncio.to_thread(render_metrics)
+    return PlainTextResponse(text, media_type="text/plain; version=0.0.4; charset=utf-8")
+
 # ==================== RUN ====================
 if __name__ == "__main__":
     import uvicorn
@@ -1,7 +1,7 @@
 """
 SQLAlchemy ORM models for DecoyDNA
 """
-from sqlalchemy import Column, String, DateTime, Text, Integer, JSON
+from sqlalchemy import Column, String, DateTime, Text, Integer, JSON, Index, text
 from sqlalchemy.sql import func
 from datetime import datetime
 import uuid
@@ -26,6 +26,10 @@ class Honeyfile(Base):
 class AccessEvent(Base):
     """Model for file access events captured by monitoring engine"""
     __tablename__ = "access_events"
+    # Partial: only events still waiting for their summary alert are indexed
+    __table_args__ = (Index("ix_access_events_aggregated", "timestamp",
+                            sqlite_where=text("alert_sent = 'aggregated'"),
+                            postgresql_where=text("alert_sent = 'aggregated'")),)
 
     id = Column(String(36), primary_key=True, default=lambda: str(uuid.uuid4()))
     decoy_id = Column(String(64), nullable=False, index=True)
@@ -41,7 +45,8 @@ class AccessEvent(Base):
     file_hash = Column(String(64), nullable=True)
     source_ip = Column(String(45), nullable=True)
     forensic_json = Column(JSON, nullable=True)
-    alert_sent = Column(String(50), default="pending", nullable=False)  # pending, sent, failed
+    alert_sent = Column(String(50), default="pending", nullable=False)  # pending, aggregated, sent, failed, disabled
+    sequence = Column(Integer, nullable=True, index=True)  # Event stream sequence (SSE Last-Event-ID)
 
 class AlertSetting(Base):
     """Model for alert configuration"""
@@ -54,6 +59,25 @@ class AlertSetting(Base):
     created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
 
+class AlertDelivery(Base):
+    """Model for the alert outbox: one row per alert per channel"""
+    __tablename__ = "alert_outbox"
+    __table_args__ = (Index("ix_alert_outbox_due", "status", "channel", "next_attempt_at"),)
+
+    id = Column(String(36), primary_key=True, default=lambda: str(uuid.uuid4()))
+    alert_id = Column(String(36), nullable=False, index=True)  # Shared by the rows of one alert
+    channel = Column(String(50), nullable=False)  # slack, email
+    status = Column(String(20), default="pending", nullable=False)  # pending, sending, sent, dead
+    claimed_by = Column(String(128), nullable=True)  # Dispatcher sending it (status "sending")
+    claimed_at = Column(DateTime, nullable=True)  # Claims older than the lease are requeued
+    payload = Column(JSON, nullable=False)  # Alert event as passed to the handler
+    event_ids = Column(JSON, nullable=False)  # AccessEvent ids this alert covers
+    attempts = Column(Integer, default=0, nullable=False)
+    next_attempt_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+    last_error = Column(Text, nullable=True)
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+    delivered_at = Column(DateTime, nullable=True)
+
 class MonitoringStatus(Base):
     """Model for tracking monitoring engine status"""
     __tablename__ = "monitoring_status"
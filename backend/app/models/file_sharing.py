@@ -1,7 +1,8 @@
 """
 File Sharing Models for DecoyDNA
 """
-from sqlalchemy import Column, String, DateTime, Boolean, Integer, Text
+from sqlalchemy import Column, String, DateTime, Date, Boolean, Integer, Text, Index, ForeignKey, UniqueConstraint
+from sqlalchemy.orm import relationship
 from datetime import datetime
 import uuid
 
@@ -17,26 +18,80 @@ class FileShare(Base):
     share_path = Column(String(1000), nullable=False)
     description = Column(Text, nullable=True)
     is_sensitive = Column(Boolean, default=True)
-    shared_with_users = Column(String(1000), nullable=True)  # Comma-separated
-    shared_with_groups = Column(String(1000), nullable=True)  # Comma-separated
+    shared_with_users = Column(String(1000), nullable=True)  # Legacy comma-separated, migrated to file_share_users
+    shared_with_groups = Column(String(1000), nullable=True)  # Legacy comma-separated, migrated to file_share_groups
     access_count = Column(Integer, default=0)
     last_accessed = Column(DateTime, nullable=True)
     created_at = Column(DateTime, default=datetime.utcnow)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     is_active = Column(Boolean, default=True)
 
+    user_members = relationship(
+        "ShareUserMember", cascade="all, delete-orphan", order_by="ShareUserMember.id", lazy="selectin"
+    )
+    group_members = relationship(
+        "ShareGroupMember", cascade="all, delete-orphan", order_by="ShareGroupMember.id", lazy="selectin"
+    )
+
+
+class ShareUserMember(Base):
+    """User a file share is shared with"""
+    __tablename__ = "file_share_users"
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    share_id = Column(String, ForeignKey("file_shares.id", ondelete="CASCADE"), nullable=False)
+    username = Column(String(255), nullable=False)
+
+    __table_args__ = (
+        UniqueConstraint("share_id", "username", name="uq_file_share_users_share_user"),
+        Index("ix_file_share_users_username", "username", "share_id"),
+    )
+
+
+class ShareGroupMember(Base):
+    """Group a file share is shared with"""
+    __tablename__ = "file_share_groups"
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    share_id = Column(String, ForeignKey("file_shares.id", ondelete="CASCADE"), nullable=False)
+    group_name = Column(String(255), nullable=False)
+
+    __table_args__ = (
+        UniqueConstraint("share_id", "group_name", name="uq_file_share_groups_share_group"),
+        Index("ix_file_share_groups_group_name", "group_name", "share_id"),
+    )
+
 
 class ShareAccessLog(Base):
     """Log for file share access"""
     __tablename__ = "share_access_logs"
 
     id = Column(String, primary_key=True, default=lambda: str(uuid.uuid4()))
-    share_id = Column(String, nullable=False)
+    share_id = Column(String, nullable=False)  # indexed by ix_share_access_logs_share_time
     username = Column(String(255), nullable=False)
     hostname = Column(String(255), nullable=False)
     ip_address = Column(String(45), nullable=False)
     access_type = Column(String(50), nullable=False)  # read, write, execute, delete
-    accessed_at = Column(DateTime, default=datetime.utcnow)
+    accessed_at = Column(DateTime, default=datetime.utcnow, index=True)
     success = Column(Boolean, default=True)
     error_message = Column(Text, nullable=True)
     process_name = Column(String(255), nullable=True)
+
+    __table_args__ = (
+        Index("ix_share_access_logs_share_time", "share_id", "accessed_at"),
+    )
+
+
+class ShareAccessDailyRollup(Base):
+    """Per-share daily access counts by user and access type"""
+    __tablename__ = "share_access_daily"
+
+    share_id = Column(String, primary_key=True)
+    day = Column(Date, primary_key=True)
+    username = Column(String(255), primary_key=True)
+    access_type = Column(String(50), primary_key=True)
+    access_count = Column(Integer, default=0, nullable=False)
+
+    __table_args__ = (
+        Index("ix_share_access_daily_share_day", "share_id", "day"),
+    )
@@ -5,6 +5,8 @@ from pydantic import BaseModel, Field
 from typing import List, Optional, Dict, Any
 from datetime import datetime
 
+from app.config.settings import DATASET_MAX_ROWS
+
 # ==================== HONEYFILE SCHEMAS ====================
 class HoneyfileCreateRequest(BaseModel):
     """Request to create a new honeyfile"""
@@ -12,6 +14,7 @@ class HoneyfileCreateRequest(BaseModel):
     file_type: str = Field(..., description="Type: docx, xlsx, or pdf")
     template_type: str = Field(..., description="Template: passwords, salaries, project_secrets")
     seed_locations: List[str] = Field(default_factory=list, description="Directories to plant file")
+    row_count: Optional[int] = Field(None, ge=1, le=DATASET_MAX_ROWS, description="XLSX only: generate this many synthetic data rows")
 
 class HoneyfileResponse(BaseModel):
     """Response containing honeyfile details"""
@@ -28,6 +31,38 @@ class HoneyfileResponse(BaseModel):
     class Config:
         from_attributes = True
 
+class PlantingError(BaseModel):
+    """A seed location the honeyfile could not be planted in"""
+    path: str
+    error: str
+
+class HoneyfileCreateResponse(HoneyfileResponse):
+    """A newly created honeyfile and where its copies were planted"""
+    planted_paths: List[str] = Field(default_factory=list)
+    planting_errors: List[PlantingError] = Field(default_factory=list)
+
+class HoneyfileBatchCreateRequest(BaseModel):
+    """Request to create many honeyfiles at once"""
+    items: List[HoneyfileCreateRequest] = Field(..., min_length=1, description="Honeyfile specs to create")
+
+class HoneyfileBatchError(BaseModel):
+    """One failed item of a batch"""
+    index: Optional[int] = None
+    file_name: Optional[str] = None
+    error: str
+
+class HoneyfileBatchJobResponse(BaseModel):
+    """Progress and results of a batch creation job"""
+    job_id: str
+    status: str
+    total: int
+    completed: int
+    failed: int
+    created_at: datetime
+    finished_at: Optional[datetime] = None
+    results: Optional[List[HoneyfileCreateResponse]] = None
+    errors: List[HoneyfileBatchError] = Field(default_factory=list)
+
 # ==================== EVENT SCHEMAS ====================
 class ForensicContext(BaseModel):
     """Forensic context from event"""
@@ -160,4 +195,5 @@ class ShareStatsResponse(BaseModel):
     recent_accesses: int
     unique_users: int
     access_types: Dict[str, int]
+    window_days: int = 7
 
@@ -0,0 +1,126 @@
+"""
+Thread-to-asyncio bridge delivering monitoring events in micro-batches
+"""
+import asyncio
+import threading
+import time
+from collections import deque
+from typing import Any, Awaitable, Callable, Deque, Dict, List, Optional, Tuple
+
+
+class LoopBridge:
+    """Hand items from watchdog/worker threads to an asyncio consumer
+
+    submit() may be called from any thread. At most one wake-up is scheduled
+    on the loop with call_soon_threadsafe until the consumer catches up, and
+    everything that arrived in the meantime is handed over as one list, so
+    async consumers see batches instead of one coroutine per event.
+    """
+
+    def __init__(self,
+                 consumer: Callable[[List[Any]], Awaitable[None]],
+                 max_batch: int = 500,
+                 latency_samples: int = 2048):
+        self.consumer = consumer
+        self.max_batch = max_batch
+        self.loop: Optional[asyncio.AbstractEventLoop] = None
+        self._pending: Deque[Tuple[float, Any]] = deque()
+        self._lock = threading.Lock()
+        self._scheduled = False
+        self._wakeup: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+        self._stopping = False
+        self._latencies: Deque[float] = deque(maxlen=latency_samples)
+        self.submitted = 0
+        self.delivered = 0
+        self.batches = 0
+        self.errors = 0
+
+    def start(self, loop: asyncio.AbstractEventLoop):
+        """Start the consumer task on `loop` (call from the loop thread)"""
+        self.loop = loop
+        self._stopping = False
+        self._wakeup = asyncio.Event()
+        self._task = loop.create_task(self._run())
+        with self._lock:
+            if self._pending:
+                self._scheduled = True
+                self._wakeup.set()
+
+    async def stop(self):
+        """Deliver what is pending and stop the consumer task
+
+        The consumer task finishes the batch it is on and drains the rest
+        itself, so no batch is cut short or handed over twice.
+        """
+        if self._task is None:
+            return
+        self._stopping = True
+        self._wakeup.set()
+        try:
+            await self._task
+        finally:
+            self._task = None
+
+    def submit(self, item: Any):
+        """Queue an item from any thread"""
+        with self._lock:
+            self._pending.append((time.perf_counter(), item))
+            self.submitted += 1
+            if self._scheduled or self.loop is None:
+                return
+            self._scheduled = True
+        try:
+            self.loop.call_soon_threadsafe(self._wakeup.set)
+        except RuntimeError:
+            # Loop already closed; items stay pending
+            pass
+
+    async def _run(self):
+        while True:
+            await self._wakeup.wait()
+            self._wakeup.clear()
+            await self._drain()
+            if self._stopping:
+                return
+
+    async def _drain(self):
+        while True:
+            with self._lock:
+                if not self._pending:
+                    self._scheduled = False
+                    return
+                count = min(len(self._pending), self.max_batch)
+                entries = [self._pending.popleft() for _ in range(count)]
+
+            now = time.perf_counter()
+            self._latencies.extend(now - submitted_at for submitted_at, _ in entries)
+            self.batches += 1
+            self.delivered += len(entries)
+            try:
+                await self.consumer([item for _, item in entries])
+            except Exception as e:
+                self.errors += 1
+                print(f"Event batch consumer failed: {e}")
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get throughput, batch size and hand-off latency"""
+        latencies = sorted(self._latencies)
+        with self._lock:
+            pending = len(self._pending)
+
+        def percentile(p: float) -> Optional[float]:
+            if not latencies:
+                return None
+            return round(latencies[min(len(latencies) - 1, int(len(latencies) * p))] * 1000, 3)
+
+        return {
+            "submitted": self.submitted,
+            "delivered": self.delivered,
+            "pending": pending,
+            "batches": self.batches,
+            "avg_batch_size": round(self.delivered / self.batches, 2) if self.batches else 0.0,
+            "errors": self.errors,
+            "handoff_ms_p50": percentile(0.5),
+            "handoff_ms_p99": percentile(0.99),
+        }
@@ -0,0 +1,128 @@
+"""
+Client side of the monitoring daemon's Unix socket protocol
+
+The channel speaks newline-delimited JSON. A request is one line
+{"op": ..., "args": {...}} answered by one line {"ok": true, "result": ...}
+or {"ok": false, "error": ...}. The "subscribe" op turns the connection
+into a one-way stream of event envelopes, one JSON object per line.
+"""
+import asyncio
+import json
+import socket
+from typing import Any, AsyncIterator, Dict, List, Optional
+
+from app.api.responses import dumps
+
+# Event envelopes carry a full forensic context per line
+STREAM_LINE_LIMIT = 4 * 1024 * 1024
+
+
+class MonitorUnavailable(Exception):
+    """Raised when the monitoring daemon cannot be reached"""
+
+
+class MonitorError(Exception):
+    """Raised when the monitoring daemon rejects a request"""
+
+
+def encode_message(message: Dict[str, Any]) -> bytes:
+    """Serialize one protocol line"""
+    return dumps(message) + b"\n"
+
+
+class MonitorClient:
+    """Stateless handle on the monitoring daemon used by API workers
+
+    Each call opens its own short-lived connection, so one client can be
+    shared by every thread and request in a worker.
+    """
+
+    def __init__(self, socket_path: str, timeout: float = 10.0):
+        self.socket_path = socket_path
+        self.timeout = timeout
+
+    def call(self, op: str, **args) -> Any:
+        """Send one request and wait for its response (blocking)"""
+        try:
+            with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+                sock.settimeout(self.timeout)
+                sock.connect(self.socket_path)
+                sock.sendall(encode_message({"op": op, "args": args}))
+                with sock.makefile("rb") as reader:
+                    line = reader.readline()
+        except OSError as e:
+            raise MonitorUnavailable(f"Monitoring daemon unavailable at {self.socket_path}: {e}")
+        if not line:
+            raise MonitorUnavailable(f"Monitoring daemon at {self.socket_path} closed the connection")
+        response = json.loads(line)
+        if not response.get("ok"):
+            raise MonitorError(response.get("error", "unknown error"))
+        return response.get("result")
+
+    async def events(self) -> AsyncIterator[str]:
+        """Yield serialized event envelopes as the daemon publishes them"""
+        try:
+            reader, writer = await asyncio.open_unix_connection(self.socket_path, limit=STREAM_LINE_LIMIT)
+        except OSError as e:
+            raise MonitorUnavailable(f"Monitoring daemon unavailable at {self.socket_path}: {e}")
+        try:
+            writer.write(encode_message({"op": "subscribe", "args": {}}))
+            await writer.drain()
+            acknowledgement = await reader.readline()
+            if not acknowledgement or not json.loads(acknowledgement).get("ok"):
+                raise MonitorError("Monitoring daemon refused the event subscription")
+            while True:
+                line = await reader.readline()
+                if not line:
+                    raise MonitorUnavailable("Monitoring daemon closed the event stream")
+                yield line.decode("utf-8").rstrip("\n")
+        finally:
+            writer.close()
+
+
+class RemoteMonitoringEngine:
+    """Stand-in for FileMonitoringEngine that forwards to the daemon
+
+    Lets the services keep calling `monitoring_engine.register_honeyfile`
+    and friends when the engine itself lives in the monitoring daemon.
+    """
+
+    def __init__(self, client: MonitorClient):
+        self.client = client
+        self.alert_callback = None
+
+    def register_honeyfile(self,
+                           file_path: str,
+                           decoy_id: str,
+                           seed_locations: List[str],
+                           planted_paths: Optional[List[str]] = None):
+        """Register a honeyfile with the daemon's engine"""
+        self.register_honeyfiles([{
+            "file_path": file_path,
+            "decoy_id": decoy_id,
+            "seed_locations": seed_locations,
+            "planted_paths": planted_paths,
+        }])
+
+    def register_honeyfiles(self, honeyfiles: List[Dict[str, Any]]):
+        """Register many honeyfiles in one round trip
+
+        The honeyfile rows are already committed, and the daemon loads every
+        honeyfile from the database when monitoring starts, so an
+        unreachable daemon only delays registration.
+        """
+        try:
+            self.client.call("register", honeyfiles=honeyfiles)
+        except (MonitorUnavailable, MonitorError) as e:
+            print(f"Honeyfile registration deferred: {e}")
+
+    def get_status(self) -> Dict[str, Any]:
+        """Engine status as reported by the daemon"""
+        try:
+            return self.client.call("status")["engine_status"]
+        except (MonitorUnavailable, MonitorError) as e:
+            return {"is_running": False, "error": str(e)}
+
+    @property
+    def is_running(self) -> bool:
+        return bool(self.get_status().get("is_running"))
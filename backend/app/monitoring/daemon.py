@@ -0,0 +1,205 @@
+"""
+Standalone monitoring daemon
+
+Owns the single FileMonitoringEngine and event pipeline (persistence and
+alerting) for an installation, and serves any number of API workers over
+a Unix socket (protocol in app.monitoring.client). Run with
+MONITORING_MODE=daemon set for the API:
+
+    python -m app.monitoring.daemon [--socket PATH] [--start]
+"""
+import argparse
+import asyncio
+import json
+import os
+import signal
+import time
+from datetime import datetime
+from typing import Any, Dict, Optional, Set
+
+# The daemon is where the engine runs, whatever the API workers are configured for
+os.environ["MONITORING_MODE"] = "embedded"
+
+from app.config.settings import MONITOR_SOCKET_PATH, MONITOR_STREAM_QUEUE_SIZE  # noqa: E402
+from app.db.database import SessionLocal, init_db  # noqa: E402
+from app.models import database_models, file_sharing  # noqa: E402,F401 - registers tables
+from app.monitoring.client import STREAM_LINE_LIMIT, encode_message  # noqa: E402
+from app.monitoring.hub import SubscriptionClosed  # noqa: E402
+from app.services.business import (  # noqa: E402
+    AlertService, MonitoringService, event_hub, event_pipeline, latency_tracker, monitor_client,
+    monitoring_engine
+)
+
+if monitor_client is not None:
+    raise RuntimeError("Settings were loaded in daemon mode before app.monitoring.daemon was imported")
+
+
+class MonitoringDaemon:
+    """Unix socket server exposing the monitoring engine to API workers"""
+
+    def __init__(self, socket_path: str = MONITOR_SOCKET_PATH):
+        self.socket_path = socket_path
+        self.server: Optional[asyncio.AbstractServer] = None
+        self._connections: Set[asyncio.Task] = set()
+        self.started_at = time.time()
+        self.requests = 0
+        self.streams = 0
+
+    async def start(self):
+        """Bind the socket, replacing a stale one from a previous run"""
+        os.makedirs(os.path.dirname(self.socket_path) or ".", exist_ok=True)
+        if os.path.exists(self.socket_path):
+            os.remove(self.socket_path)
+        self.server = await asyncio.start_unix_server(self._handle, path=self.socket_path,
+                                                      limit=STREAM_LINE_LIMIT)
+        # Only the owning user's API workers may control monitoring
+        os.chmod(self.socket_path, 0o600)
+
+    async def stop(self):
+        """Close the socket, disconnecting every worker"""
+        if self.server is not None:
+            self.server.close()
+            for task in list(self._connections):
+                task.cancel()
+            await asyncio.gather(*self._connections, return_exceptions=True)
+            await self.server.wait_closed()
+            self.server = None
+        if os.path.exists(self.socket_path):
+            os.remove(self.socket_path)
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        task = asyncio.current_task()
+        self._connections.add(task)
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    return
+                try:
+                    request = json.loads(line)
+                    op = request["op"]
+                    args = request.get("args") or {}
+                except (ValueError, KeyError, TypeError) as e:
+                    writer.write(encode_message({"ok": False, "error": f"Malformed request: {e}"}))
+                    await writer.drain()
+                    continue
+                if op == "subscribe":
+                    await self._stream_events(reader, writer)
+                    return
+                writer.write(encode_message(await self._dispatch(op, args)))
+                await writer.drain()
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        except asyncio.CancelledError:
+            # Daemon shutdown; end the connection quietly
+            pass
+        finally:
+            self._connections.discard(task)
+            writer.close()
+
+    async def _dispatch(self, op: str, args: Dict[str, Any]) -> Dict[str, Any]:
+        """Run one request against the engine"""
+        self.requests += 1
+        try:
+            if op == "status":
+                result = self.get_status()
+            elif op == "start":
+                db = SessionLocal()
+                try:
+                    result = await MonitoringService.start_monitoring(db, args.get("directories"))
+                finally:
+                    db.close()
+            elif op == "stop":
+                result = await asyncio.to_thread(MonitoringService.stop_monitoring)
+            elif op == "register":
+                honeyfiles = args.get("honeyfiles") or []
+                await asyncio.to_thread(monitoring_engine.register_honeyfiles, honeyfiles)
+                result = {"registered": len(honeyfiles)}
+            elif op == "latency":
+                result = latency_tracker.get_stats()
+            elif op == "latency_trace":
+                result = latency_tracker.chrome_trace(args.get("min_total_ms", 0.0), args.get("limit", 100))
+            elif op == "ping":
+                result = {"pid": os.getpid()}
+            else:
+                return {"ok": False, "error": f"Unknown op: {op}"}
+        except Exception as e:
+            print(f"Monitoring daemon request {op} failed: {e}")
+            return {"ok": False, "error": str(e)}
+        return {"ok": True, "result": result}
+
+    async def _stream_events(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        """Forward every published event to one API worker until it disconnects"""
+        subscription = event_hub.subscribe(queue_size=MONITOR_STREAM_QUEUE_SIZE)
+        self.streams += 1
+        # The worker never sends again; EOF on its side ends the stream
+        disconnected = asyncio.ensure_future(reader.read())
+        message: Optional[asyncio.Future] = None
+        try:
+            writer.write(encode_message({"ok": True, "result": {"last_sequence": event_hub.get_stats()["last_sequence"]}}))
+            await writer.drain()
+            while True:
+                message = asyncio.ensure_future(subscription.get())
+                done, _ = await asyncio.wait({message, disconnected}, return_when=asyncio.FIRST_COMPLETED)
+                if message not in done:
+                    return
+                writer.write(message.result().encode("utf-8") + b"\n")
+                await writer.drain()
+        except SubscriptionClosed:
+            pass
+        finally:
+            if message is not None:
+                message.cancel()
+            disconnected.cancel()
+            event_hub.unsubscribe(subscription)
+            self.streams -= 1
+
+    def get_status(self) -> Dict[str, Any]:
+        """Monitoring run state plus daemon counters"""
+        state = MonitoringService.get_engine_state()
+        state["last_heartbeat"] = datetime.utcnow()
+        state["daemon"] = {
+            "pid": os.getpid(),
+            "uptime_seconds": round(time.time() - self.started_at, 1),
+            "requests": self.requests,
+            "event_streams": self.streams,
+            "pipeline": event_pipeline.get_stats(),
+        }
+        return state
+
+
+async def serve(socket_path: str, start_monitoring: bool = False):
+    """Run the daemon until SIGINT/SIGTERM"""
+    init_db()
+    loop = asyncio.get_running_loop()
+    event_pipeline.attach(loop)
+    await AlertService.start_clients()
+    daemon = MonitoringDaemon(socket_path)
+    await daemon.start()
+    print(f"DecoyDNA monitoring daemon listening on {socket_path}")
+
+    if start_monitoring:
+        print(f"Monitoring: {(await daemon._dispatch('start', {}))}")
+
+    stopping = asyncio.Event()
+    for signum in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(signum, stopping.set)
+    await stopping.wait()
+
+    print("DecoyDNA monitoring daemon shutting down...")
+    await daemon.stop()
+    MonitoringService.stop_monitoring()
+    await event_pipeline.detach()
+    await AlertService.close_clients()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="DecoyDNA monitoring daemon")
+    parser.add_argument("--socket", default=MONITOR_SOCKET_PATH, help="Unix socket to listen on")
+    parser.add_argument("--start", action="store_true", help="start monitoring immediately")
+    args = parser.parse_args()
+    asyncio.run(serve(args.socket, args.start))
+
+
+if __name__ == "__main__":
+    main()
@@ -4,20 +4,17 @@ Real-time file monitoring engine using watchdog
 import os
 import threading
 import json
+import time
 from datetime import datetime
 from pathlib import Path
 from typing import Dict, Any, Optional, Callable, List
-from queue import Queue
+from queue import Empty, Queue
 
-try:
-    from watchdog.observers import Observer
-    from watchdog.events import FileSystemEventHandler, FileModifiedEvent
-except ImportError:
-    Observer = None
-    FileSystemEventHandler = None
+# watchdog is imported when monitoring starts, not when the API loads
 
 from app.utils.crypto import get_system_info, get_process_info, calculate_sha256
 from app.config.settings import HONEYFILES_DIR
+from app.monitoring.tracing import stamp
 
 class ForensicCollector:
     """Collect forensic context when honeyfiles are accessed"""
@@ -59,8 +56,13 @@ class ForensicCollector:
         
         return forensic_data
 
-class HoneyfileEventHandler(FileSystemEventHandler):
-    """Watchdog event handler for honeyfile access detection"""
+class HoneyfileEventHandler:
+    """Watchdog event handler for honeyfile access detection
+    
+    Implements watchdog's handler interface (dispatch) itself instead of
+    subclassing FileSystemEventHandler, so watchdog need not be imported
+    to define it.
+    """
     
     def __init__(self, honeyfile_registry: Dict[str, str], 
                  event_callback: Callable[[Dict[str, Any]], None]):
@@ -69,10 +71,15 @@ class HoneyfileEventHandler(FileSystemEventHandler):
             honeyfile_registry: Dict mapping file paths to decoy IDs
             event_callback: Callback function to process detected events
         """
-        super().__init__()
         self.honeyfile_registry = honeyfile_registry
         self.event_callback = event_callback
     
+    def dispatch(self, event):
+        """Route a watchdog event to its on_<event_type> method"""
+        handler = getattr(self, f"on_{event.event_type}", None)
+        if handler is not None:
+            handler(event)
+    
     def on_modified(self, event):
         """Handle file modification events"""
         if event.is_directory:
@@ -103,6 +110,7 @@ class HoneyfileEventHandler(FileSystemEventHandler):
     
     def _check_honeyfile(self, file_path: str, event_type: str):
         """Check if accessed file is a tracked honeyfile"""
+        received = time.time_ns()
         # Normalize path
         normalized_path = str(Path(file_path).resolve())
         
@@ -116,6 +124,8 @@ class HoneyfileEventHandler(FileSystemEventHandler):
                 event_type,
                 decoy_id
             )
+            stamp(forensic_context, "received", received)
+            stamp(forensic_context, "collected")
             
             # Trigger callback
             self.event_callback(forensic_context)
@@ -128,20 +138,35 @@ class FileMonitoringEngine:
         Args:
             alert_callback: Function to call when honeyfile access is detected
         """
-        self.observer: Optional[Observer] = None
+        self.observer = None
         self.is_running = False
         self.honeyfile_registry: Dict[str, str] = {}  # path -> decoy_id
         self.watched_directories: set = set()
         self.alert_callback = alert_callback
         self.event_queue: Queue = Queue()
         self.event_thread = None
+        self.events_detected = 0
+        self.events_dispatched = 0
+        self.callback_errors = 0
     
-    def register_honeyfile(self, file_path: str, decoy_id: str, seed_locations: List[str]):
-        """Register a honeyfile for monitoring"""
+    def register_honeyfile(self,
+                           file_path: str,
+                           decoy_id: str,
+                           seed_locations: List[str],
+                           planted_paths: Optional[List[str]] = None):
+        """Register a honeyfile for monitoring
+        
+        When the planted copies are known their exact paths are registered;
+        otherwise each seed directory is listed to find them.
+        """
         # Register main file
         normalized_path = str(Path(file_path).resolve())
         self.honeyfile_registry[normalized_path] = decoy_id
         
+        if planted_paths is not None:
+            self._register_planted(decoy_id, seed_locations, planted_paths)
+            return
+        
         # Register all seed locations
         if seed_locations:
             for seed_dir in seed_locations:
@@ -153,12 +178,50 @@ class FileMonitoringEngine:
                         if file_path.endswith(os.path.basename(full_path)):
                             self.honeyfile_registry[str(Path(full_path).resolve())] = decoy_id
     
+    def register_honeyfiles(self, honeyfiles: List[Dict[str, Any]]):
+        """Register many honeyfiles, listing each seed directory only once
+        
+        Args:
+            honeyfiles: Dicts with file_path, decoy_id and seed_locations
+        """
+        by_directory: Dict[str, List[Dict[str, Any]]] = {}
+        for honeyfile in honeyfiles:
+            normalized_path = str(Path(honeyfile["file_path"]).resolve())
+            self.honeyfile_registry[normalized_path] = honeyfile["decoy_id"]
+            if honeyfile.get("planted_paths") is not None:
+                self._register_planted(honeyfile["decoy_id"], honeyfile.get("seed_locations"),
+                                       honeyfile["planted_paths"])
+                continue
+            for seed_dir in honeyfile.get("seed_locations") or []:
+                by_directory.setdefault(seed_dir, []).append(honeyfile)
+        
+        for seed_dir, entries in by_directory.items():
+            if not os.path.isdir(seed_dir):
+                continue
+            self.watched_directories.add(seed_dir)
+            filenames = os.listdir(seed_dir)
+            for honeyfile in entries:
+                for filename in filenames:
+                    if honeyfile["file_path"].endswith(filename):
+                        full_path = os.path.join(seed_dir, filename)
+                        self.honeyfile_registry[str(Path(full_path).resolve())] = honeyfile["decoy_id"]
+    
+    def _register_planted(self, decoy_id: str, seed_locations: Optional[List[str]], planted_paths: List[str]):
+        """Register known copy paths without listing their directories"""
+        for seed_dir in seed_locations or []:
+            if os.path.isdir(seed_dir):
+                self.watched_directories.add(seed_dir)
+        for planted_path in planted_paths:
+            self.honeyfile_registry[str(Path(planted_path).resolve())] = decoy_id
+    
     def start(self, directories: Optional[List[str]] = None):
         """Start monitoring for honeyfile access"""
         if self.is_running:
             return
         
-        if Observer is None:
+        try:
+            from watchdog.observers import Observer
+        except ImportError:
             raise ImportError("watchdog is required. Install: pip install watchdog")
         
         # Use provided directories or default
@@ -201,6 +264,8 @@ class FileMonitoringEngine:
     
     def _handle_event(self, forensic_context: Dict[str, Any]):
         """Internal handler for detected events"""
+        self.events_detected += 1
+        stamp(forensic_context, "enqueued")
         self.event_queue.put(forensic_context)
     
     def _process_events(self):
@@ -208,10 +273,16 @@ class FileMonitoringEngine:
         while self.is_running:
             try:
                 event = self.event_queue.get(timeout=1)
+            except Empty:
+                continue
+            stamp(event, "dequeued")
+            self.events_dispatched += 1
+            try:
                 if self.alert_callback:
                     self.alert_callback(event)
-            except:
-                continue
+            except Exception as e:
+                self.callback_errors += 1
+                print(f"Monitoring event callback failed: {e}")
     
     def get_registered_honeyfiles(self) -> Dict[str, str]:
         """Get all registered honeyfiles"""
@@ -223,5 +294,8 @@ class FileMonitoringEngine:
             "is_running": self.is_running,
             "total_honeyfiles": len(self.honeyfile_registry),
             "watched_directories": list(self.watched_directories),
-            "queue_size": self.event_queue.qsize()
+            "queue_size": self.event_queue.qsize(),
+            "events_detected": self.events_detected,
+            "events_dispatched": self.events_dispatched,
+            "callback_errors": self.callback_errors
         }
@@ -0,0 +1,270 @@
+"""
+Broadcast hub fanning detected events out to dashboard subscribers
+"""
+import asyncio
+import threading
+from collections import deque
+from typing import Any, Awaitable, Callable, Deque, Dict, Iterable, List, Optional, Set, Tuple
+
+from app.api.responses import dumps
+from app.monitoring.tracing import without_trace
+
+DROP_OLDEST = "drop_oldest"
+DISCONNECT = "disconnect"
+
+_CLOSED = object()
+
+
+def event_severity(event_type: str) -> str:
+    """Map a detection event type to a dashboard severity"""
+    if event_type == "test":
+        return "info"
+    if event_type == "accessed":
+        return "warning"
+    return "critical"
+
+
+class SubscriptionClosed(Exception):
+    """Raised when a subscription was closed by the hub"""
+
+
+class EventRingBuffer:
+    """Fixed-size buffer of recent events keyed by sequence number"""
+
+    def __init__(self, size: int = 1000):
+        self._entries: Deque[Tuple[int, Dict[str, Any], str]] = deque(maxlen=size)
+        self._lock = threading.Lock()
+
+    def append(self, sequence: int, envelope: Dict[str, Any], payload: str):
+        """Store an event; the oldest one falls off when full"""
+        with self._lock:
+            self._entries.append((sequence, envelope, payload))
+
+    def oldest_sequence(self) -> Optional[int]:
+        """Sequence of the oldest buffered event"""
+        with self._lock:
+            return self._entries[0][0] if self._entries else None
+
+    def since(self, last_sequence: int) -> Optional[List[Tuple[int, Dict[str, Any], str]]]:
+        """Events after `last_sequence`, or None when the gap is not fully buffered"""
+        with self._lock:
+            if self._entries and self._entries[0][0] > last_sequence + 1:
+                return None
+            return [entry for entry in self._entries if entry[0] > last_sequence]
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+class Subscription:
+    """One subscriber's bounded queue and server-side filters"""
+
+    def __init__(self,
+                 maxsize: int,
+                 policy: str = DROP_OLDEST,
+                 decoy_ids: Optional[Iterable[str]] = None,
+                 event_types: Optional[Iterable[str]] = None,
+                 severities: Optional[Iterable[str]] = None):
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=maxsize)
+        self.policy = policy
+        self.decoy_ids: Optional[Set[str]] = set(decoy_ids) if decoy_ids else None
+        self.event_types: Optional[Set[str]] = set(event_types) if event_types else None
+        self.severities: Optional[Set[str]] = set(severities) if severities else None
+        self.closed = False
+        self.close_reason: Optional[str] = None
+        self.delivered = 0
+        self.dropped = 0
+
+    def matches(self, envelope: Dict[str, Any]) -> bool:
+        """Check an event envelope against this subscriber's filters"""
+        data = envelope["data"]
+        if self.decoy_ids is not None and data.get("decoy_id") not in self.decoy_ids:
+            return False
+        if self.event_types is not None and data.get("event_type") not in self.event_types:
+            return False
+        if self.severities is not None and envelope["severity"] not in self.severities:
+            return False
+        return True
+
+    def offer(self, message: Tuple[Optional[int], str]) -> bool:
+        """Queue a payload without blocking; apply the slow-consumer policy when full"""
+        if self.closed:
+            return False
+        try:
+            self.queue.put_nowait(message)
+            return True
+        except asyncio.QueueFull:
+            pass
+        if self.policy == DISCONNECT:
+            self.close("slow_consumer")
+            return False
+        self.queue.get_nowait()
+        self.dropped += 1
+        self.queue.put_nowait(message)
+        return True
+
+    def close(self, reason: str = "closed"):
+        """Close the subscription and wake its consumer"""
+        if self.closed:
+            return
+        self.closed = True
+        self.close_reason = reason
+        while not self.queue.empty():
+            self.queue.get_nowait()
+        self.queue.put_nowait(_CLOSED)
+
+    async def get_message(self) -> Tuple[Optional[int], str]:
+        """Wait for the next (sequence, serialized event) pair"""
+        message = await self.queue.get()
+        if message is _CLOSED:
+            raise SubscriptionClosed(self.close_reason)
+        self.delivered += 1
+        return message
+
+    async def get(self) -> str:
+        """Wait for the next serialized event"""
+        _, payload = await self.get_message()
+        return payload
+
+
+class EventHub:
+    """Publish/subscribe hub for detection events
+
+    Publishing serializes each event once and only enqueues it, so a slow
+    dashboard can never hold up persistence or other subscribers. All
+    queue operations run on the event loop; other threads must use
+    publish_threadsafe.
+    """
+
+    def __init__(self, queue_size: int = 256, policy: str = DROP_OLDEST, buffer_size: int = 1000):
+        self.queue_size = queue_size
+        self.policy = policy
+        self.buffer = EventRingBuffer(buffer_size)
+        self.loop: Optional[asyncio.AbstractEventLoop] = None
+        self._sequence = 0
+        self._subscriptions: Set[Subscription] = set()
+        self._lock = threading.Lock()
+        self.published = 0
+        self.dropped = 0
+        self.disconnected = 0
+
+    def attach_loop(self, loop: asyncio.AbstractEventLoop):
+        """Bind the hub to the loop its subscribers run on"""
+        self.loop = loop
+
+    def set_sequence(self, last_sequence: int):
+        """Continue numbering after the last persisted sequence"""
+        with self._lock:
+            self._sequence = max(self._sequence, last_sequence)
+
+    def allocate_sequence(self) -> int:
+        """Reserve the next monotonically increasing event sequence"""
+        with self._lock:
+            self._sequence += 1
+            return self._sequence
+
+    def replay(self, last_sequence: int) -> Optional[List[Tuple[int, Dict[str, Any], str]]]:
+        """Buffered events after `last_sequence`, or None if some fell out of the buffer"""
+        entries = self.buffer.since(last_sequence)
+        if entries is None:
+            return None
+        if not entries and not len(self.buffer) and last_sequence < self._sequence:
+            return None
+        return entries
+
+    def subscribe(self,
+                  decoy_ids: Optional[Iterable[str]] = None,
+                  event_types: Optional[Iterable[str]] = None,
+                  severities: Optional[Iterable[str]] = None,
+                  queue_size: Optional[int] = None,
+                  policy: Optional[str] = None) -> Subscription:
+        """Register a new subscriber"""
+        subscription = Subscription(
+            maxsize=queue_size or self.queue_size,
+            policy=policy or self.policy,
+            decoy_ids=decoy_ids,
+            event_types=event_types,
+            severities=severities,
+        )
+        with self._lock:
+            self._subscriptions.add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription):
+        """Remove a subscriber"""
+        with self._lock:
+            self._subscriptions.discard(subscription)
+        subscription.close("unsubscribed")
+
+    def publish(self, envelope: Dict[str, Any], payload: Optional[str] = None) -> int:
+        """Fan an event envelope out to matching subscribers (loop thread only)
+
+        `payload` is the envelope already serialized, when the caller has it.
+        """
+        if payload is None:
+            payload = dumps(envelope).decode("utf-8")
+        sequence = envelope.get("sequence")
+        if sequence is not None:
+            self.buffer.append(sequence, envelope, payload)
+        message = (sequence, payload)
+        with self._lock:
+            subscriptions = list(self._subscriptions)
+        self.published += 1
+        delivered = 0
+        for subscription in subscriptions:
+            if not subscription.matches(envelope):
+                continue
+            dropped_before = subscription.dropped
+            if subscription.offer(message):
+                delivered += 1
+                self.dropped += subscription.dropped - dropped_before
+            elif subscription.closed:
+                self.disconnected += 1
+                with self._lock:
+                    self._subscriptions.discard(subscription)
+        return delivered
+
+    def publish_threadsafe(self, envelope: Dict[str, Any]):
+        """Publish from a non-loop thread"""
+        if self.loop is None or self.loop.is_closed():
+            return
+        self.loop.call_soon_threadsafe(self.publish, envelope)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get subscriber and delivery counters"""
+        with self._lock:
+            subscriptions = list(self._subscriptions)
+        return {
+            "subscribers": len(subscriptions),
+            "published": self.published,
+            "dropped": self.dropped,
+            "disconnected": self.disconnected,
+            "queued": sum(s.queue.qsize() for s in subscriptions),
+            "last_sequence": self._sequence,
+            "buffered": len(self.buffer),
+            "oldest_buffered": self.buffer.oldest_sequence(),
+        }
+
+
+def build_envelope(forensic_context: Dict[str, Any]) -> Dict[str, Any]:
+    """Wrap a forensic context in the WebSocket event shape"""
+    return {
+        "sequence": forensic_context.get("sequence"),
+        "event_type": "file_access",
+        "timestamp": forensic_context.get("timestamp"),
+        "data": without_trace(forensic_context),
+        "severity": event_severity(forensic_context.get("event_type", "unknown")),
+    }
+
+
+def format_sse(sequence: Optional[int], payload: str) -> str:
+    """Format one Server-Sent Events message"""
+    prefix = f"id: {sequence}\n" if sequence is not None else ""
+    return f"{prefix}event: file_access\ndata: {payload}\n\n"
+
+
+async def pump(subscription: Subscription, send: Callable[[str], Awaitable[None]]):
+    """Forward a subscription's events to a client until it is closed"""
+    while True:
+        payload = await subscription.get()
+        await send(payload)
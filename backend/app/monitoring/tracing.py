@@ -0,0 +1,146 @@
+"""
+Per-stage detection latency tracing
+
+Every detected event carries a "trace" dict of wall-clock nanosecond
+timestamps, one per stage it has passed. Stages, in order:
+
+    received    watchdog handed the filesystem event to our handler
+    collected   ForensicCollector finished gathering context
+    enqueued    put on the engine's event queue
+    dequeued    taken off it by the engine's dispatch thread
+    handed_off  reached the event loop through the LoopBridge
+    persisted   inserted into the database
+    broadcast   published to WebSocket/SSE subscribers
+    alert_<ch>  alert channel <ch> finished (sent, failed or timed out)
+
+Time spent inside watchdog before it calls our handler (inotify read and
+its own queue) is not visible and is not part of "received".
+
+The trace only lives on the in-memory context: stored events, broadcasts
+and alert payloads take a copy without it (without_trace()).
+"""
+import threading
+import time
+from collections import deque
+from typing import Any, Deque, Dict, List, Optional
+
+STAGES = ("received", "collected", "enqueued", "dequeued", "handed_off", "persisted", "broadcast")
+ALERT_PREFIX = "alert_"
+
+
+def stamp(context: Dict[str, Any], stage: str, at: Optional[int] = None):
+    """Record that an event reached `stage` (now, unless `at` is given)"""
+    context.setdefault("trace", {})[stage] = at if at is not None else time.time_ns()
+
+
+def without_trace(context: Dict[str, Any]) -> Dict[str, Any]:
+    """Copy of an event context for storage, broadcast or alerting"""
+    return {key: value for key, value in context.items() if key != "trace"}
+
+
+def stage_durations(trace: Dict[str, int]) -> Dict[str, int]:
+    """Nanoseconds spent reaching each stage from the one before it
+
+    Alert channels run concurrently after the broadcast, so each is measured
+    from the last pipeline stage. "total" runs from the first stamp to the last.
+    """
+    durations: Dict[str, int] = {}
+    previous: Optional[int] = None
+    for stage in STAGES:
+        if stage not in trace:
+            continue
+        if previous is not None:
+            durations[stage] = trace[stage] - previous
+        previous = trace[stage]
+    for stage, at in trace.items():
+        if stage.startswith(ALERT_PREFIX) and previous is not None:
+            durations[stage] = at - previous
+    if trace:
+        durations["total"] = max(trace.values()) - min(trace.values())
+    return durations
+
+
+def _percentile(values: List[int], p: float) -> float:
+    return round(values[min(len(values) - 1, int(len(values) * p))] / 1e6, 3)
+
+
+class LatencyTracker:
+    """Recent per-stage latency samples and full traces of finished events"""
+
+    def __init__(self, samples: int = 2048, traces: int = 500):
+        self.samples = samples
+        self._durations: Dict[str, Deque[int]] = {}
+        self._traces: Deque[Dict[str, Any]] = deque(maxlen=traces)
+        self._lock = threading.Lock()
+        self.recorded = 0
+
+    def record(self, context: Dict[str, Any]):
+        """Account for an event whose pipeline (including alerts) has finished"""
+        trace = context.get("trace")
+        if not trace:
+            return
+        durations = stage_durations(trace)
+        with self._lock:
+            for stage, duration in durations.items():
+                self._durations.setdefault(stage, deque(maxlen=self.samples)).append(duration)
+            self._traces.append({
+                "sequence": context.get("sequence"),
+                "decoy_id": context.get("decoy_id"),
+                "event_type": context.get("event_type"),
+                "trace": dict(trace),
+                "total_ns": durations.get("total", 0),
+            })
+            self.recorded += 1
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Latency percentiles in milliseconds per stage"""
+        with self._lock:
+            samples = {stage: sorted(values) for stage, values in self._durations.items()}
+        order = list(STAGES) + sorted(s for s in samples if s.startswith(ALERT_PREFIX)) + ["total"]
+        stages = {}
+        for stage in order:
+            values = samples.get(stage)
+            if not values:
+                continue
+            stages[stage] = {
+                "count": len(values),
+                "p50_ms": _percentile(values, 0.5),
+                "p95_ms": _percentile(values, 0.95),
+                "p99_ms": _percentile(values, 0.99),
+                "max_ms": round(values[-1] / 1e6, 3),
+            }
+        return {"events_traced": self.recorded, "stages": stages}
+
+    def chrome_trace(self, min_total_ms: float = 0.0, limit: int = 100) -> Dict[str, Any]:
+        """Slowest recent events in the Chrome trace event format
+
+        Load the result in chrome://tracing or https://ui.perfetto.dev; each
+        event is one row, each stage one slice ending when the stage was reached.
+        """
+        with self._lock:
+            traces = [t for t in self._traces if t["total_ns"] >= min_total_ms * 1e6]
+        traces = sorted(traces, key=lambda t: t["total_ns"], reverse=True)[:limit]
+
+        events: List[Dict[str, Any]] = []
+        for row, entry in enumerate(traces):
+            trace = entry["trace"]
+            tid = entry["sequence"] if entry["sequence"] is not None else row
+            events.append({
+                "name": "thread_name", "ph": "M", "pid": 1, "tid": tid,
+                "args": {"name": f"event {tid} ({entry['event_type']}, {entry['total_ns'] / 1e6:.1f} ms)"},
+            })
+            durations = stage_durations(trace)
+            for stage, duration in durations.items():
+                if stage == "total":
+                    continue
+                events.append({
+                    "name": stage,
+                    "cat": "alert" if stage.startswith(ALERT_PREFIX) else "pipeline",
+                    "ph": "X",
+                    "ts": (trace[stage] - duration) / 1000,
+                    "dur": duration / 1000,
+                    "pid": 1,
+                    "tid": tid,
+                    "args": {"decoy_id": entry["decoy_id"]},
+                })
+        return {"traceEvents": events, "displayTimeUnit": "ms"}
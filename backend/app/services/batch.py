@@ -0,0 +1,154 @@
+"""
+Batch honeyfile creation jobs
+"""
+import asyncio
+import uuid
+from collections import OrderedDict
+from concurrent.futures import Executor, ProcessPoolExecutor
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+from app.honeyfiles.seeding import plant_copies
+from app.config.settings import BATCH_WORKERS, BATCH_MAX_JOBS, HONEYFILE_STAMPING_ENABLED
+
+_worker_generator = None
+
+
+def _generate_in_worker(file_name: str,
+                        file_type: str,
+                        template_type: str,
+                        seed_locations: List[str],
+                        row_count: Optional[int] = None) -> Dict[str, Any]:
+    """Generate one honeyfile and plant its copies inside a pool worker process"""
+    global _worker_generator
+    if row_count:
+        from app.services.business import HoneyfileService
+        result = HoneyfileService.generate_dataset(file_name, file_type, template_type, row_count)
+    else:
+        if _worker_generator is None:
+            from app.honeyfiles.stamping import create_honeyfile_generator
+            _worker_generator = create_honeyfile_generator(stamping=HONEYFILE_STAMPING_ENABLED)
+        result = _worker_generator.generate_honeyfile(file_name, file_type, template_type)
+    planting = plant_copies(result["file_path"], seed_locations, result["expected_hash"])
+    result["planted_paths"] = planting["planted"]
+    result["planting_errors"] = planting["errors"]
+    return result
+
+
+class BatchJob:
+    """Progress and results of one batch creation request"""
+
+    def __init__(self, specs: List[Dict[str, Any]]):
+        self.id = str(uuid.uuid4())
+        self.specs = specs
+        self.total = len(specs)
+        self.completed = 0
+        self.failed = 0
+        self.status = "queued"  # queued, generating, inserting, completed, failed
+        self.created_at = datetime.utcnow()
+        self.finished_at: Optional[datetime] = None
+        self.results: List[Dict[str, Any]] = []
+        self.errors: List[Dict[str, Any]] = []
+        self.done = asyncio.Event()
+
+    def to_dict(self, include_results: bool = True) -> Dict[str, Any]:
+        """Convert job to dictionary"""
+        return {
+            "job_id": self.id,
+            "status": self.status,
+            "total": self.total,
+            "completed": self.completed,
+            "failed": self.failed,
+            "created_at": self.created_at,
+            "finished_at": self.finished_at,
+            "results": self.results if include_results else None,
+            "errors": self.errors,
+        }
+
+
+class HoneyfileBatchService:
+    """Generate honeyfiles on a process pool and store them in one transaction"""
+
+    def __init__(self, max_workers: int = BATCH_WORKERS, max_jobs: int = BATCH_MAX_JOBS):
+        self.max_workers = max_workers
+        self.max_jobs = max_jobs
+        self.jobs: "OrderedDict[str, BatchJob]" = OrderedDict()
+        self._executor: Optional[Executor] = None
+        self._tasks: set = set()
+
+    def _get_executor(self) -> Executor:
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(max_workers=self.max_workers or None)
+        return self._executor
+
+    def submit(self, specs: List[Dict[str, Any]]) -> BatchJob:
+        """Start a batch job on the running loop and return it immediately"""
+        job = BatchJob(specs)
+        self.jobs[job.id] = job
+        self._evict_finished()
+        task = asyncio.create_task(self._run(job))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        return job
+
+    def _evict_finished(self):
+        """Forget the oldest finished jobs beyond max_jobs; running jobs are always kept"""
+        excess = len(self.jobs) - self.max_jobs
+        if excess <= 0:
+            return
+        finished = [job_id for job_id, job in self.jobs.items() if job.done.is_set()]
+        for job_id in finished[:excess]:
+            del self.jobs[job_id]
+
+    def get_job(self, job_id: str) -> Optional[BatchJob]:
+        """Look up a job by id"""
+        return self.jobs.get(job_id)
+
+    async def _run(self, job: BatchJob):
+        from app.services.business import HoneyfileService, write_gate
+
+        def store(generated):
+            # The job outlives its request's write slot, so it waits for one of its own
+            with write_gate.slot():
+                return HoneyfileService.store_generated_honeyfiles(generated)
+
+        loop = asyncio.get_running_loop()
+        executor = self._get_executor()
+        job.status = "generating"
+
+        async def generate(index: int, spec: Dict[str, Any]):
+            try:
+                result = await loop.run_in_executor(
+                    executor, _generate_in_worker,
+                    spec["file_name"], spec["file_type"], spec["template_type"], spec["seed_locations"],
+                    spec.get("row_count")
+                )
+                job.completed += 1
+                return index, spec, result
+            except Exception as e:
+                job.failed += 1
+                job.errors.append({"index": index, "file_name": spec["file_name"], "error": str(e)})
+                return index, spec, None
+
+        try:
+            outcomes = await asyncio.gather(*(generate(i, spec) for i, spec in enumerate(job.specs)))
+            generated = [(spec, result) for _, spec, result in sorted(outcomes, key=lambda o: o[0]) if result]
+
+            job.status = "inserting"
+            job.results = await asyncio.to_thread(store, generated)
+            job.status = "completed"
+        except Exception as e:
+            job.status = "failed"
+            job.errors.append({"index": None, "file_name": None, "error": str(e)})
+        finally:
+            job.finished_at = datetime.utcnow()
+            job.done.set()
+
+    def shutdown(self):
+        """Stop the worker pool"""
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+
+batch_service = HoneyfileBatchService()
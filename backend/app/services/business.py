@@ -1,23 +1,150 @@
 """
 Business logic services for DecoyDNA
 """
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Callable
 from datetime import datetime, timedelta
 from sqlalchemy.orm import Session
-from sqlalchemy import desc, and_, or_
+from sqlalchemy.exc import IntegrityError, DataError
+from sqlalchemy import desc, and_, or_, event, inspect, select, func
 
-from app.db.database import SessionLocal
+from app.db.database import SessionLocal, table_versions
 from app.models.database_models import Honeyfile, AccessEvent, AlertSetting, MonitoringStatus
-from app.honeyfiles.generator import HoneyfileGenerator
+from app.honeyfiles.stamping import create_honeyfile_generator
+from app.honeyfiles.seeding import plant_copies, remove_copies
 from app.monitoring.engine import FileMonitoringEngine
+from app.monitoring.client import MonitorClient, MonitorError, MonitorUnavailable, RemoteMonitoringEngine
 from app.alerts.handlers import AlertManager
+from app.services.outbox import AlertOutbox
+from app.monitoring.bridge import LoopBridge
+from app.monitoring.hub import EventHub, build_envelope
+from app.monitoring.tracing import ALERT_PREFIX, LatencyTracker, stamp, without_trace
+from app.utils.cache import LRUTTLCache
+from app.utils.ratelimit import RateLimiter, WriteGate
+from app.utils.metrics import registry as metrics_registry
+from app.config.settings import (
+    HONEYFILE_CACHE_SIZE, HONEYFILE_CACHE_TTL_SECONDS, WS_QUEUE_SIZE, WS_SLOW_CONSUMER_POLICY,
+    EVENT_BUFFER_SIZE, HONEYFILE_STAMPING_ENABLED, MONITORING_MODE, MONITOR_SOCKET_PATH,
+    LATENCY_SAMPLE_SIZE, LATENCY_TRACE_BUFFER, RATE_LIMITS, RATE_LIMIT_MAX_CLIENTS,
+    WRITE_CONCURRENCY_LIMIT, WRITE_RESERVED_FOR_DETECTION, DASHBOARD_CACHE_TTL_SECONDS
+)
+import asyncio
 import json
+import threading
+import time
+import uuid
+
+# Errors that reject a single event rather than the whole batch
+_REJECTED_ROW_ERRORS = (IntegrityError, DataError, ValueError, TypeError)
 
 # Global instances
-honeyfile_generator = HoneyfileGenerator()
-monitoring_engine = FileMonitoringEngine(alert_callback=None)
-alert_manager = AlertManager()
+# In daemon mode the engine lives in the monitoring daemon and this process only talks to it
+monitor_client = MonitorClient(MONITOR_SOCKET_PATH) if MONITORING_MODE == "daemon" else None
+monitoring_engine = RemoteMonitoringEngine(monitor_client) if monitor_client else FileMonitoringEngine(alert_callback=None)
 _monitoring_status = {"is_running": False, "started_at": None}
+honeyfile_cache = LRUTTLCache(max_size=HONEYFILE_CACHE_SIZE, ttl_seconds=HONEYFILE_CACHE_TTL_SECONDS)
+event_hub = EventHub(queue_size=WS_QUEUE_SIZE, policy=WS_SLOW_CONSUMER_POLICY, buffer_size=EVENT_BUFFER_SIZE)
+latency_tracker = LatencyTracker(samples=LATENCY_SAMPLE_SIZE, traces=LATENCY_TRACE_BUFFER)
+rate_limiter = RateLimiter(RATE_LIMITS, max_keys=RATE_LIMIT_MAX_CLIENTS)
+write_gate = WriteGate(limit=WRITE_CONCURRENCY_LIMIT, reserved=WRITE_RESERVED_FOR_DETECTION)
+dashboard_cache = LRUTTLCache(max_size=4, ttl_seconds=max(DASHBOARD_CACHE_TTL_SECONDS, 0.001))
+
+# Tables each cacheable read depends on; "monitoring" is bumped on start/stop
+HONEYFILE_LIST_TABLES = ("honeyfiles",)
+FILE_SHARE_LIST_TABLES = ("file_shares", "file_share_users", "file_share_groups", "share_access_logs")
+DASHBOARD_TABLES = ("honeyfiles", "access_events", "monitoring")
+
+# ==================== LAZY SINGLETONS ====================
+# Built on first use so importing the API does not pay for generator/alert setup
+_LAZY_SINGLETONS = {
+    "honeyfile_generator": lambda: create_honeyfile_generator(stamping=HONEYFILE_STAMPING_ENABLED),
+    "alert_manager": lambda: AlertManager(),
+}
+_lazy_lock = threading.Lock()
+
+def _lazy_singleton(name: str):
+    """Return the module global `name`, creating it on first access"""
+    instance = globals().get(name)
+    if instance is None:
+        with _lazy_lock:
+            instance = globals().get(name)
+            if instance is None:
+                instance = _LAZY_SINGLETONS[name]()
+                globals()[name] = instance
+    return instance
+
+def get_honeyfile_generator():
+    """Shared honeyfile generator"""
+    return _lazy_singleton("honeyfile_generator")
+
+def get_alert_manager() -> AlertManager:
+    """Shared alert manager"""
+    return _lazy_singleton("alert_manager")
+
+def __getattr__(name: str):
+    # Keeps `business.honeyfile_generator` / `business.alert_manager` working
+    if name in _LAZY_SINGLETONS:
+        return _lazy_singleton(name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+# ==================== ALERT OUTBOX ====================
+# Detected events queue their alerts here; traces are recorded once every channel has been tried
+alert_outbox = AlertOutbox(get_alert_manager, on_settled=latency_tracker.record)
+
+# ==================== CACHE INVALIDATION ====================
+# Honeyfiles written by a session are collected at flush and evicted only once the
+# transaction commits, so a reader cannot re-cache a row the commit is about to
+# replace and a rollback leaves the cache alone. Eviction reaches this process's
+# cache only; another process (e.g. the monitoring daemon) sees the change after
+# HONEYFILE_CACHE_TTL_SECONDS.
+_PENDING_HONEYFILES = "pending_honeyfile_ids"
+_ALL_HONEYFILES = object()  # a bulk UPDATE/DELETE whose rows are unknown
+
+def _pending_honeyfile_write(db: Session, decoy_id: str) -> bool:
+    """Whether the session holds a flushed but uncommitted write to `decoy_id`"""
+    pending = db.info.get(_PENDING_HONEYFILES)
+    return bool(pending) and (decoy_id in pending or _ALL_HONEYFILES in pending)
+
+@event.listens_for(Session, "after_flush")
+def _collect_written_honeyfiles(session, flush_context):
+    """Remember the decoy_ids of honeyfiles inserted, updated or deleted by this flush"""
+    written = [obj for obj in (*session.new, *session.dirty, *session.deleted) if isinstance(obj, Honeyfile)]
+    if not written:
+        return
+    pending = session.info.setdefault(_PENDING_HONEYFILES, set())
+    for honeyfile in written:
+        pending.add(honeyfile.decoy_id)
+        # A renamed decoy_id must also evict the old key
+        pending.update(inspect(honeyfile).attrs.decoy_id.history.deleted)
+
+@event.listens_for(Session, "do_orm_execute")
+def _collect_bulk_honeyfile_writes(orm_execute_state):
+    """query.update()/delete() and update(Honeyfile) statements bypass the flush"""
+    if not (orm_execute_state.is_update or orm_execute_state.is_delete):
+        return
+    if any(mapper.class_ is Honeyfile for mapper in orm_execute_state.all_mappers):
+        orm_execute_state.session.info.setdefault(_PENDING_HONEYFILES, set()).add(_ALL_HONEYFILES)
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_committed_honeyfiles(session):
+    """Evict the honeyfiles this transaction wrote, now that readers see the new rows"""
+    pending = session.info.pop(_PENDING_HONEYFILES, None)
+    if not pending:
+        return
+    if _ALL_HONEYFILES in pending:
+        honeyfile_cache.clear()
+        return
+    for decoy_id in pending:
+        honeyfile_cache.invalidate(decoy_id)
+
+@event.listens_for(Session, "after_rollback")
+def _forget_rolled_back_honeyfiles(session):
+    """Rolled-back writes never reached other readers, so cached records stay valid"""
+    session.info.pop(_PENDING_HONEYFILES, None)
+
+def _rows_to_dicts(result) -> List[Dict[str, Any]]:
+    """Turn a column-select result into plain dicts without ORM objects"""
+    keys = list(result.keys())
+    return [dict(zip(keys, row)) for row in result]
 
 class HoneyfileService:
     """Service for honeyfile operations"""
@@ -27,12 +154,19 @@ class HoneyfileService:
                         file_name: str,
                         file_type: str,
                         template_type: str,
-                        seed_locations: List[str]) -> Dict[str, Any]:
+                        seed_locations: List[str],
+                        row_count: Optional[int] = None) -> Dict[str, Any]:
         """Create a new honeyfile"""
         # Generate honeyfile
-        result = honeyfile_generator.generate_honeyfile(file_name, file_type, template_type)
+        if row_count:
+            result = HoneyfileService.generate_dataset(file_name, file_type, template_type, row_count)
+        else:
+            result = get_honeyfile_generator().generate_honeyfile(file_name, file_type, template_type)
+        
+        # Plant identical copies; they reuse the generated file's hash
+        planting = plant_copies(result["file_path"], seed_locations, result["expected_hash"])
         
-        # Store in database
+        # Store in database; copies of a honeyfile that was not recorded are removed
         honeyfile = Honeyfile(
             decoy_id=result["decoy_id"],
             file_name=file_name,
@@ -43,32 +177,99 @@ class HoneyfileService:
             seed_locations=seed_locations,
             metadata_json={
                 "watermark_techniques": result["watermark_techniques"],
-                "created_at": result["created_at"]
+                "created_at": result["created_at"],
+                "planted_paths": planting["planted"],
+                "planting_errors": planting["errors"]
             }
         )
         
-        db.add(honeyfile)
-        db.commit()
-        db.refresh(honeyfile)
+        try:
+            db.add(honeyfile)
+            db.commit()
+            db.refresh(honeyfile)
+        except Exception:
+            db.rollback()
+            remove_copies(planting["planted"])
+            raise
         
         # Register with monitoring engine
         monitoring_engine.register_honeyfile(
             result["file_path"],
             result["decoy_id"],
-            seed_locations
+            seed_locations,
+            planted_paths=planting["planted"]
         )
         
-        return {
-            "id": honeyfile.id,
-            "decoy_id": honeyfile.decoy_id,
-            "file_name": honeyfile.file_name,
-            "file_type": honeyfile.file_type,
-            "template_type": honeyfile.template_type,
-            "created_at": honeyfile.created_at,
-            "expected_hash": honeyfile.expected_hash,
-            "file_path": honeyfile.file_path,
-            "seed_locations": honeyfile.seed_locations,
-        }
+        return HoneyfileService._created_to_dict(honeyfile, planting["planted"], planting["errors"])
+
+    @staticmethod
+    def generate_dataset(file_name: str, file_type: str, template_type: str, row_count: int) -> Dict[str, Any]:
+        """Generate a spreadsheet decoy with `row_count` synthetic rows"""
+        if file_type != "xlsx":
+            raise ValueError("row_count is only supported for xlsx honeyfiles")
+        # openpyxl is heavy to import; load it only when a dataset is requested
+        from app.honeyfiles.datasets import generate_dataset_honeyfile
+        return generate_dataset_honeyfile(file_name, template_type, row_count)
+    
+    @staticmethod
+    def store_generated_honeyfiles(generated: List[tuple]) -> List[Dict[str, Any]]:
+        """Insert already generated honeyfiles in one transaction and register them
+    
+        Args:
+            generated: (spec, generator result) pairs, spec holding file_name,
+                file_type, template_type and seed_locations; copies are
+                expected to be planted already (result["planted_paths"])
+        """
+        if not generated:
+            return []
+    
+        db = SessionLocal()
+        try:
+            honeyfiles = [
+                Honeyfile(
+                    decoy_id=result["decoy_id"],
+                    file_name=spec["file_name"],
+                    file_type=spec["file_type"],
+                    template_type=spec["template_type"],
+                    expected_hash=result["expected_hash"],
+                    file_path=result["file_path"],
+                    seed_locations=spec["seed_locations"],
+                    metadata_json={
+                        "watermark_techniques": result["watermark_techniques"],
+                        "created_at": result["created_at"],
+                        "planted_paths": result.get("planted_paths", []),
+                        "planting_errors": result.get("planting_errors", [])
+                    }
+                )
+                for spec, result in generated
+            ]
+            db.add_all(honeyfiles)
+            db.flush()
+            # Read back ids before commit expires the instances
+            records = [
+                HoneyfileService._created_to_dict(h, result.get("planted_paths", []),
+                                                  result.get("planting_errors", []))
+                for h, (_, result) in zip(honeyfiles, generated)
+            ]
+            db.commit()
+        except Exception:
+            db.rollback()
+            remove_copies([path for _, result in generated for path in result.get("planted_paths", [])])
+            raise
+        finally:
+            db.close()
+    
+        monitoring_engine.register_honeyfiles([
+            {
+                "file_path": result["file_path"],
+                "decoy_id": result["decoy_id"],
+                "seed_locations": spec["seed_locations"],
+                "planted_paths": result.get("planted_paths"),
+            }
+            for spec, result in generated
+        ])
+    
+        return records
     
     @staticmethod
     def list_honeyfiles(db: Session, skip: int = 0, limit: int = 100) -> List[Dict[str, Any]]:
@@ -89,23 +290,77 @@ class HoneyfileService:
             for h in honeyfiles
         ]
     
+    @staticmethod
+    def list_honeyfile_rows(db: Session, skip: int = 0, limit: int = 100) -> List[Dict[str, Any]]:
+        """List honeyfiles as plain column dicts for the fast response path"""
+        result = db.execute(
+            select(
+                Honeyfile.id,
+                Honeyfile.decoy_id,
+                Honeyfile.file_name,
+                Honeyfile.file_type,
+                Honeyfile.template_type,
+                Honeyfile.created_at,
+                Honeyfile.expected_hash,
+                Honeyfile.file_path,
+                Honeyfile.seed_locations,
+            ).offset(skip).limit(limit)
+        )
+        return _rows_to_dicts(result)
+    
     @staticmethod
     def get_honeyfile(db: Session, decoy_id: str) -> Optional[Dict[str, Any]]:
-        """Get honeyfile by decoy_id"""
-        honeyfile = db.query(Honeyfile).filter(Honeyfile.decoy_id == decoy_id).first()
-        if not honeyfile:
-            return None
-        return {
-            "id": honeyfile.id,
-            "decoy_id": honeyfile.decoy_id,
-            "file_name": honeyfile.file_name,
-            "file_type": honeyfile.file_type,
-            "template_type": honeyfile.template_type,
-            "created_at": honeyfile.created_at,
-            "expected_hash": honeyfile.expected_hash,
-            "file_path": honeyfile.file_path,
-            "seed_locations": honeyfile.seed_locations,
-        }
+        """Get honeyfile by decoy_id (read-through cached)"""
+        def load():
+            honeyfile = db.query(Honeyfile).filter(Honeyfile.decoy_id == decoy_id).first()
+            return HoneyfileService._honeyfile_to_dict(honeyfile) if honeyfile else None
+        
+        # This session's own uncommitted write is read directly and never cached
+        if _pending_honeyfile_write(db, decoy_id):
+            return load()
+        record = honeyfile_cache.get(decoy_id)
+        if record is None:
+            record = load()
+            # load() may autoflush a write of this session; it is cached after the commit
+            if record is not None and not _pending_honeyfile_write(db, decoy_id):
+                honeyfile_cache.set(decoy_id, record)
+        return dict(record) if record else None
+    
+    @staticmethod
+    def get_honeyfile_cached(decoy_id: str) -> Optional[Dict[str, Any]]:
+        """Get honeyfile by decoy_id from threads without a request session"""
+        record = honeyfile_cache.get(decoy_id)
+        if record is not None:
+            return dict(record)
+        db = SessionLocal()
+        try:
+            return HoneyfileService.get_honeyfile(db, decoy_id)
+        finally:
+            db.close()
+    
+    @staticmethod
+    def enrich_event(forensic_context: Dict[str, Any]) -> Dict[str, Any]:
+        """Attach honeyfile metadata to a detected event for alerting and storage"""
+        decoy_id = forensic_context.get("decoy_id")
+        honeyfile = HoneyfileService.get_honeyfile_cached(decoy_id) if decoy_id else None
+        if honeyfile:
+            forensic_context.setdefault("file_name", honeyfile["file_name"])
+            forensic_context.setdefault("file_type", honeyfile["file_type"])
+            forensic_context.setdefault("template_type", honeyfile["template_type"])
+            forensic_context.setdefault("seed_locations", list(honeyfile["seed_locations"] or []))
+        return forensic_context
+    
+    @staticmethod
+    def get_cache_stats() -> Dict[str, Any]:
+        """Get honeyfile cache hit/miss statistics"""
+        return honeyfile_cache.get_stats()
+    
+    @staticmethod
+    def get_generator_stats() -> Optional[Dict[str, Any]]:
+        """Get template-stamping counters, if stamping is enabled and the generator was built"""
+        # Reporting must not build the generator (and import its document libraries)
+        get_stats = getattr(globals().get("honeyfile_generator"), "get_stats", None)
+        return get_stats() if get_stats else None
     
     @staticmethod
     def search_honeyfiles(db: Session, query: str, search_type: str = "decoy_id") -> List[Dict[str, Any]]:
@@ -142,6 +397,31 @@ class HoneyfileService:
             }
             for h in honeyfiles
         ]
+    
+    @staticmethod
+    def _created_to_dict(honeyfile: Honeyfile,
+                         planted_paths: List[str],
+                         planting_errors: List[Dict[str, str]]) -> Dict[str, Any]:
+        """A new honeyfile plus where its copies went and which seed locations failed"""
+        record = HoneyfileService._honeyfile_to_dict(honeyfile)
+        record["planted_paths"] = planted_paths
+        record["planting_errors"] = planting_errors
+        return record
+    
+    @staticmethod
+    def _honeyfile_to_dict(honeyfile: Honeyfile) -> Dict[str, Any]:
+        """Convert honeyfile object to dictionary"""
+        return {
+            "id": honeyfile.id,
+            "decoy_id": honeyfile.decoy_id,
+            "file_name": honeyfile.file_name,
+            "file_type": honeyfile.file_type,
+            "template_type": honeyfile.template_type,
+            "created_at": honeyfile.created_at,
+            "expected_hash": honeyfile.expected_hash,
+            "file_path": honeyfile.file_path,
+            "seed_locations": honeyfile.seed_locations,
+        }
 
 class EventService:
     """Service for access event operations"""
@@ -149,21 +429,7 @@ class EventService:
     @staticmethod
     def create_event(db: Session, forensic_data: Dict[str, Any]) -> Dict[str, Any]:
         """Create a new access event"""
-        event = AccessEvent(
-            decoy_id=forensic_data.get("decoy_id"),
-            event_type=forensic_data.get("event_type", "unknown"),
-            timestamp=datetime.fromisoformat(forensic_data.get("timestamp", datetime.utcnow().isoformat())),
-            accessed_path=forensic_data.get("accessed_path"),
-            username=forensic_data.get("username", "unknown"),
-            hostname=forensic_data.get("hostname", "unknown"),
-            internal_ip=forensic_data.get("internal_ip"),
-            mac_address=forensic_data.get("mac_address"),
-            process_name=forensic_data.get("process_name"),
-            process_command=forensic_data.get("process_command"),
-            file_hash=forensic_data.get("file_hash"),
-            source_ip=forensic_data.get("source_ip"),
-            forensic_json=forensic_data,
-        )
+        event = EventService._build_event(forensic_data)
         
         db.add(event)
         db.commit()
@@ -180,7 +446,63 @@ class EventService:
         }
     
     @staticmethod
-    def get_events(db: Session, 
+    def create_events(db: Session,
+                      events: List[Dict[str, Any]],
+                      related: Optional[Callable[[Dict[str, Any]], List[Any]]] = None) -> List[Dict[str, Any]]:
+        """Insert a batch of access events in a single transaction; returns the stored events
+        
+        `related(event)` may return more rows (such as queued alerts) to store
+        with each event. If one event is rejected, the batch is retried one
+        event per transaction and only the rejected events are dropped.
+        """
+        def rows(forensic_data):
+            return [EventService._build_event(forensic_data)] + (related(forensic_data) if related else [])
+        
+        try:
+            db.add_all([row for forensic_data in events for row in rows(forensic_data)])
+            db.commit()
+            return list(events)
+        except _REJECTED_ROW_ERRORS:
+            db.rollback()
+        except Exception:
+            db.rollback()
+            raise
+        
+        stored = []
+        for forensic_data in events:
+            try:
+                db.add_all(rows(forensic_data))
+                db.commit()
+                stored.append(forensic_data)
+            except _REJECTED_ROW_ERRORS as e:
+                db.rollback()
+                print(f"Dropping access event for {forensic_data.get('decoy_id')}: {e}")
+        return stored
+    
+    @staticmethod
+    def _build_event(forensic_data: Dict[str, Any]) -> AccessEvent:
+        """Map a forensic context onto an AccessEvent row"""
+        return AccessEvent(
+            id=forensic_data.get("event_id") or str(uuid.uuid4()),
+            decoy_id=forensic_data.get("decoy_id"),
+            event_type=forensic_data.get("event_type", "unknown"),
+            timestamp=datetime.fromisoformat(forensic_data.get("timestamp", datetime.utcnow().isoformat())),
+            accessed_path=forensic_data.get("accessed_path"),
+            username=forensic_data.get("username", "unknown"),
+            hostname=forensic_data.get("hostname", "unknown"),
+            internal_ip=forensic_data.get("internal_ip"),
+            mac_address=forensic_data.get("mac_address"),
+            process_name=forensic_data.get("process_name"),
+            process_command=forensic_data.get("process_command"),
+            file_hash=forensic_data.get("file_hash"),
+            source_ip=forensic_data.get("source_ip"),
+            forensic_json=without_trace(forensic_data),
+            sequence=forensic_data.get("sequence"),
+            alert_sent=forensic_data.get("alert_sent", "pending"),
+        )
+    
+    @staticmethod
+    def get_events(db: Session,
                   skip: int = 0,
                   limit: int = 100,
                   decoy_id: Optional[str] = None,
@@ -214,6 +536,55 @@ class EventService:
             for e in events
         ]
     
+    @staticmethod
+    def get_event_rows(db: Session,
+                       skip: int = 0,
+                       limit: int = 100,
+                       decoy_id: Optional[str] = None,
+                       hours: int = 24) -> List[Dict[str, Any]]:
+        """Get access events as plain column dicts for the fast response path"""
+        query = select(
+            AccessEvent.id,
+            AccessEvent.decoy_id,
+            AccessEvent.event_type,
+            AccessEvent.timestamp,
+            AccessEvent.accessed_path,
+            AccessEvent.username,
+            AccessEvent.hostname,
+            AccessEvent.internal_ip,
+            AccessEvent.mac_address,
+            AccessEvent.process_name,
+            AccessEvent.process_command,
+            AccessEvent.file_hash,
+            (AccessEvent.alert_sent == "sent").label("alert_sent"),
+        )
+        
+        if decoy_id:
+            query = query.where(AccessEvent.decoy_id == decoy_id)
+        
+        time_threshold = datetime.utcnow() - timedelta(hours=hours)
+        query = query.where(AccessEvent.timestamp >= time_threshold)
+        
+        result = db.execute(query.order_by(desc(AccessEvent.timestamp)).offset(skip).limit(limit))
+        return _rows_to_dicts(result)
+    
+    @staticmethod
+    def get_events_after_sequence(db: Session,
+                                  after: int,
+                                  before: Optional[int] = None,
+                                  limit: int = 1000) -> List[Dict[str, Any]]:
+        """Get stored forensic contexts with after < sequence < before, oldest first"""
+        query = db.query(AccessEvent.forensic_json, AccessEvent.sequence).filter(AccessEvent.sequence > after)
+        if before is not None:
+            query = query.filter(AccessEvent.sequence < before)
+        rows = query.order_by(AccessEvent.sequence).limit(limit).all()
+        return [dict(forensic_json or {}, sequence=sequence) for forensic_json, sequence in rows]
+    
+    @staticmethod
+    def get_last_sequence(db: Session) -> int:
+        """Get the highest persisted event sequence"""
+        return db.query(func.max(AccessEvent.sequence)).scalar() or 0
+    
     @staticmethod
     def count_events_today(db: Session, decoy_id: Optional[str] = None) -> int:
         """Count events in last 24 hours"""
@@ -235,24 +606,37 @@ class MonitoringService:
         """Start file monitoring"""
         global _monitoring_status
         
+        if monitor_client is not None:
+            try:
+                return await asyncio.to_thread(monitor_client.call, "start", directories=directories)
+            except (MonitorUnavailable, MonitorError) as e:
+                return {"status": "error", "message": str(e)}
+            finally:
+                table_versions.bump("monitoring")
+        
         if _monitoring_status["is_running"]:
             return {"status": "already_running"}
         
         try:
-            # Load all honeyfiles from database
+            # Load all honeyfiles from database, with the copies actually planted
+            # (renamed on collision, or hard-linked) where they were recorded
             honeyfiles = db.query(Honeyfile).all()
-            for hf in honeyfiles:
-                monitoring_engine.register_honeyfile(
-                    hf.file_path,
-                    hf.decoy_id,
-                    hf.seed_locations or []
-                )
+            monitoring_engine.register_honeyfiles([
+                {
+                    "file_path": hf.file_path,
+                    "decoy_id": hf.decoy_id,
+                    "seed_locations": hf.seed_locations or [],
+                    "planted_paths": (hf.metadata_json or {}).get("planted_paths"),
+                }
+                for hf in honeyfiles
+            ])
             
             # Start monitoring
             monitoring_engine.start(directories)
             
             _monitoring_status["is_running"] = True
             _monitoring_status["started_at"] = datetime.utcnow()
+            table_versions.bump("monitoring")
             
             return {
                 "status": "started",
@@ -267,27 +651,71 @@ class MonitoringService:
         """Stop file monitoring"""
         global _monitoring_status
         
+        if monitor_client is not None:
+            try:
+                return monitor_client.call("stop")
+            except (MonitorUnavailable, MonitorError) as e:
+                return {"status": "error", "message": str(e)}
+            finally:
+                table_versions.bump("monitoring")
+        
         if not _monitoring_status["is_running"]:
             return {"status": "not_running"}
         
         monitoring_engine.stop()
         _monitoring_status["is_running"] = False
+        table_versions.bump("monitoring")
         
         return {"status": "stopped"}
     
+    @staticmethod
+    def get_engine_state() -> Dict[str, Any]:
+        """Run state and engine status, asked of the daemon in daemon mode"""
+        if monitor_client is None:
+            return {
+                "is_running": _monitoring_status["is_running"],
+                "started_at": _monitoring_status["started_at"],
+                "last_heartbeat": _monitoring_status["started_at"],
+                "engine_status": monitoring_engine.get_status()
+            }
+        try:
+            return monitor_client.call("status")
+        except (MonitorUnavailable, MonitorError) as e:
+            return {
+                "is_running": False,
+                "started_at": None,
+                "last_heartbeat": None,
+                "engine_status": {"is_running": False, "error": str(e)}
+            }
+    
+    @staticmethod
+    def get_latency_stats() -> Dict[str, Any]:
+        """Per-stage detection latency percentiles from whichever process runs the pipeline"""
+        if monitor_client is not None:
+            return monitor_client.call("latency")
+        return latency_tracker.get_stats()
+    
+    @staticmethod
+    def get_latency_trace(min_total_ms: float = 0.0, limit: int = 100) -> Dict[str, Any]:
+        """Chrome trace of the slowest recent events"""
+        if monitor_client is not None:
+            return monitor_client.call("latency_trace", min_total_ms=min_total_ms, limit=limit)
+        return latency_tracker.chrome_trace(min_total_ms, limit)
+    
     @staticmethod
     def get_monitoring_status(db: Session) -> Dict[str, Any]:
         """Get current monitoring status"""
         honeyfiles_count = db.query(Honeyfile).count()
         events_today = EventService.count_events_today(db)
+        state = MonitoringService.get_engine_state()
         
         return {
-            "is_running": _monitoring_status["is_running"],
-            "started_at": _monitoring_status["started_at"],
-            "last_heartbeat": _monitoring_status.get("started_at"),
+            "is_running": state["is_running"],
+            "started_at": state["started_at"],
+            "last_heartbeat": state["last_heartbeat"],
             "honeyfiles_registered": honeyfiles_count,
             "events_today": events_today,
-            "engine_status": monitoring_engine.get_status()
+            "engine_status": state["engine_status"]
         }
 
 class AlertService:
@@ -295,8 +723,32 @@ class AlertService:
     
     @staticmethod
     async def send_alert(event: Dict[str, Any]) -> Dict[str, bool]:
-        """Send alert for an event"""
-        return await alert_manager.send_alert(event)
+        """Send an alert right away, bypassing the outbox (test alerts)"""
+        return await get_alert_manager().send_alert(event)
+    
+    @staticmethod
+    async def start_clients():
+        """Open pooled alert clients (on startup)"""
+        await get_alert_manager().start()
+    
+    @staticmethod
+    async def close_clients():
+        """Close pooled alert clients, if the alert manager was ever created"""
+        manager = globals().get("alert_manager")
+        if manager is not None:
+            await manager.close()
+    
+    @staticmethod
+    def get_outbox(db: Session) -> Dict[str, Any]:
+        """Alert outbox delivery counts, recent dead letters and dispatcher counters"""
+        summary = AlertOutbox.get_summary(db)
+        summary["dispatcher"] = alert_outbox.get_stats()
+        return summary
+    
+    @staticmethod
+    def retry_dead_alerts(db: Session, channel: Optional[str] = None) -> int:
+        """Requeue dead-lettered alert deliveries"""
+        return alert_outbox.retry_dead(db, channel)
     
     @staticmethod
     def get_alert_settings(db: Session) -> Dict[str, Dict[str, Any]]:
@@ -345,8 +797,35 @@ class DashboardService:
     """Service for dashboard statistics"""
     
     @staticmethod
-    def get_dashboard_stats(db: Session) -> Dict[str, Any]:
-        """Get dashboard statistics"""
+    def cache_window() -> int:
+        """Current dashboard cache window; time-based counts may change between windows"""
+        if DASHBOARD_CACHE_TTL_SECONDS <= 0:
+            return time.time_ns()
+        return int(time.time() // DASHBOARD_CACHE_TTL_SECONDS)
+    
+    @staticmethod
+    def window_started(window: int) -> float:
+        """Epoch seconds at which a cache window began"""
+        if DASHBOARD_CACHE_TTL_SECONDS <= 0:
+            return window / 1e9
+        return window * DASHBOARD_CACHE_TTL_SECONDS
+    
+    @staticmethod
+    def get_dashboard_stats(db: Session, window: Optional[int] = None) -> Dict[str, Any]:
+        """Get dashboard statistics, cached until a write or the window ends"""
+        if window is None:
+            window = DashboardService.cache_window()
+        key = table_versions.key(DASHBOARD_TABLES, window)
+        return dict(dashboard_cache.get_or_load(key, lambda: DashboardService._compute_stats(db)))
+    
+    @staticmethod
+    def get_cache_stats() -> Dict[str, Any]:
+        """Get dashboard stats cache hit/miss statistics"""
+        return dashboard_cache.get_stats()
+    
+    @staticmethod
+    def _compute_stats(db: Session) -> Dict[str, Any]:
+        """Run the dashboard statistics queries"""
         total_honeyfiles = db.query(Honeyfile).count()
         total_events = db.query(AccessEvent).count()
         alerts_today = EventService.count_events_today(db)
@@ -356,12 +835,220 @@ class DashboardService:
         events_last_hour = db.query(AccessEvent).filter(
             AccessEvent.timestamp >= one_hour_ago
         ).count()
+        state = MonitoringService.get_engine_state()
         
         return {
             "total_honeyfiles": total_honeyfiles,
             "total_events": total_events,
             "alerts_today": alerts_today,
             "events_last_hour": events_last_hour,
-            "monitoring_status": _monitoring_status["is_running"],
-            "uptime_started": _monitoring_status["started_at"]
+            "monitoring_status": state["is_running"],
+            "uptime_started": state["started_at"]
         }
+
+class EventPipeline:
+    """Single consumer of monitoring events: persist and queue alerts, then broadcast
+
+    Installed once as the engine's alert_callback, so persistence and
+    alerting happen exactly once per event no matter how many dashboards
+    are connected. Events cross from the monitoring threads to the API
+    loop through a LoopBridge and are processed a batch per loop tick.
+    Alerts are written to the alert outbox in the same transaction as the
+    events and delivered by its dispatcher, never inline.
+    
+    In daemon mode the pipeline runs inside the monitoring daemon and API
+    workers only relay its already persisted events to their own
+    subscribers, so adding workers never duplicates rows or alerts.
+    """
+    
+    def __init__(self, hub: EventHub):
+        self.hub = hub
+        self.bridge = LoopBridge(self.process_batch)
+        self.loop: Optional[asyncio.AbstractEventLoop] = None
+        self.processed = 0
+        self.errors = 0
+        self.dropped = 0
+        self._relay_task: Optional[asyncio.Task] = None
+        self.relayed = 0
+    
+    def attach(self, loop: asyncio.AbstractEventLoop):
+        """Bind to the API event loop and take over the engine callback"""
+        self.loop = loop
+        self.hub.attach_loop(loop)
+        db = SessionLocal()
+        try:
+            self.hub.set_sequence(EventService.get_last_sequence(db))
+        finally:
+            db.close()
+        if monitor_client is not None:
+            self._relay_task = loop.create_task(self._relay_daemon_events())
+            return
+        self.bridge.start(loop)
+        alert_outbox.start(loop)
+        monitoring_engine.alert_callback = self.bridge.submit
+    
+    async def detach(self):
+        """Flush pending events and release the engine callback"""
+        if self._relay_task is not None:
+            self._relay_task.cancel()
+            try:
+                await self._relay_task
+            except asyncio.CancelledError:
+                pass
+            self._relay_task = None
+        if monitoring_engine.alert_callback == self.bridge.submit:
+            monitoring_engine.alert_callback = None
+        await self.bridge.stop()
+        await alert_outbox.stop()
+    
+    async def process_batch(self, events: List[Dict[str, Any]]):
+        """Persist a batch and its alerts in one transaction, then broadcast"""
+        handed_off = time.time_ns()
+        for forensic_context in events:
+            stamp(forensic_context, "handed_off", handed_off)
+            forensic_context["sequence"] = self.hub.allocate_sequence()
+        
+        stored = []
+        try:
+            stored = await asyncio.to_thread(self._persist_batch, events)
+        except Exception as e:
+            self.errors += 1
+            print(f"Event persistence failed: {e}")
+        if len(stored) < len(events):
+            # No alert was queued for these, so alert on them directly
+            kept = {id(forensic_context) for forensic_context in stored}
+            unstored = [forensic_context for forensic_context in events if id(forensic_context) not in kept]
+            self.dropped += len(unstored)
+            alert_outbox.send_unstored(unstored)
+        persisted = time.time_ns()
+        
+        for forensic_context in events:
+            stamp(forensic_context, "persisted", persisted)
+            self.hub.publish(build_envelope(forensic_context))
+            stamp(forensic_context, "broadcast")
+            # Queued alerts finish the trace when the dispatcher has tried every channel
+            if not alert_outbox.is_tracking(forensic_context):
+                if forensic_context.get("alert_sent") == "aggregated":
+                    stamp(forensic_context, ALERT_PREFIX + "aggregated")
+                latency_tracker.record(forensic_context)
+        
+        alert_outbox.wake()
+        self.processed += len(events)
+    
+    async def _relay_daemon_events(self):
+        """Republish the monitoring daemon's events to this worker's hub
+        
+        Reconnects with backoff; events missed while disconnected are still
+        in the database, where SSE clients catch up through replay.
+        """
+        delay = 0.5
+        while True:
+            try:
+                async for payload in monitor_client.events():
+                    envelope = json.loads(payload)
+                    self.hub.set_sequence(envelope.get("sequence") or 0)
+                    self.hub.publish(envelope, payload=payload)
+                    self.relayed += 1
+                    delay = 0.5
+            except (MonitorUnavailable, MonitorError, OSError, ValueError) as e:
+                print(f"Monitoring daemon event stream lost: {e}")
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, 10.0)
+    
+    @staticmethod
+    def _persist_batch(events: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Enrich and insert a batch of events with their queued alerts; returns the stored events (worker thread)"""
+        for forensic_context in events:
+            HoneyfileService.enrich_event(forensic_context)
+        alerts = alert_outbox.prepare(events)
+        # Counted against the write cap so requests back off while detections are stored
+        with write_gate.internal():
+            db = SessionLocal()
+            try:
+                stored = EventService.create_events(
+                    db, events, related=lambda forensic_context: AlertOutbox.rows_for(alerts, forensic_context)
+                )
+            finally:
+                db.close()
+        alert_outbox.track(stored, alerts)
+        return stored
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """Get pipeline, bridge and hub counters"""
+        return {
+            "mode": MONITORING_MODE,
+            "processed": self.processed,
+            "relayed": self.relayed,
+            "errors": self.errors,
+            "dropped": self.dropped,
+            "bridge": self.bridge.get_stats(),
+            "hub": self.hub.get_stats(),
+            "alerts": alert_outbox.get_stats(),
+        }
+
+event_pipeline = EventPipeline(event_hub)
+
+# ==================== METRICS ====================
+def _collect_service_metrics():
+    """Cache, event pipeline, hub and monitoring engine counters for /metrics"""
+    cache = honeyfile_cache.get_stats()
+    pipeline = event_pipeline.get_stats()
+    bridge, hub = pipeline["bridge"], pipeline["hub"]
+    engine = MonitoringService.get_engine_state()["engine_status"]
+    gate = write_gate.get_stats()
+    limits = rate_limiter.get_stats()["limits"]
+    # Only report alert counters once something has alerted; don't build the manager here
+    manager = globals().get("alert_manager")
+    aggregation = manager.get_stats()["aggregation"] if manager is not None else {}
+    outbox = alert_outbox.get_stats()
+    
+    def family(name, kind, documentation, value):
+        return (name, kind, documentation, [({}, value)])
+    
+    return [
+        ("decoydna_honeyfile_cache_lookups_total", "counter", "Honeyfile cache lookups by result",
+         [({"result": "hit"}, cache["hits"]), ({"result": "miss"}, cache["misses"])]),
+        family("decoydna_honeyfile_cache_evictions_total", "counter", "Honeyfile cache LRU evictions", cache["evictions"]),
+        family("decoydna_honeyfile_cache_entries", "gauge", "Honeyfile cache entries", cache["size"]),
+        family("decoydna_events_processed_total", "counter", "Events persisted with their alerts queued by this process", pipeline["processed"]),
+        family("decoydna_events_relayed_total", "counter", "Events relayed from the monitoring daemon", pipeline["relayed"]),
+        family("decoydna_event_pipeline_errors_total", "counter", "Event batches that failed to persist", pipeline["errors"]),
+        family("decoydna_event_bridge_pending", "gauge", "Events waiting to cross into the event loop", bridge["pending"]),
+        family("decoydna_event_bridge_batches_total", "counter", "Event batches handed to the event loop", bridge["batches"]),
+        family("decoydna_event_subscribers", "gauge", "Connected WebSocket/SSE subscribers", hub["subscribers"]),
+        family("decoydna_events_published_total", "counter", "Events broadcast to subscribers", hub["published"]),
+        family("decoydna_events_dropped_total", "counter", "Events dropped for slow subscribers", hub["dropped"]),
+        family("decoydna_monitoring_running", "gauge", "1 while the monitoring engine is running",
+               1 if engine.get("is_running") else 0),
+        family("decoydna_monitoring_honeyfiles", "gauge", "Paths registered with the monitoring engine",
+               engine.get("total_honeyfiles")),
+        family("decoydna_monitoring_watched_directories", "gauge", "Directories watched by the monitoring engine",
+               len(engine["watched_directories"]) if "watched_directories" in engine else None),
+        family("decoydna_monitoring_queue_size", "gauge", "Detected events waiting in the engine queue",
+               engine.get("queue_size")),
+        family("decoydna_monitoring_events_detected_total", "counter", "Honeyfile events detected by the engine",
+               engine.get("events_detected")),
+        family("decoydna_monitoring_callback_errors_total", "counter", "Engine event callbacks that raised",
+               engine.get("callback_errors")),
+        ("decoydna_rate_limited_requests_total", "counter", "Requests rejected by per-client rate limits",
+         [({"limit": name}, limit["rejected"]) for name, limit in limits.items()]),
+        ("decoydna_write_admissions_total", "counter", "DB-writing requests admitted or rejected by the write cap",
+         [({"result": "admitted"}, gate["admitted"]), ({"result": "rejected"}, gate["rejected"])]),
+        ("decoydna_writes_in_flight", "gauge", "DB writes in progress by source",
+         [({"source": "request"}, gate["in_flight"]), ({"source": "detection"}, gate["internal_in_flight"])]),
+        ("decoydna_alert_events_total", "counter", "Alerting events sent immediately or folded into a summary",
+         [({"result": "immediate"}, aggregation.get("immediate")), ({"result": "folded"}, aggregation.get("folded"))]),
+        family("decoydna_alert_summaries_total", "counter", "Summary alerts sent for folded events",
+               aggregation.get("summaries")),
+        family("decoydna_alert_aggregation_groups", "gauge", "Open alert aggregation groups",
+               aggregation.get("open_groups")),
+        family("decoydna_alert_aggregation_evictions_total", "counter",
+               "Aggregation groups closed early because too many were open", aggregation.get("evicted")),
+        ("decoydna_alert_delivery_attempts_total", "counter", "Alert outbox send attempts by outcome",
+         [({"result": "sent"}, outbox["sent"]), ({"result": "retried"}, outbox["retried"]),
+          ({"result": "dead"}, outbox["dead"])]),
+        ("decoydna_alert_sends_in_flight", "gauge", "Alert sends in progress by channel",
+         [({"channel": channel}, count) for channel, count in outbox["in_flight"].items()]),
+    ]
+
+metrics_registry.register_collector(_collect_service_metrics)
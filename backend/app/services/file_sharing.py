@@ -2,12 +2,168 @@
 File Sharing Service for DecoyDNA
 """
 from sqlalchemy.orm import Session
-from sqlalchemy import desc
-from app.models.file_sharing import FileShare, ShareAccessLog
-from datetime import datetime, timedelta
-from typing import List, Optional
+from sqlalchemy import desc, func, select, insert, union, update, case, or_, bindparam, DateTime
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from app.db.database import SessionLocal
+from app.models.file_sharing import (
+    FileShare, ShareAccessLog, ShareAccessDailyRollup, ShareUserMember, ShareGroupMember
+)
+from app.config.settings import SHARE_COUNTER_FLUSH_SECONDS
+from datetime import datetime, timedelta, time
+from typing import Dict, List, Optional, Tuple
+import logging
+import threading
 import uuid
 
+logger = logging.getLogger(__name__)
+
+
+class ShareAccessCounter:
+    """Write-behind aggregator for FileShare.access_count and last_accessed
+
+    log_access folds increments here instead of doing a read-modify-write on
+    the share row; a background thread applies them in one transaction with
+    relative UPDATEs so concurrent increments are never lost.
+    """
+
+    def __init__(self, flush_interval: float = SHARE_COUNTER_FLUSH_SECONDS, session_factory=SessionLocal):
+        self.flush_interval = flush_interval
+        self._session_factory = session_factory
+        self._pending: Dict[str, list] = {}  # share_id -> [increments, last_accessed]
+        self._lock = threading.Lock()
+        self._stop_event = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self.flushes = 0
+        self.flushed_increments = 0
+
+    def increment(self, share_id: str, accessed_at: datetime, count: int = 1):
+        """Record accesses to a share"""
+        with self._lock:
+            entry = self._pending.get(share_id)
+            if entry is None:
+                self._pending[share_id] = [count, accessed_at]
+            else:
+                entry[0] += count
+                if accessed_at > entry[1]:
+                    entry[1] = accessed_at
+
+    def pending(self, share_id: str) -> Tuple[int, Optional[datetime]]:
+        """Get increments not yet written for a share"""
+        with self._lock:
+            entry = self._pending.get(share_id)
+            return (entry[0], entry[1]) if entry else (0, None)
+
+    def flush(self) -> int:
+        """Apply all pending increments in a single transaction"""
+        with self._lock:
+            batch, self._pending = self._pending, {}
+        if not batch:
+            return 0
+
+        table = FileShare.__table__
+        seen = bindparam("b_seen", type_=DateTime)
+        stmt = (
+            update(table)
+            .where(table.c.id == bindparam("b_share_id"))
+            .values(
+                access_count=func.coalesce(table.c.access_count, 0) + bindparam("b_delta"),
+                last_accessed=case(
+                    (or_(table.c.last_accessed.is_(None), table.c.last_accessed < seen), seen),
+                    else_=table.c.last_accessed,
+                ),
+            )
+        )
+        params = [
+            {"b_share_id": share_id, "b_delta": count, "b_seen": last_accessed}
+            for share_id, (count, last_accessed) in batch.items()
+        ]
+
+        db = self._session_factory()
+        try:
+            db.execute(stmt, params)
+            db.commit()
+        except Exception as e:
+            db.rollback()
+            # Put the batch back so the next flush retries it
+            for share_id, (count, last_accessed) in batch.items():
+                self.increment(share_id, last_accessed, count)
+            logger.error(f"Share access counter flush failed: {e}")
+            return 0
+        finally:
+            db.close()
+
+        self.flushes += 1
+        self.flushed_increments += sum(count for count, _ in batch.values())
+        return len(batch)
+
+    def reconcile(self, db: Session) -> int:
+        """Raise stored counters to what the access log proves happened
+
+        Logs are written synchronously while counters are write-behind, so
+        increments still pending at a crash are recovered from the log.
+        """
+        table = FileShare.__table__
+        log_count = (
+            select(func.count())
+            .where(ShareAccessLog.share_id == table.c.id)
+            .scalar_subquery()
+        )
+        last_log = (
+            select(func.max(ShareAccessLog.accessed_at))
+            .where(ShareAccessLog.share_id == table.c.id)
+            .scalar_subquery()
+        )
+        stmt = update(table).values(
+            access_count=func.max(func.coalesce(table.c.access_count, 0), log_count),
+            last_accessed=case(
+                (or_(table.c.last_accessed.is_(None), table.c.last_accessed < last_log), last_log),
+                else_=table.c.last_accessed,
+            ),
+        )
+        try:
+            result = db.execute(stmt)
+            db.commit()
+            return result.rowcount
+        except Exception as e:
+            db.rollback()
+            raise Exception(f"Failed to reconcile share counters: {str(e)}")
+
+    def start(self):
+        """Start the background flush thread"""
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._run, name="share-counter-flush", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Stop the flush thread and write what is left"""
+        self._stop_event.set()
+        if self._thread:
+            self._thread.join(timeout=5)
+            self._thread = None
+        self.flush()
+
+    def _run(self):
+        while not self._stop_event.wait(self.flush_interval):
+            self.flush()
+
+    def get_stats(self) -> dict:
+        """Get flush statistics"""
+        with self._lock:
+            pending_shares = len(self._pending)
+            pending_increments = sum(entry[0] for entry in self._pending.values())
+        return {
+            "pending_shares": pending_shares,
+            "pending_increments": pending_increments,
+            "flushes": self.flushes,
+            "flushed_increments": self.flushed_increments,
+            "flush_interval": self.flush_interval,
+        }
+
+
+share_access_counter = ShareAccessCounter()
+
 
 class FileShareService:
     """Service for managing file shares"""
@@ -28,10 +184,9 @@ class FileShareService:
                 share_name=share_name,
                 share_path=share_path,
                 description=description,
-                is_sensitive=is_sensitive,
-                shared_with_users=",".join(shared_with_users) if shared_with_users else None,
-                shared_with_groups=",".join(shared_with_groups) if shared_with_groups else None
+                is_sensitive=is_sensitive
             )
+            FileShareService._set_members(share, shared_with_users or [], shared_with_groups or [])
             db.add(share)
             db.commit()
             db.refresh(share)
@@ -67,9 +222,9 @@ class FileShareService:
             # Update fields
             for key, value in kwargs.items():
                 if key == 'shared_with_users' and isinstance(value, list):
-                    setattr(share, key, ",".join(value))
+                    FileShareService._set_members(share, users=value)
                 elif key == 'shared_with_groups' and isinstance(value, list):
-                    setattr(share, key, ",".join(value))
+                    FileShareService._set_members(share, groups=value)
                 elif hasattr(share, key):
                     setattr(share, key, value)
 
@@ -81,6 +236,55 @@ class FileShareService:
             db.rollback()
             raise Exception(f"Failed to update file share: {str(e)}")
 
+    @staticmethod
+    def find_shares_for_user(
+        db: Session,
+        username: str,
+        groups: Optional[List[str]] = None,
+        sensitive_only: bool = False,
+        skip: int = 0,
+        limit: int = 100
+    ) -> List[dict]:
+        """Reverse lookup: shares a user can reach directly or through any of `groups`"""
+        share_ids = select(ShareUserMember.share_id).where(ShareUserMember.username == username)
+        if groups:
+            share_ids = union(
+                share_ids,
+                select(ShareGroupMember.share_id).where(ShareGroupMember.group_name.in_(groups))
+            )
+        return FileShareService._shares_in(db, share_ids, sensitive_only, skip, limit)
+
+    @staticmethod
+    def find_shares_for_group(
+        db: Session,
+        group_name: str,
+        sensitive_only: bool = False,
+        skip: int = 0,
+        limit: int = 100
+    ) -> List[dict]:
+        """Reverse lookup: shares shared with a group"""
+        share_ids = select(ShareGroupMember.share_id).where(ShareGroupMember.group_name == group_name)
+        return FileShareService._shares_in(db, share_ids, sensitive_only, skip, limit)
+
+    @staticmethod
+    def migrate_legacy_memberships(db: Session) -> int:
+        """Move comma-separated shared_with_* columns into the membership tables"""
+        try:
+            shares = db.query(FileShare).filter(
+                (FileShare.shared_with_users.isnot(None)) | (FileShare.shared_with_groups.isnot(None))
+            ).all()
+            for share in shares:
+                users = [m.username for m in share.user_members]
+                users += share.shared_with_users.split(",") if share.shared_with_users else []
+                groups = [m.group_name for m in share.group_members]
+                groups += share.shared_with_groups.split(",") if share.shared_with_groups else []
+                FileShareService._set_members(share, users, groups)
+            db.commit()
+            return len(shares)
+        except Exception as e:
+            db.rollback()
+            raise Exception(f"Failed to migrate share memberships: {str(e)}")
+
     @staticmethod
     def delete_share(db: Session, share_id: str) -> bool:
         """Soft delete file share"""
@@ -115,20 +319,18 @@ class FileShareService:
                 hostname=hostname,
                 ip_address=ip_address,
                 access_type=access_type,
+                accessed_at=datetime.utcnow(),
                 success=success,
                 error_message=error_message,
                 process_name=process_name
             )
             db.add(log)
-
-            # Update access count
-            share = db.query(FileShare).filter(FileShare.id == share_id).first()
-            if share:
-                share.access_count += 1
-                share.last_accessed = datetime.utcnow()
-
+            FileShareService._increment_rollup(db, log)
             db.commit()
             db.refresh(log)
+
+            # Access count and last_accessed are written behind
+            share_access_counter.increment(share_id, log.accessed_at)
             return FileShareService._log_to_dict(log)
         except Exception as e:
             db.rollback()
@@ -156,55 +358,180 @@ class FileShareService:
         return [FileShareService._log_to_dict(l) for l in logs]
 
     @staticmethod
-    def get_share_stats(db: Session, share_id: str) -> dict:
-        """Get share statistics"""
+    def get_share_stats(db: Session, share_id: str, days: int = 7) -> dict:
+        """Get share statistics over the last `days` days"""
         share = db.query(FileShare).filter(FileShare.id == share_id).first()
         if not share:
             return {}
 
-        # Get logs for last 7 days
-        cutoff_time = datetime.utcnow() - timedelta(days=7)
-        recent_logs = db.query(ShareAccessLog).filter(
-            ShareAccessLog.share_id == share_id,
-            ShareAccessLog.accessed_at >= cutoff_time
-        ).all()
+        # Whole days come from the daily rollups; only the partial first day
+        # is read from the raw log via the (share_id, accessed_at) index.
+        cutoff_time = datetime.utcnow() - timedelta(days=days)
+        first_full_day = cutoff_time.date() + timedelta(days=1)
+        boundary = datetime.combine(first_full_day, time.min)
 
-        # Get unique users
-        unique_users = set(log.username for log in recent_logs)
+        raw_filter = (
+            ShareAccessLog.share_id == share_id,
+            ShareAccessLog.accessed_at >= cutoff_time,
+            ShareAccessLog.accessed_at < boundary,
+        )
+        rollup_filter = (
+            ShareAccessDailyRollup.share_id == share_id,
+            ShareAccessDailyRollup.day >= first_full_day,
+        )
 
         # Get access types
         access_types = {}
-        for log in recent_logs:
-            access_types[log.access_type] = access_types.get(log.access_type, 0) + 1
+        raw_counts = db.execute(
+            select(ShareAccessLog.access_type, func.count())
+            .where(*raw_filter)
+            .group_by(ShareAccessLog.access_type)
+        ).all()
+        rollup_counts = db.execute(
+            select(ShareAccessDailyRollup.access_type, func.sum(ShareAccessDailyRollup.access_count))
+            .where(*rollup_filter)
+            .group_by(ShareAccessDailyRollup.access_type)
+        ).all()
+        for access_type, count in list(raw_counts) + list(rollup_counts):
+            access_types[access_type] = access_types.get(access_type, 0) + int(count or 0)
+
+        # Get unique users (UNION de-duplicates across both sources)
+        usernames = union(
+            select(ShareAccessLog.username).where(*raw_filter),
+            select(ShareAccessDailyRollup.username).where(*rollup_filter),
+        ).subquery()
+        unique_users = db.execute(select(func.count()).select_from(usernames)).scalar() or 0
 
+        access_count, last_accessed = FileShareService._current_counters(share)
         return {
             "share_id": share_id,
-            "total_accesses": share.access_count,
-            "last_accessed": share.last_accessed,
-            "recent_accesses": len(recent_logs),
-            "unique_users": len(unique_users),
-            "access_types": access_types
+            "total_accesses": access_count,
+            "last_accessed": last_accessed,
+            "recent_accesses": sum(access_types.values()),
+            "unique_users": unique_users,
+            "access_types": access_types,
+            "window_days": days
         }
 
+    @staticmethod
+    def rebuild_share_rollups(db: Session) -> int:
+        """Recompute all daily rollups from the raw access log"""
+        try:
+            db.query(ShareAccessDailyRollup).delete()
+            day = func.date(ShareAccessLog.accessed_at)
+            rows = (
+                select(
+                    ShareAccessLog.share_id,
+                    day,
+                    ShareAccessLog.username,
+                    ShareAccessLog.access_type,
+                    func.count(),
+                )
+                .where(ShareAccessLog.accessed_at.isnot(None))
+                .group_by(ShareAccessLog.share_id, day, ShareAccessLog.username, ShareAccessLog.access_type)
+            )
+            db.execute(
+                insert(ShareAccessDailyRollup).from_select(
+                    ["share_id", "day", "username", "access_type", "access_count"],
+                    rows,
+                )
+            )
+            db.commit()
+            return db.query(ShareAccessDailyRollup).count()
+        except Exception as e:
+            db.rollback()
+            raise Exception(f"Failed to rebuild share rollups: {str(e)}")
+
+    @staticmethod
+    def ensure_share_rollups(db: Session) -> bool:
+        """Backfill rollups for logs written before rollups existed"""
+        has_rollups = db.query(ShareAccessDailyRollup).first() is not None
+        has_logs = db.query(ShareAccessLog.id).first() is not None
+        if has_logs and not has_rollups:
+            FileShareService.rebuild_share_rollups(db)
+            return True
+        return False
+
+    @staticmethod
+    def _increment_rollup(db: Session, log: ShareAccessLog):
+        """Fold one access into its per-share daily rollup row"""
+        stmt = sqlite_insert(ShareAccessDailyRollup).values(
+            share_id=log.share_id,
+            day=log.accessed_at.date(),
+            username=log.username,
+            access_type=log.access_type,
+            access_count=1,
+        ).on_conflict_do_update(
+            index_elements=["share_id", "day", "username", "access_type"],
+            set_={"access_count": ShareAccessDailyRollup.access_count + 1},
+        )
+        db.execute(stmt)
+
     @staticmethod
     def _share_to_dict(share: FileShare) -> dict:
         """Convert share object to dictionary"""
         if not share:
             return None
+        access_count, last_accessed = FileShareService._current_counters(share)
         return {
             "id": share.id,
             "share_name": share.share_name,
             "share_path": share.share_path,
             "description": share.description,
             "is_sensitive": share.is_sensitive,
-            "shared_with_users": share.shared_with_users.split(",") if share.shared_with_users else [],
-            "shared_with_groups": share.shared_with_groups.split(",") if share.shared_with_groups else [],
-            "access_count": share.access_count,
-            "last_accessed": share.last_accessed,
+            "shared_with_users": [m.username for m in share.user_members],
+            "shared_with_groups": [m.group_name for m in share.group_members],
+            "access_count": access_count,
+            "last_accessed": last_accessed,
             "created_at": share.created_at,
             "is_active": share.is_active
         }
 
+    @staticmethod
+    def _shares_in(db: Session, share_ids, sensitive_only: bool, skip: int, limit: int) -> List[dict]:
+        """Load active shares whose id is in the given subquery"""
+        query = db.query(FileShare).filter(
+            FileShare.id.in_(share_ids),
+            FileShare.is_active == True
+        )
+        if sensitive_only:
+            query = query.filter(FileShare.is_sensitive == True)
+        shares = query.order_by(FileShare.share_name).offset(skip).limit(limit).all()
+        return [FileShareService._share_to_dict(s) for s in shares]
+
+    @staticmethod
+    def _set_members(share: FileShare, users: Optional[List[str]] = None, groups: Optional[List[str]] = None):
+        """Replace share membership, keeping rows for names that stay"""
+        if users is not None:
+            existing = {m.username: m for m in share.user_members}
+            share.user_members = [
+                existing.get(name) or ShareUserMember(username=name)
+                for name in FileShareService._unique_names(users)
+            ]
+            share.shared_with_users = None
+        if groups is not None:
+            existing = {m.group_name: m for m in share.group_members}
+            share.group_members = [
+                existing.get(name) or ShareGroupMember(group_name=name)
+                for name in FileShareService._unique_names(groups)
+            ]
+            share.shared_with_groups = None
+
+    @staticmethod
+    def _unique_names(names: List[str]) -> List[str]:
+        """Drop blanks and duplicates, preserving order"""
+        return list(dict.fromkeys(name.strip() for name in names if name and name.strip()))
+
+    @staticmethod
+    def _current_counters(share: FileShare) -> Tuple[int, Optional[datetime]]:
+        """Stored counters plus increments not yet flushed"""
+        pending_count, pending_last = share_access_counter.pending(share.id)
+        access_count = (share.access_count or 0) + pending_count
+        last_accessed = share.last_accessed
+        if pending_last and (last_accessed is None or pending_last > last_accessed):
+            last_accessed = pending_last
+        return access_count, last_accessed
+
     @staticmethod
     def _log_to_dict(log: ShareAccessLog) -> dict:
         """Convert log object to dictionary"""
@@ -0,0 +1,545 @@
+"""
+Durable alert outbox and its dispatcher
+
+Detected events are stored together with one AlertDelivery row per
+enabled alert channel in the same transaction, so the event pipeline
+never waits on Slack or SMTP, and an alert outlives a failed send or a
+restart. A background dispatcher claims due rows per channel up to that
+channel's concurrency limit, so a slow channel cannot hold up the
+others. A claim is a single UPDATE stamping the row with the dispatcher
+and the time, so two processes never claim the same row; claims older
+than the lease (a dispatcher that died mid-send) are requeued. Failed
+sends are retried with exponential backoff and dead-lettered after
+`max_attempts`. AccessEvent.alert_sent is updated in
+bulk as alerts settle: "sent" once any channel delivered, "failed" once
+every channel was dead-lettered.
+
+Events folded into an aggregation window are stored as "aggregated" and
+become "pending" in the transaction that queues their summary. Events
+still "aggregated" two windows later lost their window (the process
+died) and are summarized again from the database, so a suppressed alert
+may be repeated in a rare race but is never dropped.
+"""
+import asyncio
+import os
+import random
+import socket
+import threading
+import time
+import uuid
+from datetime import datetime, timedelta
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from sqlalchemy import func, or_
+from sqlalchemy.orm import Session
+
+from app.config.settings import (
+    ALERT_CHANNEL_CONCURRENCY,
+    ALERT_SEND_TIMEOUT_SECONDS,
+    ALERT_MAX_ATTEMPTS,
+    ALERT_RETRY_BASE_SECONDS,
+    ALERT_RETRY_MAX_SECONDS,
+    ALERT_OUTBOX_POLL_SECONDS,
+    ALERT_CLAIM_LEASE_SECONDS
+)
+from app.db.database import SessionLocal, begin_write
+from app.models.database_models import AccessEvent, AlertDelivery
+from app.monitoring.tracing import ALERT_PREFIX, stamp, without_trace
+
+MAX_TRACKED_TRACES = 10000
+
+
+class AlertOutbox:
+    """Queue alerts in the database and deliver them from a background task"""
+
+    def __init__(self,
+                 get_manager: Callable[[], Any],
+                 session_factory: Callable[[], Session] = SessionLocal,
+                 concurrency: int = ALERT_CHANNEL_CONCURRENCY,
+                 send_timeout: float = ALERT_SEND_TIMEOUT_SECONDS,
+                 max_attempts: int = ALERT_MAX_ATTEMPTS,
+                 retry_base: float = ALERT_RETRY_BASE_SECONDS,
+                 retry_max: float = ALERT_RETRY_MAX_SECONDS,
+                 poll_seconds: float = ALERT_OUTBOX_POLL_SECONDS,
+                 lease_seconds: float = ALERT_CLAIM_LEASE_SECONDS,
+                 on_settled: Optional[Callable[[Dict[str, Any]], None]] = None):
+        self._get_manager = get_manager
+        self._session_factory = session_factory
+        self.concurrency = max(1, concurrency)
+        self.send_timeout = send_timeout
+        self.max_attempts = max(1, max_attempts)
+        self.retry_base = retry_base
+        self.retry_max = retry_max
+        self.poll_seconds = poll_seconds
+        self.lease_seconds = lease_seconds
+        self.owner = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self._on_settled = on_settled
+        self._runner: Optional[asyncio.Task] = None
+        self._wake: Optional[asyncio.Event] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._sends: set = set()
+        self._in_flight: Dict[str, int] = {}
+        self._results: List[Tuple[str, bool, Optional[str]]] = []
+        # alert_id -> (event context, channels whose first attempt is outstanding)
+        self._traces: Dict[str, Tuple[Dict[str, Any], set]] = {}
+        self._lock = threading.Lock()
+        self.queued = 0
+        self.aggregated = 0
+        self.sent = 0
+        self.retried = 0
+        self.dead = 0
+        self.unstored = 0
+        self.recovered = 0
+        self._recovered_at: Optional[float] = None
+
+    # ==================== ENQUEUE ====================
+    def prepare(self, events: List[Dict[str, Any]], aggregate: bool = True) -> Dict[str, tuple]:
+        """Decide which events alert now; returns alert_id -> (channels, payload, event_ids)
+
+        Repeats are folded by the alert manager's aggregator first and
+        marked "aggregated". Assigns each event its AccessEvent id
+        ("event_id") and, when nothing is configured to alert, marks it
+        "disabled". Events that alert get an "alert_id"; their delivery rows
+        come from rows_for() in the transaction that stores the events.
+        """
+        manager = self._get_manager()
+        channels = manager.get_enabled_handlers()
+        alerts: Dict[str, tuple] = {}
+        for context in events:
+            event_ids = context.pop("event_ids", None)
+            if event_ids is None:
+                context.setdefault("event_id", str(uuid.uuid4()))
+                event_ids = [context["event_id"]]
+            if not channels:
+                context["alert_sent"] = "disabled"
+                continue
+            if aggregate and not manager.aggregator.admit(context):
+                # Settled by its group's summary alert
+                context["alert_sent"] = "aggregated"
+                self.aggregated += 1
+                continue
+            alert_id = str(uuid.uuid4())
+            payload = without_trace(context)
+            context["alert_id"] = alert_id
+            alerts[alert_id] = (list(channels), payload, event_ids)
+        return alerts
+
+    @staticmethod
+    def rows_for(alerts: Dict[str, tuple], context: Dict[str, Any]) -> List[AlertDelivery]:
+        """Delivery rows for one prepared event (none if it does not alert now)"""
+        alert = alerts.get(context.get("alert_id"))
+        if alert is None:
+            return []
+        channels, payload, event_ids = alert
+        return [
+            AlertDelivery(alert_id=context["alert_id"], channel=channel, payload=payload, event_ids=event_ids)
+            for channel in channels
+        ]
+
+    def track(self, stored: List[Dict[str, Any]], alerts: Dict[str, tuple]):
+        """Count the queued alerts of stored events and follow their traces"""
+        queued = 0
+        with self._lock:
+            for context in stored:
+                alert = alerts.get(context.get("alert_id"))
+                if alert is None:
+                    continue
+                queued += 1
+                if "trace" in context and len(self._traces) < MAX_TRACKED_TRACES:
+                    self._traces[context["alert_id"]] = (context, set(alert[0]))
+        self.queued += queued
+
+    def send_unstored(self, events: List[Dict[str, Any]]):
+        """Alert directly, once and without retries, for events that could not be stored"""
+        manager = self._get_manager()
+        if not manager.handlers:
+            return
+        for context in events:
+            if context.get("alert_sent") in ("aggregated", "disabled"):
+                continue
+            payload = without_trace(context)
+            task = asyncio.create_task(manager.send_alert(payload))
+            self._sends.add(task)
+            task.add_done_callback(self._sends.discard)
+            self.unstored += 1
+
+    def is_tracking(self, context: Dict[str, Any]) -> bool:
+        """True while the event's trace waits for its alert channels"""
+        with self._lock:
+            return context.get("alert_id") in self._traces
+
+    def wake(self):
+        """Have the dispatcher look for work now (thread-safe)"""
+        if self._loop is not None and self._wake is not None:
+            self._loop.call_soon_threadsafe(self._wake.set)
+
+    # ==================== DISPATCHER ====================
+    def start(self, loop: asyncio.AbstractEventLoop):
+        """Start the dispatcher on `loop`"""
+        if self._runner is not None:
+            return
+        self._loop = loop
+        self._wake = asyncio.Event()
+        self._runner = loop.create_task(self._run())
+
+    async def stop(self):
+        """Stop claiming, let in-flight sends finish and record them
+
+        Open aggregation windows are stored as summary alerts, which go out
+        after the next start.
+        """
+        runner, self._runner = self._runner, None
+        if runner is None:
+            return
+        runner.cancel()
+        try:
+            await runner
+        except asyncio.CancelledError:
+            pass
+        manager = self._get_manager()
+        for name, handler in manager.handlers.items():
+            try:
+                await handler.flush()
+            except Exception as e:
+                print(f"Error flushing {name} alerts: {e}")
+        if self._sends:
+            await asyncio.gather(*self._sends, return_exceptions=True)
+        summaries = manager.aggregator.due(flush_all=True)
+        try:
+            await asyncio.to_thread(self._settle_and_claim, self._take_results(), {}, summaries, 0.0, True)
+        except Exception as e:
+            print(f"Alert outbox shutdown failed: {e}")
+        self._loop = None
+
+    async def _run(self):
+        while True:
+            self._wake.clear()
+            timeout = self.poll_seconds
+            try:
+                timeout = await self._dispatch_once()
+            except Exception as e:
+                print(f"Alert outbox dispatch failed: {e}")
+            try:
+                await asyncio.wait_for(self._wake.wait(), timeout)
+            except asyncio.TimeoutError:
+                pass
+
+    async def _dispatch_once(self) -> float:
+        """Record finished sends, queue closed summaries, claim and start due deliveries
+
+        Returns how long to wait before the next round if nothing wakes us.
+        """
+        manager = self._get_manager()
+        summaries = manager.aggregator.due()
+        free = {channel: (handler.max_in_flight or self.concurrency) - self._in_flight.get(channel, 0)
+                for channel, handler in manager.handlers.items()}
+        # A claim must outlive the longest send it covers
+        lease = max([self.lease_seconds] + [2 * self._send_timeout(handler) for handler in manager.handlers.values()])
+        results = self._take_results()
+        # Look for events whose aggregation window was lost once per window
+        recover_before = None
+        window = manager.aggregator.window_seconds
+        if self._recovered_at is None or time.monotonic() - self._recovered_at >= max(window, self.poll_seconds):
+            self._recovered_at = time.monotonic()
+            recover_before = datetime.utcnow() - timedelta(seconds=2 * window)
+        try:
+            claimed, next_due = await asyncio.to_thread(
+                self._settle_and_claim, results, free, summaries, lease, False, recover_before
+            )
+        except Exception:
+            # Keep the outcomes for the next round
+            self._results[:0] = results
+            raise
+        for delivery in claimed:
+            task = asyncio.create_task(self._deliver(*delivery))
+            self._sends.add(task)
+            task.add_done_callback(self._sends.discard)
+
+        timeout = self.poll_seconds
+        deadline = manager.aggregator.next_deadline()
+        if deadline is not None:
+            timeout = min(timeout, deadline)
+        if next_due is not None:
+            timeout = min(timeout, max(0.0, (next_due - datetime.utcnow()).total_seconds()))
+        return timeout
+
+    async def _deliver(self, delivery_id: str, alert_id: str, channel: str, payload: Dict[str, Any]):
+        """One send attempt; the outcome is recorded by the next dispatch round"""
+        self._in_flight[channel] = self._in_flight.get(channel, 0) + 1
+        ok, error = False, None
+        timeout = self.send_timeout
+        try:
+            handler = self._get_manager().handlers[channel]
+            timeout = self._send_timeout(handler)
+            ok = await asyncio.wait_for(handler.send(payload), timeout)
+            if not ok:
+                error = "handler reported failure"
+        except asyncio.TimeoutError:
+            error = f"timed out after {timeout}s"
+        except Exception as e:
+            error = str(e) or e.__class__.__name__
+        finally:
+            self._in_flight[channel] -= 1
+            self._results.append((delivery_id, ok, error))
+            self._first_attempt_done(alert_id, channel)
+            self._wake.set()
+
+    def _first_attempt_done(self, alert_id: str, channel: str):
+        with self._lock:
+            tracked = self._traces.get(alert_id)
+            if tracked is None or channel not in tracked[1]:
+                return
+            context, waiting = tracked
+            stamp(context, ALERT_PREFIX + channel)
+            waiting.discard(channel)
+            if waiting:
+                return
+            del self._traces[alert_id]
+        if self._on_settled is not None:
+            self._on_settled(context)
+
+    def _take_results(self) -> List[Tuple[str, bool, Optional[str]]]:
+        results, self._results = self._results, []
+        return results
+
+    def _send_timeout(self, handler) -> float:
+        """Send timeout for a handler, including how long it may hold a send back for batching"""
+        return self.send_timeout + handler.send_delay
+
+    def _backoff(self, attempts: int) -> timedelta:
+        """Exponential backoff with jitter after the given number of failed attempts"""
+        delay = min(self.retry_max, self.retry_base * 2 ** (attempts - 1))
+        return timedelta(seconds=delay * random.uniform(0.5, 1.0))
+
+    # ==================== DATABASE (worker thread) ====================
+    def _settle_and_claim(self, results: List[Tuple[str, bool, Optional[str]]],
+                          free: Dict[str, int],
+                          summaries: List[Dict[str, Any]],
+                          lease: Optional[float] = None,
+                          release: bool = False,
+                          recover_before: Optional[datetime] = None) -> Tuple[list, Optional[datetime]]:
+        """One transaction: record outcomes, update alert_sent, queue summaries, claim due rows
+
+        Claims older than `lease` seconds are requeued first; `release`
+        requeues this dispatcher's own unfinished claims (on shutdown).
+        Events still "aggregated" from before `recover_before` are
+        summarized again.
+        """
+        db = self._session_factory()
+        try:
+            begin_write(db)
+            now = datetime.utcnow()
+            settled = set()
+            if release or lease is not None:
+                requeue = db.query(AlertDelivery).filter(AlertDelivery.status == "sending")
+                if release:
+                    requeue = requeue.filter(AlertDelivery.claimed_by == self.owner)
+                else:
+                    requeue = requeue.filter(or_(
+                        AlertDelivery.claimed_at.is_(None),
+                        AlertDelivery.claimed_at < now - timedelta(seconds=lease),
+                    ))
+            if results:
+                outcomes = {delivery_id: (ok, error) for delivery_id, ok, error in results}
+                # A row requeued after its lease ran out now belongs to whoever claimed it next
+                rows = db.query(AlertDelivery).filter(
+                    AlertDelivery.id.in_(list(outcomes)),
+                    AlertDelivery.status == "sending",
+                    AlertDelivery.claimed_by == self.owner,
+                ).all()
+                for row in rows:
+                    row.claimed_by = None
+                    row.claimed_at = None
+                    ok, error = outcomes[row.id]
+                    row.attempts += 1
+                    if ok:
+                        row.status = "sent"
+                        row.delivered_at = now
+                        row.last_error = None
+                        self.sent += 1
+                        settled.add(row.alert_id)
+                    elif row.attempts >= self.max_attempts:
+                        row.status = "dead"
+                        row.last_error = error
+                        self.dead += 1
+                        settled.add(row.alert_id)
+                    else:
+                        row.status = "pending"
+                        row.last_error = error
+                        row.next_attempt_at = now + self._backoff(row.attempts)
+                        self.retried += 1
+
+            # Rows for channels that are no longer configured can never be sent
+            if free:
+                orphaned = db.query(AlertDelivery).filter(
+                    AlertDelivery.status == "pending", AlertDelivery.channel.notin_(list(free))
+                ).all()
+                for row in orphaned:
+                    row.status = "dead"
+                    row.last_error = "channel not configured"
+                    self.dead += 1
+                    settled.add(row.alert_id)
+
+            if settled:
+                db.flush()
+                self._update_alert_sent(db, settled)
+
+            if release or lease is not None:
+                db.flush()
+                requeue.update({"status": "pending", "claimed_by": None, "claimed_at": None},
+                               synchronize_session=False)
+
+            if recover_before is not None:
+                summaries = summaries + self._rebuild_summaries(db, recover_before)
+            if summaries:
+                covered = [summary.get("event_ids") or [] for summary in summaries]
+                alerts = self.prepare(summaries, aggregate=False)
+                by_status: Dict[str, List[str]] = {"pending": [], "disabled": []}
+                for summary, event_ids in zip(summaries, covered):
+                    db.add_all(self.rows_for(alerts, summary))
+                    status = "disabled" if summary.get("alert_sent") == "disabled" else "pending"
+                    by_status[status].extend(event_ids)
+                self.queued += len(alerts)
+                # The folded events now settle with their summary
+                for status, ids in by_status.items():
+                    if ids:
+                        db.query(AccessEvent).filter(
+                            AccessEvent.id.in_(ids), AccessEvent.alert_sent == "aggregated"
+                        ).update({"alert_sent": status}, synchronize_session=False)
+
+            claimed = []
+            for channel, slots in free.items():
+                if slots <= 0:
+                    continue
+                due = db.query(AlertDelivery.id).filter(
+                    AlertDelivery.status == "pending",
+                    AlertDelivery.channel == channel,
+                    AlertDelivery.next_attempt_at <= now,
+                ).order_by(AlertDelivery.next_attempt_at).limit(slots)
+                db.query(AlertDelivery).filter(
+                    AlertDelivery.id.in_(due.scalar_subquery()),
+                    AlertDelivery.status == "pending",
+                ).update({"status": "sending", "claimed_by": self.owner, "claimed_at": now},
+                         synchronize_session=False)
+                claimed.extend(db.query(
+                    AlertDelivery.id, AlertDelivery.alert_id, AlertDelivery.channel, AlertDelivery.payload
+                ).filter(
+                    AlertDelivery.status == "sending",
+                    AlertDelivery.channel == channel,
+                    AlertDelivery.claimed_by == self.owner,
+                    AlertDelivery.claimed_at == now,
+                ).all())
+            # Rows due now but not claimed are waiting for a free slot; finished sends wake us
+            next_due = db.query(func.min(AlertDelivery.next_attempt_at)).filter(
+                AlertDelivery.status == "pending", AlertDelivery.next_attempt_at > now
+            ).scalar()
+            db.commit()
+            return claimed, next_due
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            db.close()
+
+    def _rebuild_summaries(self, db: Session, before: datetime) -> List[Dict[str, Any]]:
+        """Summaries for stored "aggregated" events whose window closed without one"""
+        rows = db.query(
+            AccessEvent.id, AccessEvent.decoy_id, AccessEvent.event_type, AccessEvent.timestamp,
+            AccessEvent.accessed_path, AccessEvent.username, AccessEvent.hostname, AccessEvent.forensic_json,
+        ).filter(
+            AccessEvent.alert_sent == "aggregated", AccessEvent.timestamp < before
+        ).order_by(AccessEvent.timestamp).all()
+        if not rows:
+            return []
+        events = []
+        for row in rows:
+            event = dict(row.forensic_json or {})
+            event.update({
+                "event_id": row.id, "decoy_id": row.decoy_id, "event_type": row.event_type,
+                "timestamp": row.timestamp.isoformat(), "accessed_path": row.accessed_path,
+                "username": row.username, "hostname": row.hostname,
+            })
+            events.append(event)
+        self.recovered += len(events)
+        return self._get_manager().aggregator.rebuild(events)
+
+    @staticmethod
+    def _update_alert_sent(db: Session, alert_ids: set):
+        """Bulk-update AccessEvent.alert_sent for alerts that just settled on some channel"""
+        rows = db.query(AlertDelivery.alert_id, AlertDelivery.status, AlertDelivery.event_ids).filter(
+            AlertDelivery.alert_id.in_(list(alert_ids))
+        ).all()
+        statuses: Dict[str, List[str]] = {}
+        event_ids: Dict[str, List[str]] = {}
+        for alert_id, status, ids in rows:
+            statuses.setdefault(alert_id, []).append(status)
+            event_ids[alert_id] = ids or []
+        by_status: Dict[str, List[str]] = {"sent": [], "failed": []}
+        for alert_id, channel_statuses in statuses.items():
+            if "sent" in channel_statuses:
+                by_status["sent"].extend(event_ids[alert_id])
+            elif all(status == "dead" for status in channel_statuses):
+                by_status["failed"].extend(event_ids[alert_id])
+        for status, ids in by_status.items():
+            if ids:
+                db.query(AccessEvent).filter(AccessEvent.id.in_(ids)).update(
+                    {"alert_sent": status}, synchronize_session=False
+                )
+
+    # ==================== DEAD LETTERS ====================
+    @staticmethod
+    def get_summary(db: Session, dead_letters: int = 20) -> Dict[str, Any]:
+        """Delivery counts per channel and status, and the most recent dead letters"""
+        counts: Dict[str, Dict[str, int]] = {}
+        for channel, status, count in db.query(
+            AlertDelivery.channel, AlertDelivery.status, func.count()
+        ).group_by(AlertDelivery.channel, AlertDelivery.status):
+            counts.setdefault(channel, {})[status] = count
+        dead = db.query(AlertDelivery).filter(AlertDelivery.status == "dead").order_by(
+            AlertDelivery.created_at.desc()
+        ).limit(dead_letters).all()
+        return {
+            "deliveries": counts,
+            "dead_letters": [
+                {
+                    "id": row.id,
+                    "alert_id": row.alert_id,
+                    "channel": row.channel,
+                    "attempts": row.attempts,
+                    "last_error": row.last_error,
+                    "created_at": row.created_at,
+                    "decoy_id": (row.payload or {}).get("decoy_id"),
+                }
+                for row in dead
+            ],
+        }
+
+    def retry_dead(self, db: Session, channel: Optional[str] = None) -> int:
+        """Requeue dead-lettered deliveries (optionally for one channel)"""
+        query = db.query(AlertDelivery).filter(AlertDelivery.status == "dead")
+        if channel:
+            query = query.filter(AlertDelivery.channel == channel)
+        count = query.update(
+            {"status": "pending", "attempts": 0, "next_attempt_at": datetime.utcnow(),
+             "claimed_by": None, "claimed_at": None},
+            synchronize_session=False,
+        )
+        db.commit()
+        self.wake()
+        return count
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            tracked = len(self._traces)
+        return {
+            "running": self._runner is not None,
+            "queued": self.queued,
+            "aggregated": self.aggregated,
+            "sent": self.sent,
+            "retried": self.retried,
+            "dead": self.dead,
+            "unstored": self.unstored,
+            "recovered": self.recovered,
+            "in_flight": dict(self._in_flight),
+            "awaiting_first_attempt": tracked,
+        }
@@ -2,9 +2,9 @@
 Utility functions for cryptography, hashing, and forensics
 """
 import hashlib
+import io
 import secrets
 import socket
-import psutil
 import platform
 import uuid
 from pathlib import Path
@@ -19,6 +19,41 @@ def calculate_sha256(file_path: str) -> str:
             sha256_hash.update(byte_block)
     return sha256_hash.hexdigest()
 
+class HashingWriter:
+    """
+    Write-through sink that hashes bytes on their way to disk, so the
+    SHA256 of a generated file needs no second read. It is deliberately
+    not seekable: zipfile then streams entries with data descriptors
+    instead of seeking back to patch headers, keeping digest and file equal.
+    """
+    
+    def __init__(self, raw):
+        self.raw = raw
+        self._hash = hashlib.sha256()
+        self.bytes_written = 0
+    
+    def write(self, data) -> int:
+        self._hash.update(data)
+        self.raw.write(data)
+        size = memoryview(data).nbytes
+        self.bytes_written += size
+        return size
+    
+    def tell(self) -> int:
+        return self.bytes_written
+    
+    def seekable(self) -> bool:
+        return False
+    
+    def seek(self, *args):
+        raise io.UnsupportedOperation("HashingWriter is write-once and not seekable")
+    
+    def flush(self):
+        self.raw.flush()
+    
+    def hexdigest(self) -> str:
+        return self._hash.hexdigest()
+
 def generate_decoy_id(seed: str) -> str:
     """Generate unique DecoyDNA ID using seed and random component"""
     random_suffix = secrets.token_hex(8)
@@ -76,6 +111,7 @@ def get_system_info() -> Dict[str, Any]:
 def get_process_info(pid: Optional[int] = None) -> Dict[str, Any]:
     """Get information about a process"""
     try:
+        import psutil
         if pid is None:
             process = psutil.Process()
         else:
@@ -0,0 +1,240 @@
+"""
+Low-overhead sampling profiler for the running server
+
+A background thread reads every thread's current stack with
+sys._current_frames() at a fixed interval and counts identical stacks.
+Nothing is installed in the profiled threads (no sys.setprofile), so
+cost is one stack walk per thread per sample and stops when sampling
+does. Output is in the collapsed-stack format read by flamegraph.pl,
+speedscope and most flamegraph viewers:
+
+    thread;module:function;module:function <samples>
+"""
+import hmac
+import sys
+import threading
+import time
+import uuid
+from collections import Counter, OrderedDict
+from typing import Any, Callable, Dict, List, Optional
+
+MAX_STACK_DEPTH = 128
+LOOPBACK_HOSTS = {"127.0.0.1", "::1", "localhost"}
+
+
+class ProfilerBusy(Exception):
+    """Raised when a profile is requested while another one is running"""
+
+
+def is_admin(client_host: Optional[str], token: Optional[str], admin_token: str) -> bool:
+    """With an admin token configured the caller must present it; otherwise only loopback clients are admins"""
+    if admin_token:
+        return token is not None and hmac.compare_digest(token.encode(), admin_token.encode())
+    return client_host in LOOPBACK_HOSTS
+
+
+def _frame_name(frame) -> str:
+    code = frame.f_code
+    name = getattr(code, "co_qualname", code.co_name)
+    return f"{frame.f_globals.get('__name__', '?')}:{name}".replace(";", ":")
+
+
+class StackSampler:
+    """Sample all threads' stacks until stopped or `seconds` have passed"""
+
+    def __init__(self, interval: float = 0.005):
+        self.interval = interval
+        self.stacks: Counter = Counter()
+        self.samples = 0
+        self.started_at: Optional[float] = None
+        self.elapsed = 0.0
+        self._stop = threading.Event()
+        self._finished = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def run(self, seconds: float):
+        """Sample on the calling thread for up to `seconds`"""
+        own_ident = threading.get_ident()
+        names: Dict[int, str] = {}
+        self.started_at = time.time()
+        started = time.perf_counter()
+        deadline = started + seconds
+        try:
+            self._sample_until(deadline, own_ident, names)
+        finally:
+            self.elapsed = time.perf_counter() - started
+            self._finished.set()
+
+    def _sample_until(self, deadline: float, own_ident: int, names: Dict[int, str]):
+        while not self._stop.is_set():
+            now = time.perf_counter()
+            if now >= deadline:
+                break
+            frames = sys._current_frames()
+            if any(ident not in names for ident in frames):
+                names = {thread.ident: thread.name for thread in threading.enumerate()}
+            for ident, frame in frames.items():
+                if ident == own_ident:
+                    continue
+                stack: List[str] = []
+                while frame is not None and len(stack) < MAX_STACK_DEPTH:
+                    stack.append(_frame_name(frame))
+                    frame = frame.f_back
+                stack.append(names.get(ident, f"thread-{ident}"))
+                self.stacks[";".join(reversed(stack))] += 1
+            self.samples += 1
+            self._stop.wait(max(0.0, self.interval - (time.perf_counter() - now)))
+
+    def start(self, seconds: float, on_finish: Optional[Callable[[], None]] = None):
+        """Sample on a background thread, calling `on_finish` from it when sampling ends"""
+        def target():
+            try:
+                self.run(seconds)
+            finally:
+                if on_finish is not None:
+                    on_finish()
+
+        self._thread = threading.Thread(target=target, name="stack-sampler", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Ask the sampler to stop; never waits, so it is safe on the event loop"""
+        self._stop.set()
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        """Block until sampling has finished (call off the event loop)"""
+        return self._finished.wait(timeout)
+
+    def collapsed(self) -> str:
+        """Stacks in the collapsed format, most frequent first"""
+        return "".join(f"{stack} {count}\n" for stack, count in self.stacks.most_common())
+
+    def summary(self, top: int = 25) -> Dict[str, Any]:
+        """Sample counts per thread plus the hottest functions and stacks"""
+        threads: Counter = Counter()
+        self_time: Counter = Counter()
+        for stack, count in self.stacks.items():
+            frames = stack.split(";")
+            threads[frames[0]] += count
+            if len(frames) > 1:
+                self_time[frames[-1]] += count
+        return {
+            "started_at": self.started_at,
+            "duration_seconds": round(self.elapsed, 3),
+            "interval_ms": round(self.interval * 1000, 3),
+            "samples": self.samples,
+            "threads": dict(threads.most_common()),
+            "top_functions": [{"function": f, "samples": c} for f, c in self_time.most_common(top)],
+            "top_stacks": [{"stack": s, "samples": c} for s, c in self.stacks.most_common(top)],
+        }
+
+
+class ProfilerService:
+    """One profiling session at a time, plus recent per-request profiles"""
+
+    def __init__(self, keep: int = 20):
+        self._session = threading.Lock()
+        self._lock = threading.Lock()
+        self._profiles: "OrderedDict[str, StackSampler]" = OrderedDict()
+        self.keep = keep
+
+    def profile(self, seconds: float, interval: float) -> StackSampler:
+        """Sample the whole process for `seconds` (blocking)"""
+        sampler = StackSampler(interval)
+        if not self._session.acquire(blocking=False):
+            raise ProfilerBusy("A profile is already running")
+        try:
+            sampler.run(seconds)
+        finally:
+            self._session.release()
+        return sampler
+
+    def begin_request(self, interval: float, max_seconds: float) -> Optional[StackSampler]:
+        """Start sampling in the background for one request; None if busy"""
+        if not self._session.acquire(blocking=False):
+            return None
+        sampler = StackSampler(interval)
+        try:
+            # The sampler thread ends the session itself, so end_request never joins it
+            sampler.start(max_seconds, on_finish=self._session.release)
+        except BaseException:
+            self._session.release()
+            raise
+        return sampler
+
+    def end_request(self, sampler: StackSampler) -> str:
+        """Stop a request profile and keep it for retrieval; returns its id"""
+        sampler.stop()
+        profile_id = uuid.uuid4().hex[:16]
+        with self._lock:
+            self._profiles[profile_id] = sampler
+            while len(self._profiles) > self.keep:
+                self._profiles.popitem(last=False)
+        return profile_id
+
+    def get(self, profile_id: str) -> Optional[StackSampler]:
+        """A stored request profile"""
+        with self._lock:
+            return self._profiles.get(profile_id)
+
+
+class RequestProfileMiddleware:
+    """Profile single requests that carry an `X-Profile: 1` header
+
+    The response gets an `X-Profile-Id` header naming the stored profile;
+    fetch it from /api/admin/profile/{id}. Sampling covers all threads
+    while the request runs, because sync endpoints and the work they wait
+    on may run outside the event loop thread. Only admins (see is_admin)
+    can start a profile; the header is ignored for anyone else.
+    """
+
+    def __init__(self, app, service: ProfilerService, interval: float, max_seconds: float,
+                 admin_token: str = ""):
+        self.app = app
+        self.service = service
+        self.interval = interval
+        self.max_seconds = max_seconds
+        self.admin_token = admin_token
+
+    def _requested(self, scope) -> bool:
+        if scope["type"] != "http":
+            return False
+        headers = dict(scope.get("headers", []))
+        if headers.get(b"x-profile") != b"1":
+            return False
+        client = scope.get("client")
+        token = headers.get(b"x-admin-token")
+        return is_admin(client[0] if client else None,
+                        token.decode("latin-1") if token is not None else None,
+                        self.admin_token)
+
+    async def __call__(self, scope, receive, send):
+        if not self._requested(scope):
+            await self.app(scope, receive, send)
+            return
+
+        sampler = self.service.begin_request(self.interval, self.max_seconds)
+        if sampler is None:
+            await self.app(scope, receive, send)
+            return
+
+        finished = {"done": False}
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start" and not finished["done"]:
+                # Headers go out first, so the profile ends when the response starts
+                finished["done"] = True
+                profile_id = self.service.end_request(sampler)
+                message = dict(message, headers=list(message.get("headers", [])) + [
+                    (b"x-profile-id", profile_id.encode("ascii"))
+                ])
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            if not finished["done"]:
+                self.service.end_request(sampler)
+
+
+profiler_service = ProfilerService()
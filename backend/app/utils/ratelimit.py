@@ -0,0 +1,165 @@
+"""
+Admission control for write-heavy endpoints
+
+Two independent checks, both answered immediately so an overloaded
+server rejects with 429 instead of queueing work behind SQLite's single
+writer:
+
+- RateLimiter: a token bucket per (client, limit name)
+- WriteGate: a cap on concurrent DB-writing requests. Detection events
+  persisted by the event pipeline are always admitted and count toward
+  the cap, and `reserved` slots are kept free of requests for them.
+  Background work that was already accepted waits for a slot instead.
+"""
+import math
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import Any, Dict, Hashable, Tuple
+
+
+class TokenBucket:
+    """`burst` tokens, refilled at `rate` tokens per second"""
+
+    __slots__ = ("rate", "burst", "tokens", "updated")
+
+    def __init__(self, rate: float, burst: float):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.updated = time.monotonic()
+
+    def take(self, now: float, cost: float = 1) -> float:
+        """Take `cost` tokens; returns 0 on success, else seconds until they can be taken
+
+        A cost above `burst` is admitted once the bucket is full and leaves
+        it in debt, so it is paid for at `rate` like any other tokens.
+        """
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        needed = min(cost, self.burst)
+        if self.tokens >= needed:
+            self.tokens -= cost
+            return 0.0
+        return (needed - self.tokens) / self.rate if self.rate > 0 else math.inf
+
+
+class RateLimiter:
+    """Token buckets per client and named limit
+
+    Buckets are kept in LRU order and capped at `max_keys`; an evicted
+    client simply starts again with a full bucket.
+    """
+
+    def __init__(self, limits: Dict[str, Tuple[float, float]], max_keys: int = 10000):
+        self.limits = dict(limits)
+        self.max_keys = max(1, int(max_keys))
+        self._buckets: "OrderedDict[Hashable, TokenBucket]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.allowed: Dict[str, int] = {name: 0 for name in self.limits}
+        self.rejected: Dict[str, int] = {name: 0 for name in self.limits}
+
+    def check(self, name: str, client: str, cost: float = 1) -> float:
+        """Charge a request `cost` tokens; returns 0 if allowed, else seconds to wait"""
+        rate, burst = self.limits[name]
+        key = (name, client)
+        now = time.monotonic()
+        with self._lock:
+            bucket = self._buckets.get(key)
+            if bucket is None:
+                bucket = self._buckets[key] = TokenBucket(rate, burst)
+                if len(self._buckets) > self.max_keys:
+                    self._buckets.popitem(last=False)
+            else:
+                self._buckets.move_to_end(key)
+            retry_after = bucket.take(now, cost)
+            if retry_after:
+                self.rejected[name] += 1
+            else:
+                self.allowed[name] += 1
+        return retry_after
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Allowed/rejected counts per limit"""
+        with self._lock:
+            return {
+                "clients": len(self._buckets),
+                "limits": {
+                    name: {"rate": rate, "burst": burst,
+                           "allowed": self.allowed[name], "rejected": self.rejected[name]}
+                    for name, (rate, burst) in self.limits.items()
+                },
+            }
+
+
+class WriteGate:
+    """Concurrency cap on DB writes with priority for detection events"""
+
+    def __init__(self, limit: int = 8, reserved: int = 2):
+        self.limit = max(1, int(limit))
+        self.reserved = min(max(0, int(reserved)), self.limit - 1)
+        self._lock = threading.Lock()
+        self._freed = threading.Condition(self._lock)
+        self.in_flight = 0
+        self.internal_in_flight = 0
+        self.admitted = 0
+        self.rejected = 0
+        self.internal_admitted = 0
+
+    def _full(self) -> bool:
+        return self.in_flight + self.internal_in_flight >= self.limit - self.reserved
+
+    def try_acquire(self) -> bool:
+        """Admit a request if a non-reserved slot is free; never waits"""
+        with self._lock:
+            if self._full():
+                self.rejected += 1
+                return False
+            self.in_flight += 1
+            self.admitted += 1
+            return True
+
+    def release(self):
+        """Give back a slot taken by try_acquire or slot()"""
+        with self._lock:
+            self.in_flight -= 1
+            self._freed.notify()
+
+    @contextmanager
+    def slot(self):
+        """Hold a non-reserved slot, waiting for one (for already accepted background work)"""
+        with self._lock:
+            self._freed.wait_for(lambda: not self._full())
+            self.in_flight += 1
+            self.admitted += 1
+        try:
+            yield
+        finally:
+            self.release()
+
+    @contextmanager
+    def internal(self):
+        """Hold a slot for pipeline work; always admitted, even over the cap"""
+        with self._lock:
+            self.internal_in_flight += 1
+            self.internal_admitted += 1
+        try:
+            yield
+        finally:
+            with self._lock:
+                self.internal_in_flight -= 1
+                self._freed.notify()
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Slot usage and admission counters"""
+        with self._lock:
+            return {
+                "limit": self.limit,
+                "reserved": self.reserved,
+                "in_flight": self.in_flight,
+                "internal_in_flight": self.internal_in_flight,
+                "admitted": self.admitted,
+                "rejected": self.rejected,
+                "internal_admitted": self.internal_admitted,
+            }
@@ -0,0 +1,91 @@
+"""
+Benchmark: thread-to-loop hand-off of monitoring events
+
+Compares LoopBridge micro-batching with scheduling one coroutine per event
+via run_coroutine_threadsafe. The consumer pays a fixed per-call cost
+(--call-ms, standing in for a DB transaction) plus a per-event cost.
+
+Run from backend/:  python -m benchmarks.bench_bridge
+"""
+import argparse
+import asyncio
+import json
+import threading
+import time
+
+from app.monitoring.bridge import LoopBridge
+
+
+def percentile(values, p):
+    values = sorted(values)
+    return round(values[min(len(values) - 1, int(len(values) * p))] * 1000, 3) if values else None
+
+
+async def run_case(args, batched: bool) -> dict:
+    loop = asyncio.get_running_loop()
+    latencies = []
+    done = asyncio.Event()
+    total = args.threads * args.events
+    processed = 0
+    calls = 0
+
+    async def consumer(events):
+        nonlocal processed, calls
+        calls += 1
+        # Fixed cost per call plus a small cost per event
+        time.sleep(args.call_ms / 1000 + len(events) * args.event_us / 1e6)
+        now = time.perf_counter()
+        latencies.extend(now - submitted_at for submitted_at in events)
+        processed += len(events)
+        if processed >= total:
+            done.set()
+
+    if batched:
+        bridge = LoopBridge(consumer)
+        bridge.start(loop)
+        submit = lambda: bridge.submit(time.perf_counter())
+    else:
+        submit = lambda: asyncio.run_coroutine_threadsafe(consumer([time.perf_counter()]), loop)
+
+    def producer():
+        for _ in range(args.events):
+            submit()
+            if args.gap_us:
+                time.sleep(args.gap_us / 1e6)
+
+    start = time.perf_counter()
+    threads = [threading.Thread(target=producer) for _ in range(args.threads)]
+    for thread in threads:
+        thread.start()
+    await done.wait()
+    elapsed = time.perf_counter() - start
+    for thread in threads:
+        thread.join()
+    if batched:
+        await bridge.stop()
+
+    return {
+        "mode": "batched" if batched else "per_event",
+        "events": total,
+        "consumer_calls": calls,
+        "seconds": round(elapsed, 3),
+        "events_per_second": round(total / elapsed),
+        "latency_ms_p50": percentile(latencies, 0.5),
+        "latency_ms_p99": percentile(latencies, 0.99),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--threads", type=int, default=4)
+    parser.add_argument("--events", type=int, default=2500, help="events per producer thread")
+    parser.add_argument("--call-ms", type=float, default=0.2)
+    parser.add_argument("--event-us", type=float, default=5.0)
+    parser.add_argument("--gap-us", type=float, default=0.0)
+    args = parser.parse_args()
+    for batched in (False, True):
+        print(json.dumps(asyncio.run(run_case(args, batched))))
+
+
+if __name__ == "__main__":
+    main()
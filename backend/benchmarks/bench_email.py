@@ -0,0 +1,148 @@
+"""
+Benchmark: email alert delivery against the local SMTP stand-in
+
+Sends a burst of alerts through:
+
+    per_alert  a new SMTP connection with STARTTLS and login per alert
+               (the old EmailAlertHandler._send_smtp)
+    pooled     EmailAlertHandler with its SMTPPool
+    digest     EmailAlertHandler in digest mode (--digest-seconds window)
+
+and reports wall time, per-alert latency, and what the server saw
+(connections, TLS handshakes, logins, messages). --delay-ms makes the
+stand-in wait before every reply, like a relay a few milliseconds away.
+
+Run from backend/:  python -m benchmarks.bench_email --tls --delay-ms 5
+"""
+import argparse
+import asyncio
+import json
+import os
+import shutil
+import ssl
+import tempfile
+import time
+
+from benchmarks.smtp_stand_in import SMTPStandIn, make_certificate
+
+
+def percentile(values, p):
+    values = sorted(values)
+    return round(values[min(len(values) - 1, int(len(values) * p))] * 1000, 3) if values else None
+
+
+class PerAlertConnection:
+    """The previous EmailAlertHandler: connect, STARTTLS and login for every alert"""
+
+    def __init__(self, handler, tls_context):
+        self.handler = handler
+        self.tls_context = tls_context
+
+    def _send_smtp(self, recipients, message):
+        import smtplib
+        with smtplib.SMTP(self.handler.smtp_server, self.handler.smtp_port) as server:
+            if self.tls_context is not None:
+                server.starttls(context=self.tls_context)
+            server.login(self.handler.smtp_user, self.handler.smtp_password)
+            server.sendmail(self.handler.from_address, recipients, message)
+
+    async def send(self, event):
+        subject, body = self.handler._format_message(event)
+        message = f"Subject: {subject}\r\n\r\n{body}".encode("utf-8")
+        await asyncio.to_thread(self._send_smtp, self.handler.to_addresses, message)
+        return True
+
+    async def close(self):
+        pass
+
+
+async def run_case(name, sender, server, alerts: int, concurrency: int) -> dict:
+    latencies = []
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def one(index):
+        event = {"decoy_id": f"BENCH{index:011d}", "event_type": "modified", "username": "bench",
+                 "hostname": "bench-host", "accessed_path": f"/tmp/bench-{index}.docx", "timestamp": "now"}
+        async with semaphore:
+            start = time.perf_counter()
+            await sender.send(event)
+            latencies.append(time.perf_counter() - start)
+
+    server.reset()
+    start = time.perf_counter()
+    await asyncio.gather(*(one(i) for i in range(alerts)))
+    queued = time.perf_counter() - start
+    await sender.close()
+    wall = time.perf_counter() - start
+    return {
+        "case": name,
+        "alerts": alerts,
+        "concurrency": concurrency,
+        "wall_ms": round(wall * 1000, 1),
+        "send_returned_ms": round(queued * 1000, 1),
+        "p50_ms": percentile(latencies, 0.5),
+        "p99_ms": percentile(latencies, 0.99),
+        "server": dict(server.stats),
+    }
+
+
+async def run(args):
+    scratch = tempfile.mkdtemp(prefix="decoydna-bench-")
+    try:
+        tls_files = make_certificate(scratch) if args.tls else None
+        client_context = None
+        if tls_files:
+            # Trust the throwaway certificate for smtplib's default STARTTLS context
+            os.environ["SSL_CERT_FILE"] = tls_files[0]
+            client_context = ssl.create_default_context(cafile=tls_files[0])
+        from app.alerts.handlers import EmailAlertHandler
+
+        server = SMTPStandIn(delay_ms=args.delay_ms, tls_files=tls_files)
+        await server.start()
+
+        def handler(digest_seconds=0.0):
+            return EmailAlertHandler(
+                smtp_server="127.0.0.1", smtp_port=server.port, smtp_user="bench", smtp_password="bench",
+                from_address="decoydna@example.com", to_addresses=args.to.split(","),
+                starttls=bool(tls_files), pool_size=args.pool_size, digest_seconds=digest_seconds,
+            )
+
+        results = []
+        try:
+            cases = [
+                ("per_alert", lambda: PerAlertConnection(handler(), client_context)),
+                ("pooled", handler),
+                ("digest", lambda: handler(args.digest_seconds)),
+            ]
+            for name, make in cases:
+                result = await run_case(name, make(), server, args.alerts, args.concurrency)
+                result["tls"] = bool(tls_files)
+                results.append(result)
+                print(json.dumps(result))
+        finally:
+            await server.stop()
+        return results
+    finally:
+        shutil.rmtree(scratch)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark pooled and digest email alerts")
+    parser.add_argument("--alerts", type=int, default=100)
+    parser.add_argument("--concurrency", type=int, default=10)
+    parser.add_argument("--pool-size", type=int, default=2)
+    parser.add_argument("--digest-seconds", type=float, default=0.5)
+    parser.add_argument("--to", default="soc@example.com,oncall@example.com")
+    parser.add_argument("--delay-ms", type=float, default=0.0, help="Stand-in delay before every reply")
+    parser.add_argument("--tls", action="store_true", help="Use STARTTLS with a throwaway certificate")
+    parser.add_argument("--output", help="Write results as JSON")
+    args = parser.parse_args()
+
+    results = asyncio.run(run(args))
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({"benchmark": "email", "results": results}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,252 @@
+"""
+Benchmark: honeyfile creation cost per file type and template
+
+Runs HoneyfileService.create_honeyfile for every (file_type,
+template_type) with the full generator and with template stamping, and
+breaks each call into stages by timing the collaborators it calls:
+
+    render     generator.generate_honeyfile minus the two stages below
+               (building the document and writing it out)
+    watermark  decoy ID and watermark calls made while generating: the
+               app.utils.crypto helpers and generator methods named
+               *watermark*
+    hash       SHA256 calls made while generating (calculate_sha256 and
+               generator methods named *hash*); stamping hashes while it
+               writes, so that cost stays in render
+    seed       planting copies into --seed-dirs scratch directories
+    db         commit + refresh of the honeyfile row
+    register   everything else (monitoring registration, bookkeeping)
+
+Stage times are exclusive: a hash taken inside a watermark call counts
+as hash only. It also reports the one-off import cost of the generation
+stack, output size, and tracemalloc peak memory for one extra create. Uses a scratch SQLite database and
+removes every file it creates, so it runs offline next to a real install.
+
+Run from backend/:  python -m benchmarks.bench_generation --output results.json
+"""
+import argparse
+import importlib
+import json
+import os
+import platform
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+from contextlib import ExitStack, contextmanager
+from datetime import datetime
+
+STAGES = ("render", "watermark", "hash", "seed", "db", "register", "total")
+# Stage of the generator collaborators, matched against function names
+GENERATOR_STAGES = (("hash", ("hash", "sha256")), ("watermark", ("watermark", "decoy_id")))
+
+
+def import_stack() -> dict:
+    """Import the generation stack, timing each module that is not loaded yet"""
+    timings = {}
+    for module in ("app.honeyfiles.generator", "app.honeyfiles.stamping", "app.services.business"):
+        start = time.perf_counter()
+        importlib.import_module(module)
+        timings[module] = round((time.perf_counter() - start) * 1000, 2)
+    return timings
+
+
+@contextmanager
+def patched(target, name, wrapper):
+    original = getattr(target, name)
+    setattr(target, name, wrapper(original))
+    try:
+        yield
+    finally:
+        setattr(target, name, original)
+
+
+class StageTimer:
+    """Accumulate exclusive wall time spent inside wrapped callables
+
+    Time spent in a wrapped call nested inside another is charged to the
+    inner stage only.
+    """
+
+    def __init__(self):
+        self.totals = {}
+        self._stack = []
+
+    def wrap(self, stage):
+        def decorator(function):
+            def timed(*args, **kwargs):
+                frame = [0.0]  # time taken by nested wrapped calls
+                self._stack.append(frame)
+                start = time.perf_counter()
+                try:
+                    return function(*args, **kwargs)
+                finally:
+                    elapsed = time.perf_counter() - start
+                    self._stack.pop()
+                    if self._stack:
+                        self._stack[-1][0] += elapsed
+                    self.totals[stage] = self.totals.get(stage, 0.0) + elapsed - frame[0]
+            return timed
+        return decorator
+
+
+def generator_collaborators(generator):
+    """(target, attribute, stage) for every watermark/hash call the generator can make"""
+    from app.utils import crypto
+
+    inner = getattr(generator, "generator", generator)  # stamping wraps the full generator
+    modules = {crypto, sys.modules[type(inner).__module__], sys.modules[type(generator).__module__]}
+    found = []
+    for target in list(modules) + [type(inner)]:
+        for name, value in list(vars(target).items()):
+            if not callable(value) or isinstance(value, type) or name == "generate_honeyfile":
+                continue
+            for stage, words in GENERATOR_STAGES:
+                if any(word in name.lower() for word in words):
+                    found.append((target, name, stage))
+                    break
+    return found
+
+
+def create_once(business, session, generator, file_type, template_type, seed_dirs, index):
+    """One instrumented create_honeyfile call; returns (stage seconds, result)"""
+    timer = StageTimer()
+    with ExitStack() as stack:
+        stack.enter_context(patched(business, "honeyfile_generator", lambda _: generator))
+        stack.enter_context(patched(generator, "generate_honeyfile", timer.wrap("render")))
+        for target, name, stage in generator_collaborators(generator):
+            stack.enter_context(patched(target, name, timer.wrap(stage)))
+        stack.enter_context(patched(business, "plant_copies", timer.wrap("seed")))
+        stack.enter_context(patched(session, "commit", timer.wrap("db")))
+        stack.enter_context(patched(session, "refresh", timer.wrap("db")))
+        start = time.perf_counter()
+        result = business.HoneyfileService.create_honeyfile(
+            session, f".bench-{index}.{file_type}", file_type, template_type, seed_dirs
+        )
+        total = time.perf_counter() - start
+    stages = dict(timer.totals)
+    stages["total"] = total
+    stages["register"] = total - sum(stages.get(s, 0.0) for s in STAGES if s not in ("register", "total"))
+    return stages, result
+
+
+def summarize(samples):
+    values = sorted(samples)
+    return {
+        "mean_ms": round(statistics.fmean(values) * 1000, 3),
+        "p50_ms": round(values[len(values) // 2] * 1000, 3),
+        "p95_ms": round(values[min(len(values) - 1, int(len(values) * 0.95))] * 1000, 3),
+    }
+
+
+def run_case(business, session, generator, mode, file_type, template_type, args, seed_dirs):
+    created = []
+    # Warm-up builds the stamping skeleton so it is reported separately
+    start = time.perf_counter()
+    _, result = create_once(business, session, generator, file_type, template_type, seed_dirs, "warmup")
+    warmup_ms = round((time.perf_counter() - start) * 1000, 2)
+    created.append(result)
+
+    samples = {stage: [] for stage in STAGES}
+    for i in range(args.iterations):
+        stages, result = create_once(business, session, generator, file_type, template_type, seed_dirs, i)
+        created.append(result)
+        for stage in STAGES:
+            samples[stage].append(stages.get(stage, 0.0))
+
+    tracemalloc.start()
+    _, result = create_once(business, session, generator, file_type, template_type, seed_dirs, "memory")
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    created.append(result)
+
+    output_bytes = os.path.getsize(result["file_path"])
+    cleanup(business, session, created, seed_dirs)
+    return {
+        "file_type": file_type,
+        "template_type": template_type,
+        "mode": mode,
+        "iterations": args.iterations,
+        "first_call_ms": warmup_ms,
+        "stages": {stage: summarize(samples[stage]) for stage in STAGES},
+        "output_bytes": output_bytes,
+        "peak_memory_kb": round(peak / 1024, 1),
+        "per_second": round(args.iterations / sum(samples["total"]), 1),
+    }
+
+
+def cleanup(business, session, created, seed_dirs):
+    from app.models.database_models import Honeyfile
+
+    for result in created:
+        paths = [result["file_path"]] + [os.path.join(d, os.path.basename(result["file_path"])) for d in seed_dirs]
+        for path in paths:
+            if os.path.exists(path):
+                os.remove(path)
+        business.monitoring_engine.honeyfile_registry = {
+            path: decoy_id for path, decoy_id in business.monitoring_engine.honeyfile_registry.items()
+            if decoy_id != result["decoy_id"]
+        }
+    session.query(Honeyfile).delete()
+    session.commit()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--iterations", type=int, default=20)
+    parser.add_argument("--types", default="docx,xlsx,pdf")
+    parser.add_argument("--templates", default="passwords,salaries,project_secrets")
+    parser.add_argument("--modes", default="full,stamping")
+    parser.add_argument("--seed-dirs", type=int, default=2, help="scratch seed directories per honeyfile")
+    parser.add_argument("--output", help="also write all results to this JSON file")
+    args = parser.parse_args()
+
+    imports = import_stack()
+
+    from sqlalchemy import create_engine
+    from sqlalchemy.orm import sessionmaker
+    from app.db.database import Base
+    from app.models import database_models  # noqa: F401 - registers tables
+    from app.honeyfiles.stamping import create_honeyfile_generator
+    business = importlib.import_module("app.services.business")
+
+    scratch = tempfile.mkdtemp(prefix="decoydna-bench-")
+    engine = create_engine(f"sqlite:///{os.path.join(scratch, 'bench.db')}")
+    Base.metadata.create_all(engine)
+    session = sessionmaker(bind=engine)()
+    seed_dirs = [os.path.join(scratch, f"seed{i}") for i in range(args.seed_dirs)]
+    for directory in seed_dirs:
+        os.makedirs(directory)
+
+    results = []
+    try:
+        for mode in args.modes.split(","):
+            generator = create_honeyfile_generator(stamping=(mode == "stamping"))
+            for file_type in args.types.split(","):
+                for template_type in args.templates.split(","):
+                    result = run_case(business, session, generator, mode, file_type, template_type,
+                                      args, seed_dirs)
+                    results.append(result)
+                    print(json.dumps(result))
+    finally:
+        session.close()
+        engine.dispose()
+        shutil.rmtree(scratch)
+
+    if args.output:
+        report = {
+            "benchmark": "generation",
+            "timestamp": datetime.utcnow().isoformat(),
+            "python": sys.version.split()[0],
+            "platform": platform.platform(),
+            "import_ms": imports,
+            "results": results,
+        }
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+"""
+Benchmark: planting one honeyfile into many seed locations
+
+Plants a --size-kb file into --locations fresh directories with each
+strategy list and reports wall time and bytes written per 1,000
+locations. "serial-copy" is the baseline: buffered copies one directory
+at a time. Strategies the filesystem does not support fall back to copies
+(see "methods").
+
+Run from backend/:  python -m benchmarks.bench_seeding [--root /mnt/share]
+"""
+import argparse
+import json
+import os
+import shutil
+import tempfile
+import time
+
+from app.honeyfiles import seeding
+from app.honeyfiles.seeding import COPY, HARDLINK, REFLINK, plant_copies
+
+CASES = {
+    "serial-copy": [COPY],
+    "copy": [COPY],
+    "hardlink": [HARDLINK, COPY],
+    "reflink": [REFLINK, COPY],
+    "auto": [REFLINK, HARDLINK, COPY],
+}
+
+
+def run_case(name: str, source: str, root: str, locations: int) -> dict:
+    case_root = tempfile.mkdtemp(prefix=f"{name}-", dir=root)
+    directories = [os.path.join(case_root, f"share{i:05d}") for i in range(locations)]
+    for directory in directories:
+        os.makedirs(directory)
+
+    start = time.perf_counter()
+    if name == "serial-copy":
+        bytes_written = 0
+        for directory in directories:
+            shutil.copyfile(source, os.path.join(directory, os.path.basename(source)))
+            bytes_written += os.path.getsize(source)
+        methods = {COPY: locations}
+    else:
+        result = plant_copies(source, directories, expected_hash="0" * 64, strategies=CASES[name])
+        bytes_written = result["bytes_written"]
+        methods = result["methods"]
+    elapsed = time.perf_counter() - start
+    shutil.rmtree(case_root)
+
+    per_thousand = 1000 / locations
+    return {
+        "case": name,
+        "locations": locations,
+        "methods": methods,
+        "seconds_per_1000": round(elapsed * per_thousand, 4),
+        "bytes_written_per_1000": int(bytes_written * per_thousand),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--locations", type=int, default=1000)
+    parser.add_argument("--size-kb", type=int, default=64)
+    parser.add_argument("--root", default=None, help="directory on the filesystem to test")
+    parser.add_argument("--cases", default=",".join(CASES))
+    args = parser.parse_args()
+
+    root = tempfile.mkdtemp(prefix="decoydna-seed-", dir=args.root)
+    try:
+        source = os.path.join(root, "honeyfile.docx")
+        with open(source, "wb") as f:
+            f.write(os.urandom(args.size_kb * 1024))
+        for name in args.cases.split(","):
+            seeding._unsupported.clear()
+            print(json.dumps(run_case(name, source, root, args.locations)))
+    finally:
+        shutil.rmtree(root)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,178 @@
+"""
+Benchmark: Slack alert latency, pooled session vs a session per alert
+
+Starts a local stand-in for the Slack webhook (aiohttp.web, optionally
+over TLS with a throwaway self-signed certificate made with the openssl
+CLI) and sends alerts through:
+
+    per_alert  a new aiohttp.ClientSession per alert (the old behaviour)
+    pooled     SlackAlertHandler with its pooled keep-alive session
+
+once sequentially and once as a concurrent burst. The stand-in can add
+--server-ms of processing time per request. Reports per-alert latency
+percentiles, burst wall time and how many connections the server saw.
+
+Run from backend/:  python -m benchmarks.bench_slack --tls --alerts 200
+"""
+import argparse
+import asyncio
+import json
+import os
+import shutil
+import ssl
+import subprocess
+import tempfile
+import time
+
+
+def percentile(values, p):
+    values = sorted(values)
+    return round(values[min(len(values) - 1, int(len(values) * p))] * 1000, 3) if values else None
+
+
+def make_certificate(directory: str):
+    """Self-signed certificate for 127.0.0.1; returns (cert, key) paths"""
+    cert, key = os.path.join(directory, "cert.pem"), os.path.join(directory, "key.pem")
+    subprocess.run(
+        ["openssl", "req", "-x509", "-newkey", "rsa:2048", "-nodes", "-days", "1",
+         "-subj", "/CN=127.0.0.1", "-addext", "subjectAltName=IP:127.0.0.1",
+         "-keyout", key, "-out", cert],
+        check=True, capture_output=True,
+    )
+    return cert, key
+
+
+async def start_stand_in(server_ms: float, tls_files):
+    """Webhook stand-in; returns (runner, url, stats)"""
+    from aiohttp import web
+
+    stats = {"requests": 0, "connections": set()}
+
+    async def webhook(request):
+        stats["requests"] += 1
+        stats["connections"].add(request.transport.get_extra_info("peername"))
+        await request.read()
+        if server_ms:
+            await asyncio.sleep(server_ms / 1000)
+        return web.Response(text="ok")
+
+    app = web.Application()
+    app.router.add_post("/webhook", webhook)
+    runner = web.AppRunner(app, access_log=None)
+    await runner.setup()
+    context = None
+    if tls_files:
+        context = ssl.create_default_context(ssl.Purpose.CLIENT_AUTH)
+        context.load_cert_chain(*tls_files)
+    site = web.TCPSite(runner, "127.0.0.1", 0, ssl_context=context)
+    await site.start()
+    port = site._server.sockets[0].getsockname()[1]
+    scheme = "https" if tls_files else "http"
+    return runner, f"{scheme}://127.0.0.1:{port}/webhook", stats
+
+
+class PerAlertSession:
+    """The previous SlackAlertHandler.send: one ClientSession per alert"""
+
+    def __init__(self, webhook_url: str):
+        self.webhook_url = webhook_url
+
+    async def send(self, event):
+        import aiohttp
+        from app.alerts.handlers import SlackAlertHandler
+        async with aiohttp.ClientSession() as session:
+            async with session.post(self.webhook_url, json=SlackAlertHandler._format_message(event)) as resp:
+                return resp.status == 200
+
+    async def close(self):
+        pass
+
+
+async def run_case(name, sender, stats, alerts: int, concurrency: int) -> dict:
+    event = {"decoy_id": "BENCH00000000000", "event_type": "modified", "username": "bench",
+             "hostname": "bench-host", "accessed_path": "/tmp/bench.docx", "timestamp": "now"}
+    latencies = []
+    failures = 0
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def one():
+        nonlocal failures
+        async with semaphore:
+            start = time.perf_counter()
+            ok = await sender.send(event)
+            latencies.append(time.perf_counter() - start)
+            failures += not ok
+
+    stats["requests"] = 0
+    stats["connections"] = set()
+    start = time.perf_counter()
+    if concurrency == 1:
+        for _ in range(alerts):
+            await one()
+    else:
+        await asyncio.gather(*(one() for _ in range(alerts)))
+    wall = time.perf_counter() - start
+    return {
+        "case": name,
+        "alerts": alerts,
+        "concurrency": concurrency,
+        "failures": failures,
+        "wall_ms": round(wall * 1000, 1),
+        "alerts_per_second": round(alerts / wall, 1),
+        "p50_ms": percentile(latencies, 0.5),
+        "p99_ms": percentile(latencies, 0.99),
+        "server_connections": len(stats["connections"]),
+    }
+
+
+async def run(args):
+    scratch = tempfile.mkdtemp(prefix="decoydna-bench-")
+    try:
+        tls_files = make_certificate(scratch) if args.tls else None
+        if tls_files:
+            # Trust the throwaway certificate for the client side of this process
+            os.environ["SSL_CERT_FILE"] = tls_files[0]
+        from app.alerts.handlers import SlackAlertHandler
+
+        runner, url, stats = await start_stand_in(args.server_ms, tls_files)
+        results = []
+        try:
+            for concurrency in (1, args.concurrency):
+                for name in ("per_alert", "pooled"):
+                    if name == "pooled":
+                        sender = SlackAlertHandler(url, max_connections=args.max_connections)
+                        await sender.start()
+                    else:
+                        sender = PerAlertSession(url)
+                    try:
+                        result = await run_case(name, sender, stats, args.alerts, concurrency)
+                    finally:
+                        await sender.close()
+                    result["tls"] = bool(tls_files)
+                    results.append(result)
+                    print(json.dumps(result))
+        finally:
+            await runner.cleanup()
+        return results
+    finally:
+        shutil.rmtree(scratch)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark pooled vs per-alert Slack sessions")
+    parser.add_argument("--alerts", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=50, help="In-flight alerts for the burst run")
+    parser.add_argument("--max-connections", type=int, default=10)
+    parser.add_argument("--server-ms", type=float, default=0.0, help="Stand-in processing time per request")
+    parser.add_argument("--tls", action="store_true", help="Serve the stand-in over HTTPS")
+    parser.add_argument("--output", help="Write results as JSON")
+    args = parser.parse_args()
+
+    results = asyncio.run(run(args))
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({"benchmark": "slack", "results": results}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,61 @@
+"""
+Benchmark: template stamping vs full honeyfile regeneration
+
+Creates --count decoys per (file_type, template_type) with the full
+HoneyfileGenerator and with StampingHoneyfileGenerator (skeleton build
+excluded, reported separately) and prints decoys per second for each.
+Files are written under a scratch name prefix and removed afterwards.
+
+Run from backend/:  python -m benchmarks.bench_stamping
+"""
+import argparse
+import json
+import os
+import time
+
+from app.honeyfiles.generator import HoneyfileGenerator
+from app.honeyfiles.stamping import StampingHoneyfileGenerator
+
+
+def run(generator, file_type: str, template_type: str, count: int, prefix: str) -> float:
+    paths = []
+    start = time.perf_counter()
+    for i in range(count):
+        result = generator.generate_honeyfile(f"{prefix}{i}.{file_type}", file_type, template_type)
+        paths.append(result["file_path"])
+    elapsed = time.perf_counter() - start
+    for path in paths:
+        os.remove(path)
+    return elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--count", type=int, default=200, help="decoys per template and mode")
+    parser.add_argument("--types", default="docx,xlsx,pdf")
+    parser.add_argument("--templates", default="passwords,salaries,project_secrets")
+    args = parser.parse_args()
+
+    full = HoneyfileGenerator()
+    stamping = StampingHoneyfileGenerator(HoneyfileGenerator())
+    for file_type in args.types.split(","):
+        for template_type in args.templates.split(","):
+            start = time.perf_counter()
+            stamping._get_skeleton(file_type, template_type)
+            skeleton_seconds = time.perf_counter() - start
+
+            full_seconds = run(full, file_type, template_type, args.count, ".bench-full-")
+            stamped_seconds = run(stamping, file_type, template_type, args.count, ".bench-stamp-")
+            print(json.dumps({
+                "file_type": file_type,
+                "template_type": template_type,
+                "stamped": stamping.get_stats()["skeletons"][f"{file_type}/{template_type}"],
+                "skeleton_ms": round(skeleton_seconds * 1000, 1),
+                "full_per_second": round(args.count / full_seconds, 1),
+                "stamped_per_second": round(args.count / stamped_seconds, 1),
+                "speedup": round(full_seconds / stamped_seconds, 1),
+            }))
+
+
+if __name__ == "__main__":
+    main()
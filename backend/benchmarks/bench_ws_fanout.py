@@ -0,0 +1,90 @@
+"""
+Load test: event hub fan-out to 500 concurrent dashboard sockets
+
+Each simulated socket runs the same pump() used by /api/ws/events and
+spends --send-ms per message; a fraction of them are slow consumers.
+Reports end-to-end delivery latency, drops and disconnects.
+
+Run from backend/:  python -m benchmarks.bench_ws_fanout
+"""
+import argparse
+import asyncio
+import json
+import statistics
+import time
+
+from app.monitoring.hub import EventHub, DROP_OLDEST, DISCONNECT, build_envelope, pump
+
+
+async def run(args) -> dict:
+    hub = EventHub(queue_size=args.queue_size, policy=args.policy)
+    hub.attach_loop(asyncio.get_running_loop())
+    latencies = []
+    received = [0] * args.clients
+    slow_every = max(1, int(1 / args.slow_fraction)) if args.slow_fraction else 0
+
+    def make_send(index: int):
+        slow = slow_every and index % slow_every == 0
+        delay = args.slow_ms / 1000 if slow else args.send_ms / 1000
+
+        async def send(payload: str):
+            if delay:
+                await asyncio.sleep(delay)
+            sent_at = json.loads(payload)["data"]["sent_at"]
+            latencies.append(time.perf_counter() - sent_at)
+            received[index] += 1
+
+        return send
+
+    subscriptions = [hub.subscribe() for _ in range(args.clients)]
+    tasks = [asyncio.create_task(pump(sub, make_send(i))) for i, sub in enumerate(subscriptions)]
+
+    start = time.perf_counter()
+    for i in range(args.events):
+        hub.publish(build_envelope({
+            "decoy_id": f"decoy{i % 20:012d}",
+            "event_type": "modified",
+            "timestamp": "2024-01-01T00:00:00",
+            "sent_at": time.perf_counter(),
+        }))
+        await asyncio.sleep(1 / args.rate)
+    publish_seconds = time.perf_counter() - start
+
+    # Let fast consumers drain
+    await asyncio.sleep(args.drain)
+    for task in tasks:
+        task.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
+
+    latencies.sort()
+    return {
+        "clients": args.clients,
+        "events": args.events,
+        "policy": args.policy,
+        "publish_seconds": round(publish_seconds, 3),
+        "messages_delivered": len(latencies),
+        "latency_ms_p50": round(latencies[len(latencies) // 2] * 1000, 2) if latencies else None,
+        "latency_ms_p99": round(latencies[int(len(latencies) * 0.99)] * 1000, 2) if latencies else None,
+        "latency_ms_max": round(latencies[-1] * 1000, 2) if latencies else None,
+        "median_received_per_client": statistics.median(received),
+        "hub": hub.get_stats(),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--clients", type=int, default=500)
+    parser.add_argument("--events", type=int, default=500)
+    parser.add_argument("--rate", type=float, default=500, help="events per second")
+    parser.add_argument("--queue-size", type=int, default=64)
+    parser.add_argument("--policy", choices=[DROP_OLDEST, DISCONNECT], default=DROP_OLDEST)
+    parser.add_argument("--send-ms", type=float, default=0.0)
+    parser.add_argument("--slow-ms", type=float, default=50.0)
+    parser.add_argument("--slow-fraction", type=float, default=0.05)
+    parser.add_argument("--drain", type=float, default=1.0)
+    args = parser.parse_args()
+    print(json.dumps(asyncio.run(run(args)), indent=2))
+
+
+if __name__ == "__main__":
+    main()
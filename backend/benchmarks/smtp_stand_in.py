@@ -0,0 +1,179 @@
+"""
+Local SMTP stand-in for testing and benchmarking email alerts
+
+A small asyncio SMTP server that accepts any AUTH and any recipient and
+keeps received messages in memory. It speaks EHLO/HELO, STARTTLS (with
+--tls, using a throwaway self-signed certificate), AUTH PLAIN/LOGIN,
+MAIL, RCPT, DATA, NOOP, RSET and QUIT, and can delay every reply by
+--delay-ms to stand in for a remote relay.
+
+Point the API at it:
+
+    python -m benchmarks.smtp_stand_in --port 2525
+    EMAIL_SMTP_SERVER=127.0.0.1 EMAIL_SMTP_PORT=2525 EMAIL_SMTP_STARTTLS=false \\
+        EMAIL_TO=soc@example.com uvicorn app.main:app
+"""
+import argparse
+import asyncio
+import os
+import ssl
+import subprocess
+import tempfile
+from typing import Dict, List, Optional
+
+
+def make_certificate(directory: str):
+    """Self-signed certificate for 127.0.0.1; returns (cert, key) paths"""
+    cert, key = os.path.join(directory, "cert.pem"), os.path.join(directory, "key.pem")
+    subprocess.run(
+        ["openssl", "req", "-x509", "-newkey", "rsa:2048", "-nodes", "-days", "1",
+         "-subj", "/CN=127.0.0.1", "-addext", "subjectAltName=IP:127.0.0.1",
+         "-keyout", key, "-out", cert],
+        check=True, capture_output=True,
+    )
+    return cert, key
+
+
+class SMTPStandIn:
+    """In-memory SMTP server; `messages` holds (mail_from, rcpt_to, data)"""
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 0, delay_ms: float = 0.0,
+                 tls_files: Optional[tuple] = None):
+        self.host = host
+        self.port = port
+        self.delay = delay_ms / 1000
+        self.tls_context = None
+        if tls_files:
+            self.tls_context = ssl.create_default_context(ssl.Purpose.CLIENT_AUTH)
+            self.tls_context.load_cert_chain(*tls_files)
+        self.messages: List[tuple] = []
+        self.stats: Dict[str, int] = {"connections": 0, "starttls": 0, "logins": 0, "noops": 0, "messages": 0}
+        self._server = None
+        self._writers: set = set()
+
+    async def start(self):
+        self._server = await asyncio.start_server(self._handle, self.host, self.port)
+        self.port = self._server.sockets[0].getsockname()[1]
+
+    async def stop(self):
+        if self._server is not None:
+            self._server.close()
+            for writer in list(self._writers):
+                writer.close()
+            await self._server.wait_closed()
+
+    def reset(self):
+        self.messages.clear()
+        for key in self.stats:
+            self.stats[key] = 0
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        self.stats["connections"] += 1
+        self._writers.add(writer)
+
+        async def reply(line: str):
+            if self.delay:
+                await asyncio.sleep(self.delay)
+            writer.write(line.encode() + b"\r\n")
+            await writer.drain()
+
+        mail_from, rcpt_to = None, []
+        try:
+            await reply("220 decoydna-stand-in ESMTP")
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                command = line.decode(errors="replace").strip()
+                verb = command.split(" ", 1)[0].upper()
+                if verb == "EHLO":
+                    features = ["250-decoydna-stand-in", "250-AUTH PLAIN LOGIN", "250-8BITMIME"]
+                    if self.tls_context is not None:
+                        features.append("250-STARTTLS")
+                    features.append("250 SIZE 10485760")
+                    for feature in features[:-1]:
+                        writer.write(feature.encode() + b"\r\n")
+                    await reply(features[-1])
+                elif verb == "HELO":
+                    await reply("250 decoydna-stand-in")
+                elif verb == "STARTTLS" and self.tls_context is not None:
+                    await reply("220 Ready to start TLS")
+                    await writer.start_tls(self.tls_context)
+                    self.stats["starttls"] += 1
+                elif verb == "AUTH":
+                    parts = command.split()
+                    if parts[1].upper() == "LOGIN":
+                        await reply("334 VXNlcm5hbWU6")
+                        await reader.readline()
+                        await reply("334 UGFzc3dvcmQ6")
+                        await reader.readline()
+                    elif len(parts) < 3:
+                        await reply("334 ")
+                        await reader.readline()
+                    self.stats["logins"] += 1
+                    await reply("235 Authentication successful")
+                elif verb == "MAIL":
+                    mail_from, rcpt_to = command[10:].strip(), []
+                    await reply("250 OK")
+                elif verb == "RCPT":
+                    rcpt_to.append(command[8:].strip())
+                    await reply("250 OK")
+                elif verb == "DATA":
+                    await reply("354 End data with <CR><LF>.<CR><LF>")
+                    chunks = []
+                    while True:
+                        data_line = await reader.readline()
+                        if data_line in (b".\r\n", b".\n", b""):
+                            break
+                        chunks.append(data_line)
+                    self.messages.append((mail_from, rcpt_to, b"".join(chunks)))
+                    self.stats["messages"] += 1
+                    await reply("250 OK: queued")
+                elif verb == "NOOP":
+                    self.stats["noops"] += 1
+                    await reply("250 OK")
+                elif verb == "RSET":
+                    mail_from, rcpt_to = None, []
+                    await reply("250 OK")
+                elif verb == "QUIT":
+                    await reply("221 Bye")
+                    break
+                else:
+                    await reply("502 Command not implemented")
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            self._writers.discard(writer)
+            writer.close()
+
+
+async def serve(args):
+    scratch = tempfile.mkdtemp(prefix="decoydna-smtp-")
+    tls_files = make_certificate(scratch) if args.tls else None
+    server = SMTPStandIn(args.host, args.port, args.delay_ms, tls_files)
+    await server.start()
+    print(f"SMTP stand-in listening on {args.host}:{server.port}"
+          f"{' (STARTTLS, certificate ' + tls_files[0] + ')' if tls_files else ''}")
+    try:
+        while True:
+            await asyncio.sleep(10)
+            print(f"stats: {server.stats}")
+    finally:
+        await server.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Local SMTP stand-in")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=2525)
+    parser.add_argument("--delay-ms", type=float, default=0.0, help="Delay before every reply")
+    parser.add_argument("--tls", action="store_true", help="Offer STARTTLS with a self-signed certificate")
+    args = parser.parse_args()
+    try:
+        asyncio.run(serve(args))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
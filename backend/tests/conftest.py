@@ -0,0 +1,35 @@
+"""
+Shared pytest setup: an isolated HOME and SQLite database per test session
+
+Run from backend/:  pip install -r requirements-dev.txt && python -m pytest -q
+"""
+import os
+import sys
+import tempfile
+
+_scratch = tempfile.mkdtemp(prefix="decoydna-tests-")
+os.environ["HOME"] = _scratch
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(_scratch, 'decoydna.db')}"
+os.environ.setdefault("METRICS_ENABLED", "true")
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pytest
+
+from app.db.database import Base, engine, init_db, SessionLocal
+import app.models.database_models  # noqa: F401  (registers the models)
+import app.models.file_sharing  # noqa: F401
+
+init_db()
+
+
+@pytest.fixture
+def db():
+    """A session on an emptied database"""
+    session = SessionLocal()
+    try:
+        yield session
+    finally:
+        session.close()
+        with engine.begin() as conn:
+            for table in reversed(Base.metadata.sorted_tables):
+                conn.execute(table.delete())
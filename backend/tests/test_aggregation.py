@@ -0,0 +1,59 @@
+import time
+
+from app.alerts.aggregation import AlertAggregator
+
+
+def _event(decoy_id="d1", username="alice", event_type="modified", path="/x/a.docx"):
+    return {"decoy_id": decoy_id, "username": username, "hostname": "h", "event_type": event_type,
+            "accessed_path": path, "timestamp": "2026-10-19T10:00:00"}
+
+
+def test_first_event_alerts_and_repeats_fold_into_one_summary():
+    aggregator = AlertAggregator(window_seconds=0.05)
+
+    assert aggregator.admit(_event()) is True
+    assert aggregator.admit(_event(event_type="deleted")) is False
+    assert aggregator.admit(_event(path="/x/b.docx")) is False
+    assert aggregator.due() == []
+    time.sleep(0.06)
+
+    [summary] = aggregator.due()
+    assert summary["aggregate"]["count"] == 2
+    assert summary["aggregate"]["event_types"] == {"deleted": 1, "modified": 1}
+    assert summary["aggregate"]["paths"] == ["/x/a.docx", "/x/b.docx"]
+
+
+def test_quiet_window_ends_the_group():
+    aggregator = AlertAggregator(window_seconds=0.02)
+    aggregator.admit(_event())
+    time.sleep(0.03)
+
+    assert aggregator.due() == []
+    assert aggregator.admit(_event()) is True
+
+
+def test_overflow_evicts_the_least_recently_active_group():
+    aggregator = AlertAggregator(window_seconds=60, max_keys=2)
+    aggregator.admit(_event("a"))
+    aggregator.admit(_event("b"))
+    aggregator.admit(_event("a"))  # folds, so "a" is now the most recently active
+
+    aggregator.admit(_event("c"))
+
+    assert aggregator.admit(_event("a")) is False
+    assert aggregator.admit(_event("b")) is True  # "b" was evicted and starts a new burst
+    assert aggregator.get_stats()["evicted"] == 2
+
+
+def test_evicted_group_summary_is_not_lost():
+    aggregator = AlertAggregator(window_seconds=60, max_keys=1)
+    aggregator.admit(_event("a"))
+    aggregator.admit(_event("a"))
+    aggregator.admit(_event("a"))
+
+    aggregator.admit(_event("b"))
+
+    assert aggregator.next_deadline() == 0.0
+    [summary] = aggregator.due()
+    assert summary["decoy_id"] == "a" and summary["aggregate"]["count"] == 2
+    assert aggregator.due() == []
@@ -0,0 +1,173 @@
+import asyncio
+from datetime import datetime, timedelta
+
+from app.alerts.handlers import AlertHandler, AlertManager, EmailAlertHandler
+from app.models.database_models import AccessEvent, AlertDelivery
+from app.services.business import EventService
+from app.services.outbox import AlertOutbox
+
+
+class Recorder(AlertHandler):
+    def __init__(self, ok=True):
+        self.ok = ok
+        self.sent = []
+
+    async def send(self, event):
+        self.sent.append(event)
+        if not self.ok:
+            raise ConnectionError("relay down")
+        return True
+
+
+def _manager(aggregation_seconds=0, **handlers):
+    manager = AlertManager(aggregation_seconds=aggregation_seconds)
+    manager.handlers = dict(handlers)
+    return manager
+
+
+def _outbox(manager, **kwargs):
+    kwargs.setdefault("retry_base", 0.01)
+    return AlertOutbox(lambda: manager, **kwargs)
+
+
+def _context(decoy_id):
+    return {"decoy_id": decoy_id, "event_type": "modified", "accessed_path": f"/x/{decoy_id}.docx",
+            "username": "u", "hostname": "h"}
+
+
+def _queue(db, outbox, count):
+    events = [_context(f"d{i}") for i in range(count)]
+    alerts = outbox.prepare(events)
+    stored = EventService.create_events(db, events, related=lambda context: AlertOutbox.rows_for(alerts, context))
+    outbox.track(stored, alerts)
+    return stored
+
+
+def test_two_dispatchers_never_claim_the_same_row(db):
+    manager = _manager(slack=Recorder())
+    first, second = _outbox(manager), _outbox(manager)
+    _queue(db, first, 5)
+
+    claimed_first, _ = first._settle_and_claim([], {"slack": 3}, [], lease=60)
+    claimed_second, _ = second._settle_and_claim([], {"slack": 3}, [], lease=60)
+
+    ids = [row[0] for row in claimed_first + claimed_second]
+    assert len(claimed_first) == 3 and len(claimed_second) == 2
+    assert len(set(ids)) == 5
+    owners = {row.claimed_by for row in db.query(AlertDelivery)}
+    assert owners == {first.owner, second.owner}
+
+
+def test_only_claims_past_their_lease_are_requeued(db):
+    manager = _manager(slack=Recorder())
+    live, other = _outbox(manager), _outbox(manager)
+    _queue(db, live, 2)
+    live._settle_and_claim([], {"slack": 2}, [], lease=60)
+    stale = db.query(AlertDelivery).first()
+    stale.claimed_at = datetime.utcnow() - timedelta(seconds=120)
+    db.commit()
+
+    claimed, _ = other._settle_and_claim([], {"slack": 2}, [], lease=60)
+
+    assert [row[0] for row in claimed] == [stale.id]
+    db.expire_all()
+    assert sorted(row.claimed_by for row in db.query(AlertDelivery)) == sorted([live.owner, other.owner])
+
+
+def test_failed_sends_are_retried_then_dead_lettered(db):
+    async def scenario():
+        manager = _manager(email=Recorder(ok=False))
+        outbox = _outbox(manager, max_attempts=2)
+        _queue(db, outbox, 1)
+        outbox.start(asyncio.get_running_loop())
+        for _ in range(200):
+            await asyncio.sleep(0.01)
+            if outbox.dead:
+                break
+        await outbox.stop()
+        return manager, outbox
+
+    manager, outbox = asyncio.run(scenario())
+
+    assert len(manager.handlers["email"].sent) == 2
+    assert outbox.retried == 1 and outbox.dead == 1
+    row = db.query(AlertDelivery).one()
+    assert (row.status, row.attempts, row.last_error) == ("dead", 2, "relay down")
+    assert db.query(AccessEvent).one().alert_sent == "failed"
+
+
+def test_unstored_events_alert_directly(db):
+    async def scenario():
+        manager = _manager(slack=Recorder())
+        outbox = _outbox(manager)
+        events = [_context("d1"), dict(_context("d2"), alert_sent="aggregated")]
+        outbox.prepare(events)
+        outbox.send_unstored(events)
+        await asyncio.gather(*outbox._sends)
+        return manager, outbox
+
+    manager, outbox = asyncio.run(scenario())
+
+    assert [event["decoy_id"] for event in manager.handlers["slack"].sent] == ["d1"]
+    assert outbox.unstored == 1
+
+
+def _queue_burst(db, outbox, count):
+    """`count` events for one decoy, user and host; all but the first are folded"""
+    events = [dict(_context("storm"), accessed_path=f"/x/storm-{i}.docx") for i in range(count)]
+    alerts = outbox.prepare(events)
+    return EventService.create_events(db, events, related=lambda context: AlertOutbox.rows_for(alerts, context))
+
+
+def test_summaries_lost_in_a_crash_are_rebuilt_from_stored_events(db):
+    stored = _queue_burst(db, _outbox(_manager(60, slack=Recorder())), 4)
+    folded = {context["event_id"] for context in stored[1:]}
+
+    # A new process: the open window died with the old aggregator
+    restarted = _outbox(_manager(60, slack=Recorder()))
+    restarted._settle_and_claim([], {}, [], recover_before=datetime.utcnow() + timedelta(seconds=1))
+
+    [summary] = db.query(AlertDelivery).filter(AlertDelivery.alert_id != stored[0]["alert_id"]).all()
+    assert set(summary.event_ids) == folded
+    assert summary.payload["aggregate"]["count"] == 3
+    assert len(summary.payload["aggregate"]["paths"]) == 3
+    assert {row.alert_sent for row in db.query(AccessEvent).filter(AccessEvent.id.in_(folded))} == {"pending"}
+    assert restarted.recovered == 3
+
+    restarted._settle_and_claim([], {}, [], recover_before=datetime.utcnow() + timedelta(seconds=1))
+    assert db.query(AlertDelivery).count() == 2
+
+
+def test_queued_summaries_are_not_rebuilt(db):
+    manager = _manager(60, slack=Recorder())
+    outbox = _outbox(manager)
+    _queue_burst(db, outbox, 3)
+
+    outbox._settle_and_claim([], {}, manager.aggregator.due(flush_all=True))
+    outbox._settle_and_claim([], {}, [], recover_before=datetime.utcnow() + timedelta(seconds=1))
+
+    assert db.query(AlertDelivery).count() == 2
+    assert db.query(AccessEvent).filter(AccessEvent.alert_sent == "aggregated").count() == 0
+    assert outbox.recovered == 0
+
+
+def test_digest_send_waits_until_the_digest_is_mailed():
+    mailed = []
+
+    async def scenario():
+        handler = EmailAlertHandler("smtp.invalid", 25, "", "", "from@x", ["to@x"],
+                                    digest_seconds=0.05, digest_max_events=10)
+
+        async def deliver(recipients, subject, body):
+            mailed.append(subject)
+            return False
+
+        handler._deliver = deliver
+        results = await asyncio.gather(handler.send(_context("d1")), handler.send(_context("d2")))
+        return handler, results
+
+    handler, results = asyncio.run(scenario())
+
+    assert results == [False, False]
+    assert len(mailed) == 1
+    assert handler.send_delay == 0.05 and handler.max_in_flight == 10
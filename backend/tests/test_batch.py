@@ -0,0 +1,32 @@
+import asyncio
+
+from app.services.batch import HoneyfileBatchService
+
+
+def test_running_jobs_are_never_evicted(monkeypatch):
+    service = HoneyfileBatchService(max_jobs=1)
+    release = asyncio.Event()
+
+    async def run(job):
+        await release.wait()
+        job.status = "completed"
+        job.done.set()
+
+    monkeypatch.setattr(service, "_run", run)
+
+    async def scenario():
+        first = service.submit([{}])
+        second = service.submit([{}])
+        await asyncio.sleep(0)
+        running = [service.get_job(first.id), service.get_job(second.id)]
+        release.set()
+        await asyncio.gather(*service._tasks)
+        third = service.submit([{}])
+        return first, second, third, running
+
+    first, second, third, running = asyncio.run(scenario())
+
+    assert running == [first, second]
+    assert service.get_job(first.id) is None
+    assert service.get_job(second.id) is None
+    assert service.get_job(third.id) is third
@@ -0,0 +1,130 @@
+import time
+
+from sqlalchemy import update
+
+from app.db.database import SessionLocal
+from app.models.database_models import Honeyfile
+from app.services.business import HoneyfileService, honeyfile_cache
+from app.utils.cache import LRUTTLCache
+
+
+def _honeyfile(db, decoy_id, file_name="payroll.xlsx"):
+    honeyfile = Honeyfile(decoy_id=decoy_id, file_name=file_name, file_type="xlsx",
+                          template_type="salaries", expected_hash="0" * 64)
+    db.add(honeyfile)
+    db.commit()
+    return honeyfile
+
+
+def test_least_recently_used_entry_is_evicted():
+    cache = LRUTTLCache(max_size=2, ttl_seconds=60)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    cache.get("a")
+    cache.set("c", 3)
+
+    assert cache.get("a") == 1
+    assert cache.get("b") is None
+    assert cache.get_stats()["evictions"] == 1
+
+
+def test_entries_expire_after_the_ttl():
+    cache = LRUTTLCache(max_size=2, ttl_seconds=0.01)
+    cache.set("a", 1)
+    time.sleep(0.02)
+
+    assert cache.get("a") is None
+
+
+def test_misses_are_not_cached():
+    cache = LRUTTLCache()
+    loads = []
+
+    assert cache.get_or_load("missing", lambda: loads.append(1)) is None
+    assert cache.get_or_load("missing", lambda: loads.append(1)) is None
+    assert len(loads) == 2
+
+
+def test_updates_invalidate_the_cached_record(db):
+    honeyfile = _honeyfile(db, "cache-update")
+    assert HoneyfileService.get_honeyfile(db, "cache-update")["file_name"] == "payroll.xlsx"
+
+    honeyfile.file_name = "payroll-2024.xlsx"
+    db.commit()
+
+    assert HoneyfileService.get_honeyfile(db, "cache-update")["file_name"] == "payroll-2024.xlsx"
+
+
+def test_renamed_and_deleted_decoys_leave_the_cache(db):
+    honeyfile = _honeyfile(db, "cache-old")
+    assert HoneyfileService.get_honeyfile(db, "cache-old") is not None
+
+    honeyfile.decoy_id = "cache-new"
+    db.commit()
+
+    assert HoneyfileService.get_honeyfile(db, "cache-old") is None
+    assert HoneyfileService.get_honeyfile(db, "cache-new") is not None
+
+    db.delete(honeyfile)
+    db.commit()
+
+    assert honeyfile_cache.get("cache-new") is None
+    assert HoneyfileService.get_honeyfile(db, "cache-new") is None
+
+
+def test_cached_records_are_copies(db):
+    _honeyfile(db, "cache-copy")
+    record = HoneyfileService.get_honeyfile(db, "cache-copy")
+    record["file_name"] = "tampered"
+
+    assert HoneyfileService.get_honeyfile(db, "cache-copy")["file_name"] == "payroll.xlsx"
+
+
+def test_a_read_between_flush_and_commit_is_not_left_in_the_cache(db):
+    _honeyfile(db, "cache-flush")
+    writer = SessionLocal()
+    try:
+        writer.query(Honeyfile).filter(Honeyfile.decoy_id == "cache-flush").one().file_name = "renamed.xlsx"
+        writer.flush()
+
+        assert HoneyfileService.get_honeyfile(db, "cache-flush")["file_name"] == "payroll.xlsx"
+        db.rollback()
+
+        writer.commit()
+    finally:
+        writer.close()
+
+    assert HoneyfileService.get_honeyfile(db, "cache-flush")["file_name"] == "renamed.xlsx"
+
+
+def test_rolled_back_writes_keep_the_cached_record(db):
+    _honeyfile(db, "cache-rollback")
+    assert HoneyfileService.get_honeyfile(db, "cache-rollback")["file_name"] == "payroll.xlsx"
+    writer = SessionLocal()
+    try:
+        writer.query(Honeyfile).filter(Honeyfile.decoy_id == "cache-rollback").one().file_name = "draft.xlsx"
+        writer.flush()
+
+        assert HoneyfileService.get_honeyfile(writer, "cache-rollback")["file_name"] == "draft.xlsx"
+        writer.rollback()
+    finally:
+        writer.close()
+
+    assert honeyfile_cache.get("cache-rollback")["file_name"] == "payroll.xlsx"
+
+
+def test_bulk_updates_and_deletes_invalidate(db):
+    _honeyfile(db, "cache-bulk")
+    assert HoneyfileService.get_honeyfile(db, "cache-bulk") is not None
+
+    db.query(Honeyfile).filter(Honeyfile.decoy_id == "cache-bulk").update({"file_name": "bulk.xlsx"})
+    db.commit()
+    assert HoneyfileService.get_honeyfile(db, "cache-bulk")["file_name"] == "bulk.xlsx"
+
+    db.execute(update(Honeyfile).where(Honeyfile.decoy_id == "cache-bulk").values(file_name="core.xlsx"))
+    db.commit()
+    assert HoneyfileService.get_honeyfile(db, "cache-bulk")["file_name"] == "core.xlsx"
+
+    db.query(Honeyfile).filter(Honeyfile.decoy_id == "cache-bulk").delete()
+    db.commit()
+    assert HoneyfileService.get_honeyfile(db, "cache-bulk") is None
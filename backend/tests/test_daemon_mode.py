@@ -0,0 +1,63 @@
+import asyncio
+import threading
+import time
+
+import httpx
+
+from app.db.database import SessionLocal
+from app.main import app, migrate_share_data
+from app.models.file_sharing import FileShare, ShareUserMember
+from app.services.business import MonitoringService
+
+
+def test_concurrent_startups_migrate_memberships_once(db):
+    db.add(FileShare(share_name="finance", share_path="/srv/finance", shared_with_users="alice,bob"))
+    db.commit()
+    errors = []
+
+    def start_worker():
+        session = SessionLocal()
+        try:
+            migrate_share_data(session)
+        except Exception as e:
+            errors.append(e)
+        finally:
+            session.close()
+
+    workers = [threading.Thread(target=start_worker) for _ in range(4)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+
+    assert errors == []
+    assert sorted(m.username for m in db.query(ShareUserMember)) == ["alice", "bob"]
+    assert db.query(FileShare).one().shared_with_users is None
+
+
+def test_blocking_monitor_calls_leave_the_event_loop_free(db, monkeypatch):
+    def slow_daemon_call():
+        time.sleep(0.3)
+        return {"status": "stopped"}
+
+    monkeypatch.setattr(MonitoringService, "stop_monitoring", staticmethod(slow_daemon_call))
+
+    async def scenario():
+        ticks = 0
+
+        async def ticker():
+            nonlocal ticks
+            while True:
+                await asyncio.sleep(0.01)
+                ticks += 1
+
+        task = asyncio.create_task(ticker())
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+            response = await client.post("/api/monitor/stop")
+        task.cancel()
+        return response, ticks
+
+    response, ticks = asyncio.run(scenario())
+
+    assert response.json() == {"status": "stopped"}
+    assert ticks >= 10
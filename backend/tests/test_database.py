@@ -0,0 +1,61 @@
+import threading
+
+from sqlalchemy import inspect, text
+
+from app.db.database import SessionLocal, begin_write, engine, init_db
+from app.models.database_models import AccessEvent
+
+
+def _event(decoy_id="d1"):
+    return AccessEvent(decoy_id=decoy_id, event_type="modified", accessed_path="/tmp/x.docx",
+                       username="u", hostname="h")
+
+
+def test_rollback_on_another_thread_keeps_uncommitted_writes(db):
+    writer = SessionLocal()
+    writer.add(_event())
+    writer.flush()
+
+    def roll_back_elsewhere():
+        other = SessionLocal()
+        try:
+            other.query(AccessEvent).count()
+            other.rollback()
+        finally:
+            other.close()
+
+    thread = threading.Thread(target=roll_back_elsewhere)
+    thread.start()
+    thread.join()
+    writer.commit()
+    writer.close()
+
+    assert db.query(AccessEvent).count() == 1
+
+
+def test_begin_write_then_read_and_update(db):
+    db.add(_event())
+    db.commit()
+
+    session = SessionLocal()
+    try:
+        begin_write(session)
+        assert session.query(AccessEvent).count() == 1
+        session.query(AccessEvent).update({"alert_sent": "sent"})
+        session.commit()
+    finally:
+        session.close()
+
+    db.expire_all()
+    assert [e.alert_sent for e in db.query(AccessEvent)] == ["sent"]
+
+
+def test_init_drops_the_share_id_index_the_composite_index_covers():
+    with engine.begin() as conn:
+        conn.execute(text("CREATE INDEX IF NOT EXISTS ix_share_access_logs_share_id ON share_access_logs (share_id)"))
+
+    init_db()
+
+    names = {index["name"] for index in inspect(engine).get_indexes("share_access_logs")}
+    assert "ix_share_access_logs_share_id" not in names
+    assert "ix_share_access_logs_share_time" in names
@@ -0,0 +1,74 @@
+import asyncio
+import io
+import random
+import time
+
+import httpx
+from openpyxl import load_workbook
+
+from app.honeyfiles.datasets import _random_hex, generate_rows, write_dataset_workbook
+from app.main import app
+from app.services.business import HoneyfileService
+
+
+def test_random_hex_has_requested_shape():
+    for length in (31, 32, 64):
+        values = _random_hex(random.Random(7), 50, length)
+        assert len(values) == 50
+        assert all(len(value) == length for value in values)
+        assert all(int(value, 16) >= 0 for value in values)
+
+
+def test_first_random_hex_of_a_batch_is_not_zero_padded():
+    leading_zeros = sum(_random_hex(random.Random(seed), 100, 64)[0].startswith("00") for seed in range(200))
+    assert leading_zeros < 10
+
+
+def test_rows_are_reproducible_from_the_seed():
+    def rows(seed):
+        return [row for batch in generate_rows("passwords", 25, seed=seed, batch_rows=10) for row in batch]
+
+    assert len(rows(3)) == 25
+    assert rows(3) == rows(3)
+    assert rows(3) != rows(4)
+
+
+def test_dataset_workbook_opens_with_every_row():
+    out = io.BytesIO()
+    write_dataset_workbook(out, "salaries", 1200, "a1b2c3d4e5f60718", seed=11)
+
+    sheet = load_workbook(io.BytesIO(out.getvalue()), read_only=True).worksheets[0]
+    rows = list(sheet.iter_rows(values_only=True))
+
+    assert len(rows) == 1201  # header + data rows
+    assert rows[1][0] == "E100000" and rows[-1][0] == "E101199"
+
+
+def test_large_dataset_requests_do_not_block_the_event_loop(monkeypatch):
+    def slow_create(*args, **kwargs):
+        time.sleep(0.3)
+        raise ValueError("generation failed")
+
+    monkeypatch.setattr(HoneyfileService, "create_honeyfile", staticmethod(slow_create))
+
+    async def scenario():
+        ticks = 0
+
+        async def ticker():
+            nonlocal ticks
+            while True:
+                await asyncio.sleep(0.01)
+                ticks += 1
+
+        task = asyncio.create_task(ticker())
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+            response = await client.post("/api/honeyfiles/create", json={
+                "file_name": "big.xlsx", "file_type": "xlsx", "template_type": "salaries", "row_count": 50000,
+            })
+        task.cancel()
+        return response, ticks
+
+    response, ticks = asyncio.run(scenario())
+
+    assert response.status_code == 400
+    assert ticks >= 10
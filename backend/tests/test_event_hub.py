@@ -0,0 +1,80 @@
+import asyncio
+
+import pytest
+
+from app.monitoring.hub import DISCONNECT, EventHub, SubscriptionClosed, build_envelope
+
+
+def _envelope(decoy_id="d1", event_type="opened"):
+    return build_envelope({"decoy_id": decoy_id, "event_type": event_type, "timestamp": "2024-05-01T12:00:00"})
+
+
+def test_events_reach_only_matching_subscribers():
+    async def scenario():
+        hub = EventHub()
+        everything = hub.subscribe()
+        one_decoy = hub.subscribe(decoy_ids=["d2"])
+        warnings = hub.subscribe(severities=["warning"])
+
+        hub.publish(_envelope("d1", "opened"))
+        hub.publish(_envelope("d2", "accessed"))
+
+        return everything.queue.qsize(), one_decoy.queue.qsize(), warnings.queue.qsize()
+
+    assert asyncio.run(scenario()) == (2, 1, 1)
+
+
+def test_each_event_is_serialized_once_for_all_subscribers():
+    async def scenario():
+        hub = EventHub()
+        first, second = hub.subscribe(), hub.subscribe()
+        hub.publish(_envelope())
+        return await first.get(), await second.get()
+
+    first, second = asyncio.run(scenario())
+
+    assert first is second
+
+
+def test_slow_subscribers_lose_their_oldest_events():
+    async def scenario():
+        hub = EventHub(queue_size=2)
+        slow = hub.subscribe()
+        for decoy_id in ["d1", "d2", "d3"]:
+            hub.publish(_envelope(decoy_id))
+        return [await slow.get(), await slow.get()], slow.dropped, hub.get_stats()
+
+    payloads, dropped, stats = asyncio.run(scenario())
+
+    assert '"d2"' in payloads[0] and '"d3"' in payloads[1]
+    assert dropped == 1
+    assert stats["dropped"] == 1
+
+
+def test_disconnect_policy_closes_a_full_subscription_without_blocking_others():
+    async def scenario():
+        hub = EventHub(queue_size=1, policy=DISCONNECT)
+        slow = hub.subscribe()
+        fast = hub.subscribe(queue_size=10)
+        hub.publish(_envelope("d1"))
+        hub.publish(_envelope("d2"))
+        with pytest.raises(SubscriptionClosed):
+            await slow.get()
+        return fast.queue.qsize(), hub.get_stats()
+
+    queued, stats = asyncio.run(scenario())
+
+    assert queued == 2
+    assert stats["disconnected"] == 1
+    assert stats["subscribers"] == 1
+
+
+def test_publish_threadsafe_delivers_on_the_hub_loop():
+    async def scenario():
+        hub = EventHub()
+        hub.attach_loop(asyncio.get_running_loop())
+        subscription = hub.subscribe()
+        await asyncio.to_thread(hub.publish_threadsafe, _envelope())
+        return await asyncio.wait_for(subscription.get(), timeout=2)
+
+    assert '"d1"' in asyncio.run(scenario())
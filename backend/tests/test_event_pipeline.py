@@ -0,0 +1,56 @@
+import asyncio
+
+from app.models.database_models import AccessEvent, AlertDelivery
+from app.monitoring.bridge import LoopBridge
+from app.services.business import EventService
+from app.services.outbox import AlertOutbox
+
+
+def _context(decoy_id, path="/tmp/x.docx"):
+    return {"decoy_id": decoy_id, "event_type": "modified", "accessed_path": path,
+            "username": "u", "hostname": "h"}
+
+
+def test_create_events_drops_only_rejected_rows(db):
+    events = [_context("d1"), _context("d2", path=None), _context("d3")]
+    related = lambda context: [AlertDelivery(alert_id=context["decoy_id"], channel="slack",
+                                             payload={}, event_ids=[])]
+
+    stored = EventService.create_events(db, events, related=related)
+
+    assert [e["decoy_id"] for e in stored] == ["d1", "d3"]
+    assert sorted(e.decoy_id for e in db.query(AccessEvent)) == ["d1", "d3"]
+    assert sorted(row.alert_id for row in db.query(AlertDelivery)) == ["d1", "d3"]
+
+
+def test_rows_for_only_covers_alerting_events():
+    alerts = {"a1": (["slack", "email"], {"decoy_id": "d1"}, ["e1"])}
+
+    rows = AlertOutbox.rows_for(alerts, {"alert_id": "a1"})
+
+    assert sorted(row.channel for row in rows) == ["email", "slack"]
+    assert AlertOutbox.rows_for(alerts, {"alert_sent": "aggregated"}) == []
+
+
+def test_bridge_stop_finishes_the_batch_in_flight():
+    async def scenario():
+        seen = []
+        started = asyncio.Event()
+
+        async def consumer(batch):
+            started.set()
+            await asyncio.sleep(0.05)
+            seen.append(list(batch))
+
+        bridge = LoopBridge(consumer, max_batch=2)
+        bridge.start(asyncio.get_running_loop())
+        for item in range(5):
+            bridge.submit(item)
+        await started.wait()
+        await bridge.stop()
+        return seen, bridge.get_stats()
+
+    seen, stats = asyncio.run(scenario())
+
+    assert [item for batch in seen for item in batch] == [0, 1, 2, 3, 4]
+    assert stats["delivered"] == 5 and stats["errors"] == 0
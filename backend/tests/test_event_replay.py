@@ -0,0 +1,87 @@
+import asyncio
+import json
+from datetime import datetime
+
+from app.api import routes
+from app.models.database_models import AccessEvent
+from app.monitoring.hub import EventHub, EventRingBuffer, build_envelope
+
+
+def _context(sequence, decoy_id="d1"):
+    return {"sequence": sequence, "decoy_id": decoy_id, "event_type": "opened", "timestamp": "2024-05-01T12:00:00"}
+
+
+def _hub(sequences, buffer_size=10):
+    hub = EventHub(buffer_size=buffer_size)
+    for sequence in sequences:
+        hub.set_sequence(sequence)
+        hub.publish(build_envelope(_context(sequence)))
+    return hub
+
+
+def _replayed(monkeypatch, hub, after, **filters):
+    monkeypatch.setattr(routes, "event_hub", hub)
+
+    async def scenario():
+        subscription = hub.subscribe(**filters)
+        return [(sequence, payload) async for sequence, payload in routes._replay_events(after, subscription)]
+
+    return asyncio.run(scenario())
+
+
+def test_ring_buffer_reports_gaps_it_cannot_fill():
+    buffer = EventRingBuffer(size=3)
+    for sequence in range(1, 6):
+        buffer.append(sequence, {}, str(sequence))
+
+    assert [entry[0] for entry in buffer.since(2)] == [3, 4, 5]
+    assert buffer.since(5) == []
+    assert buffer.since(1) is None
+
+
+def test_resume_within_the_buffer_skips_the_database(monkeypatch):
+    def load_events_after(*args):
+        raise AssertionError("database was read")
+
+    monkeypatch.setattr(routes, "_load_events_after", load_events_after)
+
+    replayed = _replayed(monkeypatch, _hub(range(1, 6)), after=3)
+
+    assert [sequence for sequence, _ in replayed] == [4, 5]
+
+
+def test_older_gaps_are_paged_from_the_database_then_the_buffer(db, monkeypatch):
+    for sequence in range(1, 7):
+        db.add(AccessEvent(decoy_id="d1", event_type="opened", timestamp=datetime.utcnow(),
+                           accessed_path="/srv/finance/payroll.xlsx", username="alice", hostname="ws-01",
+                           sequence=sequence, forensic_json=_context(sequence)))
+    db.commit()
+
+    replayed = _replayed(monkeypatch, _hub(range(1, 7), buffer_size=2), after=1)
+
+    assert [sequence for sequence, _ in replayed] == [2, 3, 4, 5, 6]
+    assert json.loads(replayed[0][1])["data"]["decoy_id"] == "d1"
+
+
+def test_replay_applies_the_subscription_filters(monkeypatch):
+    hub = EventHub()
+    for sequence, decoy_id in [(1, "d1"), (2, "d2"), (3, "d1")]:
+        hub.set_sequence(sequence)
+        hub.publish(build_envelope(_context(sequence, decoy_id)))
+
+    replayed = _replayed(monkeypatch, hub, after=0, decoy_ids=["d1"])
+
+    assert [sequence for sequence, _ in replayed] == [1, 3]
+
+
+def test_gaps_beyond_the_replay_limit_are_flagged(db, monkeypatch):
+    for sequence in range(1, 6):
+        db.add(AccessEvent(decoy_id="d1", event_type="opened", timestamp=datetime.utcnow(),
+                           accessed_path="/srv/finance/payroll.xlsx", username="alice", hostname="ws-01",
+                           sequence=sequence, forensic_json=_context(sequence)))
+    db.commit()
+    monkeypatch.setattr(routes, "SSE_REPLAY_LIMIT", 2)
+
+    replayed = _replayed(monkeypatch, _hub(range(1, 6), buffer_size=1), after=0)
+
+    assert [sequence for sequence, _ in replayed] == [1, 2, None]
@@ -0,0 +1,64 @@
+import asyncio
+import json
+from datetime import datetime
+
+import httpx
+
+from app.api import responses
+from app.main import app
+from app.models.database_models import AccessEvent, Honeyfile
+from app.models.schemas import AccessEventResponse, HoneyfileResponse
+
+
+def _get(path):
+    async def scenario():
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+            return await client.get(path)
+
+    response = asyncio.run(scenario())
+    assert response.status_code == 200
+    return response.json()
+
+
+def _as_schema(model, obj):
+    return json.loads(model.model_validate(obj, from_attributes=True).model_dump_json())
+
+
+def test_honeyfile_list_matches_the_response_model(db):
+    honeyfile = Honeyfile(decoy_id="fast-json", file_name="payroll.xlsx", file_type="xlsx",
+                          template_type="salaries", expected_hash="a" * 64,
+                          created_at=datetime(2024, 5, 1, 12, 0, 0, 123456),
+                          seed_locations=["/srv/finance"], file_path="/data/payroll.xlsx")
+    db.add(honeyfile)
+    db.commit()
+
+    rows = _get("/api/honeyfiles/list")
+
+    assert rows == [_as_schema(HoneyfileResponse, honeyfile)]
+
+
+def test_event_list_matches_the_response_model(db):
+    sent = AccessEvent(decoy_id="fast-json", event_type="opened", timestamp=datetime.utcnow(),
+                       accessed_path="/srv/finance/payroll.xlsx", username="alice", hostname="ws-01",
+                       alert_sent="sent")
+    failed = AccessEvent(decoy_id="fast-json", event_type="modified", timestamp=datetime.utcnow(),
+                         accessed_path="/srv/finance/payroll.xlsx", username="bob", hostname="ws-02",
+                         alert_sent="failed")
+    db.add_all([sent, failed])
+    db.commit()
+
+    rows = sorted(_get("/api/events/logs?decoy_id=fast-json"), key=lambda row: row["username"])
+
+    assert [row["alert_sent"] for row in rows] == [True, False]
+    for row, event in zip(rows, [sent, failed]):
+        fields = {name: getattr(event, name) for name in AccessEventResponse.model_fields}
+        expected = _as_schema(AccessEventResponse, {**fields, "alert_sent": event.alert_sent == "sent"})
+        assert row == expected
+
+
+def test_stdlib_fallback_encodes_the_same_document(monkeypatch):
+    rows = [{"id": "1", "created_at": datetime(2024, 5, 1, 12, 0, 0, 5), "tags": ["a"], "n": None}]
+    fast = json.loads(responses.dumps(rows))
+    monkeypatch.setattr(responses, "orjson", None)
+
+    assert json.loads(responses.dumps(rows)) == fast
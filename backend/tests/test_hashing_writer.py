@@ -0,0 +1,60 @@
+import hashlib
+import io
+import zipfile
+
+import pytest
+
+from app.honeyfiles.seeding import plant_copies
+from app.utils.crypto import HashingWriter, calculate_sha256
+
+
+def test_digest_matches_the_zip_written_through_it(tmp_path):
+    path = tmp_path / "decoy.docx"
+    with open(path, "wb") as raw:
+        sink = HashingWriter(raw)
+        with zipfile.ZipFile(sink, "w", zipfile.ZIP_DEFLATED) as archive:
+            archive.writestr("word/document.xml", "<w:document>payroll</w:document>" * 200)
+            archive.writestr("docProps/core.xml", "<cp:coreProperties/>")
+
+    assert sink.hexdigest() == calculate_sha256(str(path))
+    assert sink.bytes_written == path.stat().st_size
+    with zipfile.ZipFile(path) as archive:
+        assert archive.testzip() is None
+
+
+def test_openpyxl_workbooks_stream_through_it(tmp_path):
+    openpyxl = pytest.importorskip("openpyxl")
+    workbook = openpyxl.Workbook()
+    workbook.active.append(["name", "salary"])
+    workbook.active.append(["alice", 120000])
+    path = tmp_path / "salaries.xlsx"
+
+    with open(path, "wb") as raw:
+        sink = HashingWriter(raw)
+        workbook.save(sink)
+
+    assert sink.hexdigest() == calculate_sha256(str(path))
+    assert openpyxl.load_workbook(path).active["B2"].value == 120000
+
+
+def test_seeking_back_is_refused():
+    sink = HashingWriter(io.BytesIO())
+    sink.write(b"abc")
+
+    assert not sink.seekable()
+    with pytest.raises(io.UnsupportedOperation):
+        sink.seek(0)
+
+
+def test_planted_copies_carry_the_write_pass_hash(tmp_path):
+    data = b"decoy contents" * 1000
+    source = tmp_path / "salaries.xlsx"
+    source.write_bytes(data)
+    seeds = [tmp_path / "a", tmp_path / "b"]
+    for seed in seeds:
+        seed.mkdir()
+
+    result = plant_copies(str(source), [str(seed) for seed in seeds], hashlib.sha256(data).hexdigest())
+
+    assert len(result["planted"]) == 2
+    assert {calculate_sha256(path) for path in result["planted"]} == {hashlib.sha256(data).hexdigest()}
@@ -0,0 +1,65 @@
+import asyncio
+
+import httpx
+import pytest
+
+from app.main import app
+from app.utils.metrics import MetricsRegistry, describe_statement
+
+
+def test_histogram_buckets_are_cumulative():
+    registry = MetricsRegistry()
+    histogram = registry.histogram("latency_seconds", "Latency", ("route",), buckets=(0.1, 1.0))
+    for value in (0.05, 0.1, 0.5, 3.0):
+        histogram.labels("/a").observe(value)
+
+    lines = registry.render().splitlines()
+
+    assert 'latency_seconds_bucket{route="/a",le="0.1"} 2' in lines
+    assert 'latency_seconds_bucket{route="/a",le="1"} 3' in lines
+    assert 'latency_seconds_bucket{route="/a",le="+Inf"} 4' in lines
+    assert 'latency_seconds_count{route="/a"} 4' in lines
+    assert 'latency_seconds_sum{route="/a"} 3.65' in lines
+
+
+def test_failing_collectors_do_not_break_the_scrape():
+    registry = MetricsRegistry()
+    registry.counter("requests_total", "Requests").labels().inc()
+
+    def broken():
+        raise RuntimeError("boom")
+
+    registry.register_collector(broken)
+    registry.register_collector(lambda: [("queue_depth", "gauge", "Depth", [({"q": 'a"b'}, 3), ({}, None)])])
+
+    lines = registry.render().splitlines()
+
+    assert "requests_total 1" in lines
+    assert 'queue_depth{q="a\\"b"} 3' in lines
+    assert len([line for line in lines if line.startswith("queue_depth")]) == 1
+
+
+@pytest.mark.parametrize("statement, expected", [
+    ('SELECT honeyfiles.id FROM honeyfiles WHERE honeyfiles.decoy_id = ?', ("SELECT", "honeyfiles")),
+    ('INSERT OR IGNORE INTO "access_events" (id) VALUES (?)', ("INSERT", "access_events")),
+    ("UPDATE file_shares SET access_count=? WHERE id=?", ("UPDATE", "file_shares")),
+    ("DELETE FROM alert_deliveries", ("DELETE", "alert_deliveries")),
+    ("PRAGMA busy_timeout", ("OTHER", "")),
+])
+def test_statements_are_labelled_by_operation_and_table(statement, expected):
+    assert describe_statement(statement) == expected
+
+
+def test_requests_and_their_queries_are_labelled_by_route_template(db):
+    async def scenario():
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+            await client.get("/api/honeyfiles/metrics-missing")
+            return (await client.get("/metrics")).text
+
+    lines = asyncio.run(scenario()).splitlines()
+
+    assert any(line.startswith('decoydna_http_requests_total{method="GET",route="/api/honeyfiles/{decoy_id}",status="404"}')
+               for line in lines)
+    assert any(line.startswith('decoydna_db_queries_total{route="/api/honeyfiles/{decoy_id}",operation="SELECT"}')
+               for line in lines)
+    assert not any("metrics-missing" in line for line in lines)
@@ -0,0 +1,79 @@
+import asyncio
+import time
+
+import httpx
+import pytest
+
+from app.api import routes
+from app.main import app
+from app.utils.profiler import ProfilerService, RequestProfileMiddleware, is_admin
+
+
+def test_end_request_does_not_wait_for_the_sampler_thread():
+    service = ProfilerService()
+    sampler = service.begin_request(interval=0.5, max_seconds=30)
+    time.sleep(0.05)
+
+    started = time.perf_counter()
+    profile_id = service.end_request(sampler)
+    took = time.perf_counter() - started
+
+    assert took < 0.05
+    assert service.get(profile_id) is sampler
+    assert sampler.wait(timeout=2)
+    assert service.begin_request(interval=0.5, max_seconds=0.01) is not None
+
+
+def test_admin_requires_the_token_or_a_loopback_client():
+    assert is_admin("127.0.0.1", None, "")
+    assert not is_admin("10.0.0.5", None, "")
+    assert is_admin("10.0.0.5", "s3cret", "s3cret")
+    assert not is_admin("127.0.0.1", None, "s3cret")
+    assert not is_admin("127.0.0.1", "guess", "s3cret")
+
+
+@pytest.mark.parametrize("client, admin_token, headers, status", [
+    (("10.0.0.5", 4000), "", {}, 403),
+    (("127.0.0.1", 4000), "", {}, 404),
+    (("10.0.0.5", 4000), "s3cret", {"X-Admin-Token": "s3cret"}, 404),
+    (("127.0.0.1", 4000), "s3cret", {}, 403),
+])
+def test_admin_routes_need_the_token_or_loopback(monkeypatch, client, admin_token, headers, status):
+    monkeypatch.setattr(routes, "PROFILER_ENABLED", True)
+    monkeypatch.setattr(routes, "ADMIN_TOKEN", admin_token)
+
+    async def scenario():
+        transport = httpx.ASGITransport(app=app, client=client)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as http:
+            return await http.get("/api/admin/profile/unknown", headers=headers)
+
+    assert asyncio.run(scenario()).status_code == status
+
+
+def test_remote_clients_cannot_start_request_profiles():
+    service = ProfilerService()
+    calls = []
+
+    async def endpoint(scope, receive, send):
+        calls.append(service._session.locked())
+        await send({"type": "http.response.start", "status": 200, "headers": []})
+        await send({"type": "http.response.body", "body": b""})
+
+    middleware = RequestProfileMiddleware(endpoint, service, interval=0.01, max_seconds=5)
+
+    async def scenario(host):
+        sent = []
+
+        async def send(message):
+            sent.append(message)
+
+        scope = {"type": "http", "client": (host, 4000), "headers": [(b"x-profile", b"1")]}
+        await middleware(scope, None, send)
+        return dict(sent[0]["headers"])
+
+    remote = asyncio.run(scenario("10.0.0.5"))
+    local = asyncio.run(scenario("127.0.0.1"))
+
+    assert calls == [False, True]
+    assert b"x-profile-id" not in remote
+    assert b"x-profile-id" in local
@@ -0,0 +1,84 @@
+import asyncio
+import threading
+
+import httpx
+
+from app.api import routes
+from app.main import app
+from app.services.batch import BatchJob
+from app.utils.ratelimit import RateLimiter, TokenBucket, WriteGate
+
+
+def test_bucket_refills_at_rate():
+    bucket = TokenBucket(rate=2, burst=2)
+    now = bucket.updated
+
+    assert bucket.take(now) == 0
+    assert bucket.take(now) == 0
+    assert bucket.take(now) == 0.5
+    assert bucket.take(now + 0.5) == 0
+
+
+def test_cost_above_burst_is_admitted_once_and_paid_back():
+    bucket = TokenBucket(rate=2, burst=10)
+    now = bucket.updated
+
+    assert bucket.take(now, cost=30) == 0
+    assert bucket.tokens == -20
+    assert bucket.take(now, cost=1) == 10.5
+    assert bucket.take(now + 10.5, cost=1) == 0
+
+
+def test_limiter_charges_batches_per_item():
+    limiter = RateLimiter({"honeyfile_create": (2, 10)})
+
+    assert limiter.check("honeyfile_create", "10.0.0.1", cost=4) == 0
+    assert limiter.check("honeyfile_create", "10.0.0.1", cost=6) == 0
+    assert limiter.check("honeyfile_create", "10.0.0.1", cost=1) > 0
+    assert limiter.check("honeyfile_create", "10.0.0.2", cost=1) == 0
+
+
+def test_slot_waits_for_a_released_slot():
+    gate = WriteGate(limit=2, reserved=1)
+    assert gate.try_acquire()
+    entered = threading.Event()
+
+    def background():
+        with gate.slot():
+            entered.set()
+
+    worker = threading.Thread(target=background)
+    worker.start()
+    assert not entered.wait(0.1)
+
+    gate.release()
+    worker.join(timeout=2)
+
+    assert entered.is_set()
+    assert gate.in_flight == 0
+
+
+def test_batch_route_charges_one_token_per_item(monkeypatch):
+    monkeypatch.setattr(routes, "RATE_LIMIT_ENABLED", True)
+    monkeypatch.setattr(routes, "rate_limiter", RateLimiter({"honeyfile_create": (0.01, 10)}))
+
+    def submit(specs):
+        job = BatchJob(specs)
+        job.status = "completed"
+        job.done.set()
+        return job
+
+    monkeypatch.setattr(routes.batch_service, "submit", submit)
+    item = {"file_name": "q3.xlsx", "file_type": "xlsx", "template_type": "salaries"}
+
+    async def scenario():
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+            first = await client.post("/api/honeyfiles/batch", json={"items": [item] * 8})
+            second = await client.post("/api/honeyfiles/batch", json={"items": [item] * 3})
+            return first, second
+
+    first, second = asyncio.run(scenario())
+
+    assert first.status_code == 200
+    assert second.status_code == 429
+    assert "Retry-After" in second.headers
@@ -0,0 +1,120 @@
+import asyncio
+import hashlib
+import os
+
+import pytest
+
+from app.config.settings import SEED_STRATEGIES
+from app.honeyfiles.seeding import HARDLINK, plant_copies
+
+
+def _source(tmp_path, data=b"decoy contents"):
+    source = tmp_path / "src" / "salaries.xlsx"
+    source.parent.mkdir()
+    source.write_bytes(data)
+    return source
+
+
+def test_hardlinks_are_opt_in():
+    assert HARDLINK not in SEED_STRATEGIES
+
+
+def test_default_copies_do_not_share_the_source_inode(tmp_path):
+    source = _source(tmp_path)
+    seed = tmp_path / "seed"
+    seed.mkdir()
+
+    result = plant_copies(str(source), [str(seed)])
+
+    assert result["planted"] == [str(seed / "salaries.xlsx")]
+    assert result["methods"][HARDLINK] == 0
+    assert os.stat(result["planted"][0]).st_ino != os.stat(source).st_ino
+
+
+def test_existing_files_are_never_overwritten(tmp_path):
+    data = b"decoy contents"
+    source = _source(tmp_path, data)
+    seed = tmp_path / "seed"
+    seed.mkdir()
+    (seed / "salaries.xlsx").write_bytes(b"a real user file")
+    (seed / "salaries (1).xlsx").write_bytes(b"another real file")
+
+    result = plant_copies(str(source), [str(seed)], hashlib.sha256(data).hexdigest())
+
+    assert result["errors"] == []
+    assert result["planted"] == [str(seed / "salaries (2).xlsx")]
+    assert (seed / "salaries.xlsx").read_bytes() == b"a real user file"
+    assert (seed / "salaries (1).xlsx").read_bytes() == b"another real file"
+    assert (seed / "salaries (2).xlsx").read_bytes() == data
+
+
+def _seed_with_collision(tmp_path):
+    seed = tmp_path / "seed"
+    seed.mkdir()
+    (seed / "salaries.xlsx").write_bytes(b"a real user file")
+    return seed
+
+
+def test_restarted_monitoring_still_watches_renamed_copies(db, tmp_path, monkeypatch):
+    from app.services import business
+
+    seed = _seed_with_collision(tmp_path)
+    created = business.HoneyfileService.create_honeyfile(db, "salaries.xlsx", "xlsx", "salaries",
+                                                         [str(seed)], row_count=5)
+    renamed = str((seed / "salaries (1).xlsx").resolve())
+    assert created["planted_paths"] == [str(seed / "salaries (1).xlsx")]
+
+    # A fresh process only has the database to go on
+    engine = business.monitoring_engine
+    monkeypatch.setattr(engine, "honeyfile_registry", {})
+    monkeypatch.setattr(engine, "start", lambda directories=None: None)
+    monkeypatch.setitem(business._monitoring_status, "is_running", False)
+
+    result = asyncio.run(business.MonitoringService.start_monitoring(db))
+
+    assert result["status"] == "started"
+    assert engine.honeyfile_registry[renamed] == created["decoy_id"]
+    assert str((seed / "salaries.xlsx").resolve()) not in engine.honeyfile_registry
+
+
+def test_copies_are_removed_when_the_honeyfile_is_not_recorded(db, tmp_path, monkeypatch):
+    from app.services.business import HoneyfileService
+
+    seed = tmp_path / "seed"
+    seed.mkdir()
+
+    def failing_commit():
+        raise RuntimeError("database is locked")
+
+    monkeypatch.setattr(db, "commit", failing_commit)
+
+    with pytest.raises(RuntimeError):
+        HoneyfileService.create_honeyfile(db, "salaries.xlsx", "xlsx", "salaries", [str(seed)], row_count=5)
+
+    assert os.listdir(seed) == []
+
+
+def test_planting_errors_are_reported(db, tmp_path, monkeypatch):
+    from app.honeyfiles import seeding
+    from app.models.database_models import Honeyfile
+    from app.services.business import HoneyfileService
+
+    seed, blocked = tmp_path / "seed", tmp_path / "blocked"
+    seed.mkdir()
+    blocked.mkdir()
+    plant_one = seeding._plant_one
+
+    def refuse_blocked(source, destination, strategies):
+        if destination.startswith(str(blocked)):
+            raise PermissionError(13, "Permission denied", destination)
+        return plant_one(source, destination, strategies)
+
+    monkeypatch.setattr(seeding, "_plant_one", refuse_blocked)
+
+    created = HoneyfileService.create_honeyfile(db, "salaries.xlsx", "xlsx", "salaries",
+                                                [str(seed), str(blocked)], row_count=5)
+
+    assert created["planted_paths"] == [str(seed / "salaries.xlsx")]
+    assert [error["path"] for error in created["planting_errors"]] == [str(blocked / "salaries.xlsx")]
+    stored = db.query(Honeyfile).filter_by(decoy_id=created["decoy_id"]).one()
+    assert stored.metadata_json["planting_errors"] == created["planting_errors"]
@@ -0,0 +1,95 @@
+import threading
+from datetime import datetime, timedelta
+
+from app.db.database import SessionLocal
+from app.models.file_sharing import FileShare, ShareAccessLog
+from app.services.file_sharing import FileShareService, ShareAccessCounter
+
+
+class _LockedSession:
+    def execute(self, *args, **kwargs):
+        raise RuntimeError("database is locked")
+
+    def rollback(self):
+        pass
+
+    def close(self):
+        pass
+
+
+def _share(db):
+    share = FileShare(share_name="finance", share_path="/srv/finance", access_count=5)
+    db.add(share)
+    db.commit()
+    return share
+
+
+def test_concurrent_increments_are_folded_into_one_flush(db):
+    share = _share(db)
+    counter = ShareAccessCounter(session_factory=SessionLocal)
+    latest = datetime(2024, 5, 1, 12, 0)
+
+    def hammer(offset):
+        for i in range(100):
+            counter.increment(share.id, latest - timedelta(seconds=offset + i))
+
+    threads = [threading.Thread(target=hammer, args=(n,)) for n in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert counter.pending(share.id) == (400, latest)
+    assert counter.flush() == 1
+
+    db.refresh(share)
+    assert share.access_count == 405
+    assert share.last_accessed == latest
+    assert counter.pending(share.id) == (0, None)
+
+
+def test_flush_never_moves_last_accessed_backwards(db):
+    share = _share(db)
+    newer = datetime(2024, 5, 2)
+    share.last_accessed = newer
+    db.commit()
+    counter = ShareAccessCounter(session_factory=SessionLocal)
+
+    counter.increment(share.id, datetime(2024, 5, 1))
+    counter.flush()
+
+    db.refresh(share)
+    assert share.access_count == 6
+    assert share.last_accessed == newer
+
+
+def test_failed_flush_keeps_the_increments(db):
+    share = _share(db)
+
+    counter = ShareAccessCounter(session_factory=_LockedSession)
+    counter.increment(share.id, datetime(2024, 5, 1), count=3)
+
+    assert counter.flush() == 0
+    assert counter.pending(share.id) == (3, datetime(2024, 5, 1))
+
+
+def test_reconcile_recovers_increments_lost_before_a_flush(db):
+    share = _share(db)
+    accessed_at = datetime(2024, 5, 1, 9, 30)
+    for _ in range(8):
+        db.add(ShareAccessLog(share_id=share.id, username="alice", hostname="ws-01", ip_address="10.0.0.7",
+                              access_type="read", accessed_at=accessed_at))
+    db.commit()
+
+    ShareAccessCounter(session_factory=SessionLocal).reconcile(db)
+
+    db.refresh(share)
+    assert share.access_count == 8
+    assert share.last_accessed == accessed_at
+
+
+def test_unflushed_accesses_show_in_the_share(db):
+    share = _share(db)
+    FileShareService.log_access(db, share.id, "alice", "ws-01", "10.0.0.7", "read")
+
+    assert FileShareService.get_share(db, share.id)["access_count"] == 6
@@ -0,0 +1,56 @@
+from app.models.file_sharing import FileShare, ShareUserMember
+from app.services.file_sharing import FileShareService
+
+
+def test_membership_is_normalized_on_create(db):
+    share = FileShareService.create_share(db, "finance", "/srv/finance",
+                                          shared_with_users=["alice", " bob ", "alice", ""],
+                                          shared_with_groups=["accounting"])
+
+    assert share["shared_with_users"] == ["alice", "bob"]
+    assert share["shared_with_groups"] == ["accounting"]
+
+
+def test_reverse_lookup_by_user_and_group(db):
+    finance = FileShareService.create_share(db, "finance", "/srv/finance", shared_with_users=["alice"])
+    hr = FileShareService.create_share(db, "hr", "/srv/hr", is_sensitive=False, shared_with_groups=["people"])
+    FileShareService.create_share(db, "eng", "/srv/eng", shared_with_users=["bob"])
+    FileShareService.delete_share(db, finance["id"])
+    legal = FileShareService.create_share(db, "legal", "/srv/legal", shared_with_users=["alice"])
+
+    direct = FileShareService.find_shares_for_user(db, "alice")
+    with_groups = FileShareService.find_shares_for_user(db, "alice", groups=["people"])
+    sensitive = FileShareService.find_shares_for_user(db, "alice", groups=["people"], sensitive_only=True)
+
+    assert [s["id"] for s in direct] == [legal["id"]]
+    assert [s["id"] for s in with_groups] == [hr["id"], legal["id"]]
+    assert [s["id"] for s in sensitive] == [legal["id"]]
+    assert [s["id"] for s in FileShareService.find_shares_for_group(db, "people")] == [hr["id"]]
+
+
+def test_update_keeps_rows_for_members_that_stay(db):
+    share = FileShareService.create_share(db, "finance", "/srv/finance", shared_with_users=["alice", "bob"])
+    alice_row = db.query(ShareUserMember).filter_by(share_id=share["id"], username="alice").one().id
+
+    updated = FileShareService.update_share(db, share["id"], shared_with_users=["alice", "carol"])
+
+    assert updated["shared_with_users"] == ["alice", "carol"]
+    assert db.query(ShareUserMember).filter_by(share_id=share["id"], username="alice").one().id == alice_row
+    assert db.query(ShareUserMember).filter_by(share_id=share["id"], username="bob").count() == 0
+
+
+def test_legacy_strings_merge_into_existing_members(db):
+    share = FileShare(share_name="finance", share_path="/srv/finance", shared_with_users="bob,alice, ,bob",
+                      shared_with_groups="accounting")
+    share.user_members = [ShareUserMember(username="alice")]
+    db.add(share)
+    db.commit()
+
+    assert FileShareService.migrate_legacy_memberships(db) == 1
+    assert FileShareService.migrate_legacy_memberships(db) == 0
+
+    migrated = FileShareService.get_share(db, share.id)
+    assert migrated["shared_with_users"] == ["alice", "bob"]
+    assert migrated["shared_with_groups"] == ["accounting"]
+    db.refresh(share)
+    assert share.shared_with_users is None and share.shared_with_groups is None
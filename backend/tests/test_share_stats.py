@@ -0,0 +1,44 @@
+from datetime import datetime, timedelta
+
+from app.models.file_sharing import ShareAccessLog
+from app.services.file_sharing import FileShareService
+
+
+def _log(db, share_id, username, access_type, accessed_at):
+    db.add(ShareAccessLog(share_id=share_id, username=username, hostname="ws-01", ip_address="10.0.0.7",
+                          access_type=access_type, accessed_at=accessed_at))
+
+
+def test_stats_combine_rollups_with_the_partial_first_day(db):
+    share = FileShareService.create_share(db, "finance", "/srv/finance")
+    now = datetime.utcnow()
+    _log(db, share["id"], "alice", "read", now - timedelta(days=9))      # outside the window
+    _log(db, share["id"], "bob", "read", now - timedelta(days=7, minutes=-5))  # partial first day
+    _log(db, share["id"], "carol", "write", now - timedelta(days=3))
+    _log(db, share["id"], "carol", "write", now - timedelta(hours=1))
+    _log(db, share["id"], "bob", "read", now - timedelta(minutes=1))
+    db.commit()
+    FileShareService.rebuild_share_rollups(db)
+
+    stats = FileShareService.get_share_stats(db, share["id"], days=7)
+
+    assert stats["recent_accesses"] == 4
+    assert stats["access_types"] == {"read": 2, "write": 2}
+    assert stats["unique_users"] == 2
+
+
+def test_logged_accesses_update_the_rollups_incrementally(db):
+    share = FileShareService.create_share(db, "hr", "/srv/hr")
+    for username, access_type in [("alice", "read"), ("alice", "read"), ("bob", "delete")]:
+        FileShareService.log_access(db, share["id"], username, "ws-01", "10.0.0.7", access_type)
+
+    incremental = FileShareService.get_share_stats(db, share["id"], days=7)
+    FileShareService.rebuild_share_rollups(db)
+    rebuilt = FileShareService.get_share_stats(db, share["id"], days=7)
+
+    assert incremental["access_types"] == rebuilt["access_types"] == {"read": 2, "delete": 1}
+    assert incremental["unique_users"] == rebuilt["unique_users"] == 2
+
+
+def test_stats_for_an_unknown_share_are_empty(db):
+    assert FileShareService.get_share_stats(db, "missing") == {}
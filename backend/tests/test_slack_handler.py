@@ -0,0 +1,49 @@
+import asyncio
+import threading
+
+import pytest
+
+pytest.importorskip("aiohttp")
+
+from app.alerts.handlers import SlackAlertHandler
+
+
+def test_session_from_a_finished_loop_is_closed_before_reuse():
+    handler = SlackAlertHandler("http://127.0.0.1:9/hook")
+    asyncio.run(handler.start())
+    old = handler._session
+
+    async def reopen():
+        return handler._get_session()
+
+    new = asyncio.run(reopen())
+
+    assert new is not old
+    assert old.closed
+    assert old.connector is None
+    asyncio.run(handler.close())
+    assert new.closed
+
+
+def test_sends_from_a_foreign_loop_are_refused_and_close_runs_on_the_owner():
+    handler = SlackAlertHandler("http://127.0.0.1:9/hook")
+    owner = asyncio.new_event_loop()
+    thread = threading.Thread(target=owner.run_forever, daemon=True)
+    thread.start()
+    try:
+        asyncio.run_coroutine_threadsafe(handler.start(), owner).result(timeout=5)
+        session = handler._session
+
+        sent = asyncio.run(handler.send({"decoy_id": "d1", "event_type": "opened"}))
+
+        assert sent is False
+        assert handler._session is session and not session.closed
+
+        asyncio.run(handler.close())
+
+        assert session.closed
+        assert handler._session is None
+    finally:
+        owner.call_soon_threadsafe(owner.stop)
+        thread.join(timeout=5)
+        owner.close()
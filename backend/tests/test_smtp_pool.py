@@ -0,0 +1,118 @@
+import smtplib
+
+import pytest
+
+from app.alerts.smtp import SMTPPool
+
+
+class FakeSMTP:
+    """Stand-in for smtplib.SMTP that records what the pool does with it"""
+
+    opened = []
+
+    def __init__(self, host, port, timeout=None):
+        self.sent = []
+        self.fail_with = None
+        self.noop_code = 250
+        self.quit_called = False
+        FakeSMTP.opened.append(self)
+
+    def ehlo(self):
+        pass
+
+    def starttls(self):
+        pass
+
+    def login(self, user, password):
+        pass
+
+    def noop(self):
+        return (self.noop_code, b"OK")
+
+    def sendmail(self, from_address, to_addresses, message):
+        if self.fail_with is not None:
+            raise self.fail_with
+        self.sent.append(message)
+
+    def quit(self):
+        self.quit_called = True
+
+    def close(self):
+        pass
+
+
+@pytest.fixture
+def pool():
+    FakeSMTP.opened = []
+    return SMTPPool("smtp.test", 587, "user", "secret", factory=FakeSMTP)
+
+
+def test_connections_are_reused(pool):
+    pool.send("from@x", ["to@x"], "one")
+    pool.send("from@x", ["to@x"], "two")
+
+    assert len(FakeSMTP.opened) == 1
+    assert FakeSMTP.opened[0].sent == ["one", "two"]
+    assert pool.get_stats()["reuses"] == 1
+
+
+def test_a_dropped_reused_connection_is_replaced_once(pool):
+    pool.send("from@x", ["to@x"], "one")
+    FakeSMTP.opened[0].fail_with = smtplib.SMTPServerDisconnected("gone")
+
+    pool.send("from@x", ["to@x"], "two")
+
+    assert len(FakeSMTP.opened) == 2
+    assert FakeSMTP.opened[1].sent == ["two"]
+    assert pool.get_stats()["failures"] == 0
+
+
+def test_socket_errors_on_a_reused_connection_are_retried(pool):
+    pool.send("from@x", ["to@x"], "one")
+    FakeSMTP.opened[0].fail_with = ConnectionResetError("reset by peer")
+
+    pool.send("from@x", ["to@x"], "two")
+
+    assert FakeSMTP.opened[1].sent == ["two"]
+
+
+def test_rejections_are_not_retried(pool):
+    pool.send("from@x", ["to@x"], "one")
+    FakeSMTP.opened[0].fail_with = smtplib.SMTPRecipientsRefused({"to@x": (550, b"no such user")})
+
+    with pytest.raises(smtplib.SMTPRecipientsRefused):
+        pool.send("from@x", ["to@x"], "two")
+
+    assert len(FakeSMTP.opened) == 1
+    assert pool.get_stats()["failures"] == 1
+
+
+def test_stale_connections_are_checked_or_discarded(pool):
+    pool.send("from@x", ["to@x"], "one")
+    first = FakeSMTP.opened[0]
+    first.noop_code = 421
+    pool._idle = [(first, pool._idle[0][1] - pool.check_after - 1)]
+
+    pool.send("from@x", ["to@x"], "two")
+
+    assert first.quit_called
+    assert pool.get_stats()["health_check_failures"] == 1
+
+    second = FakeSMTP.opened[1]
+    pool._idle = [(second, pool._idle[0][1] - pool.idle_timeout - 1)]
+    pool.send("from@x", ["to@x"], "three")
+
+    assert second.quit_called
+    assert len(FakeSMTP.opened) == 3
+
+
+def test_close_quits_idle_connections_and_those_returned_later(pool):
+    pool.send("from@x", ["to@x"], "one")
+    in_use = FakeSMTP("smtp.test", 587)
+
+    pool.close()
+    pool._release(in_use)
+
+    assert FakeSMTP.opened[0].quit_called
+    assert in_use.quit_called
+    assert pool.get_stats()["idle"] == 0
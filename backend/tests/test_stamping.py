@@ -0,0 +1,145 @@
+import asyncio
+import os
+from datetime import datetime
+
+import httpx
+import pytest
+from docx import Document
+from openpyxl import Workbook, load_workbook
+from PyPDF2 import PdfReader
+from reportlab.pdfgen import canvas
+
+from app.honeyfiles.datasets import generate_dataset_honeyfile
+from app.honeyfiles.stamping import StampingHoneyfileGenerator
+from app.main import app
+from app.services import business
+from app.utils.crypto import calculate_sha256, generate_decoy_id, generate_zero_width_watermark
+
+
+class DocumentGenerator:
+    """Renders small documents carrying the decoy ID and watermark the way decoys do"""
+
+    def __init__(self, output_dir):
+        self.output_dir = output_dir
+
+    def generate_honeyfile(self, file_name, file_type, template_type):
+        decoy_id = generate_decoy_id("tests")
+        watermark = generate_zero_width_watermark(decoy_id)
+        path = os.path.join(self.output_dir, file_name)
+        if file_type == "docx":
+            document = Document()
+            document.core_properties.keywords = decoy_id
+            document.add_heading(f"{template_type} report", 0)
+            for line in range(20):
+                document.add_paragraph(f"Confidential {template_type} line {line}")
+            document.add_paragraph(watermark + "Internal use only")
+            document.save(path)
+        elif file_type == "xlsx":
+            workbook = Workbook()
+            sheet = workbook.active
+            sheet.append(["Name", "Value", "Tag"])
+            for row in range(50):
+                sheet.append([f"user{row}", row * 1000, decoy_id])
+            workbook.properties.keywords = decoy_id
+            workbook.save(path)
+        else:
+            document = canvas.Canvas(path)
+            document.setKeywords(decoy_id)
+            for line in range(20):
+                document.drawString(72, 800 - line * 18, f"Confidential {template_type} line {line}")
+            document.drawString(72, 40, decoy_id)
+            document.save()
+        return {"decoy_id": decoy_id, "file_path": path, "expected_hash": calculate_sha256(path),
+                "watermark_techniques": ["metadata", "zero_width"], "created_at": datetime.utcnow().isoformat()}
+
+
+class DatasetGenerator:
+    """The dataset generator with fixed rows, so only its watermarks differ per decoy"""
+
+    def generate_honeyfile(self, file_name, file_type, template_type):
+        return generate_dataset_honeyfile(file_name, template_type, 20, seed=7)
+
+
+def _watermarks(file_path, file_type):
+    """(metadata decoy ID, body text) of a generated document"""
+    if file_type == "docx":
+        document = Document(file_path)
+        return document.core_properties.keywords, "\n".join(p.text for p in document.paragraphs)
+    if file_type == "xlsx":
+        workbook = load_workbook(file_path)
+        return workbook.properties.keywords, "\n".join(str(c.value) for row in workbook.active for c in row)
+    reader = PdfReader(file_path)
+    return reader.metadata.get("/Keywords"), reader.pages[0].extract_text()
+
+
+@pytest.mark.parametrize("file_type", ["docx", "xlsx", "pdf"])
+def test_stamped_documents_open_and_carry_the_new_decoy(tmp_path, file_type):
+    generator = StampingHoneyfileGenerator(DocumentGenerator(str(tmp_path)))
+
+    first = generator.generate_honeyfile(f"first.{file_type}", file_type, "salaries")
+    second = generator.generate_honeyfile(f"second.{file_type}", file_type, "salaries")
+
+    assert generator.get_stats()["skeletons"] == {f"{file_type}/salaries": True}
+    assert generator.stamped == 2
+    assert first["decoy_id"] != second["decoy_id"]
+    for result in (first, second):
+        assert calculate_sha256(result["file_path"]) == result["expected_hash"]
+        keywords, text = _watermarks(result["file_path"], file_type)
+        assert keywords == result["decoy_id"]
+        if file_type == "docx":
+            assert generate_zero_width_watermark(result["decoy_id"]) in text
+        else:
+            assert result["decoy_id"] in text
+    _, first_text = _watermarks(first["file_path"], file_type)
+    assert second["decoy_id"] not in first_text
+
+
+def _content(result, file_type):
+    """Document metadata and text with this decoy's ID and watermark blanked out"""
+    decoy_id = result["decoy_id"]
+    watermark = generate_zero_width_watermark(decoy_id)
+    return tuple(str(part).replace(watermark, "<watermark>").replace(decoy_id, "<decoy>")
+                 for part in _watermarks(result["file_path"], file_type))
+
+
+@pytest.mark.parametrize("file_type", ["docx", "xlsx", "pdf"])
+def test_stamped_documents_match_direct_generation(tmp_path, file_type):
+    direct_generator = DocumentGenerator(str(tmp_path))
+    generator = StampingHoneyfileGenerator(direct_generator)
+
+    stamped = generator.generate_honeyfile(f"stamped.{file_type}", file_type, "salaries")
+    direct = direct_generator.generate_honeyfile(f"direct.{file_type}", file_type, "salaries")
+
+    assert generator.stamped == 1
+    assert _content(stamped, file_type) == _content(direct, file_type)
+
+
+def test_watermarks_the_stamper_cannot_find_fall_back_to_full_generation():
+    # The dataset writes its zero-width watermark as XML character references
+    generator = StampingHoneyfileGenerator(DatasetGenerator())
+
+    results = [generator.generate_honeyfile(f"dataset-{i}.xlsx", "xlsx", "salaries") for i in range(2)]
+    direct = DatasetGenerator().generate_honeyfile("dataset-direct.xlsx", "xlsx", "salaries")
+
+    try:
+        assert generator.get_stats()["skeletons"] == {"xlsx/salaries": False}
+        assert generator.stamped == 0
+        assert results[0]["decoy_id"] != results[1]["decoy_id"]
+        for result in results:
+            assert calculate_sha256(result["file_path"]) == result["expected_hash"]
+            assert _content(result, "xlsx") == _content(direct, "xlsx")
+    finally:
+        for result in (*results, direct):
+            os.remove(result["file_path"])
+
+
+def test_cache_stats_do_not_build_the_generator():
+    async def scenario():
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+            return await client.get("/api/cache/stats")
+
+    response = asyncio.run(scenario())
+
+    assert response.status_code == 200
+    assert response.json()["skeletons"] is None
+    assert "honeyfile_generator" not in vars(business)
@@ -0,0 +1,76 @@
+from app.models.database_models import AccessEvent
+from app.monitoring.hub import build_envelope
+from app.monitoring.tracing import LatencyTracker, stage_durations, stamp
+from app.services.business import EventService
+
+MS = 1_000_000
+
+
+def _context(sequence, **trace_ms):
+    return {"sequence": sequence, "decoy_id": "d1", "event_type": "opened",
+            "trace": {stage: at * MS for stage, at in trace_ms.items()}}
+
+
+def test_durations_skip_missing_stages_and_measure_alerts_from_the_broadcast():
+    trace = {"received": 0, "enqueued": 3 * MS, "persisted": 10 * MS, "broadcast": 11 * MS,
+             "alert_slack": 40 * MS, "alert_email": 25 * MS}
+
+    assert stage_durations(trace) == {
+        "enqueued": 3 * MS,
+        "persisted": 7 * MS,
+        "broadcast": 1 * MS,
+        "alert_slack": 29 * MS,
+        "alert_email": 14 * MS,
+        "total": 40 * MS,
+    }
+
+
+def test_stamp_keeps_an_explicit_time():
+    context = {}
+    stamp(context, "received", at=5)
+    stamp(context, "collected")
+
+    assert context["trace"]["received"] == 5
+    assert context["trace"]["collected"] > 5
+
+
+def test_stats_report_per_stage_percentiles_in_milliseconds():
+    tracker = LatencyTracker()
+    for sequence in range(1, 101):
+        tracker.record(_context(sequence, received=0, persisted=sequence))
+    tracker.record({"sequence": 101})
+
+    stats = tracker.get_stats()
+
+    assert stats["events_traced"] == 100
+    assert list(stats["stages"]) == ["persisted", "total"]
+    assert stats["stages"]["persisted"] == {"count": 100, "p50_ms": 51.0, "p95_ms": 96.0,
+                                            "p99_ms": 100.0, "max_ms": 100.0}
+
+
+def test_chrome_trace_lists_the_slowest_events_first():
+    tracker = LatencyTracker()
+    tracker.record(_context(1, received=0, persisted=5))
+    tracker.record(_context(2, received=0, persisted=50, alert_slack=80))
+    tracker.record(_context(3, received=0, persisted=20))
+
+    trace = tracker.chrome_trace(min_total_ms=10, limit=5)
+
+    rows = [event["tid"] for event in trace["traceEvents"] if event["ph"] == "M"]
+    slices = {(event["tid"], event["name"]): event for event in trace["traceEvents"] if event["ph"] == "X"}
+    assert rows == [2, 3]
+    assert slices[(2, "alert_slack")]["cat"] == "alert"
+    assert slices[(2, "alert_slack")]["ts"] == 50_000
+    assert slices[(2, "alert_slack")]["dur"] == 30_000
+
+
+def test_trace_stays_off_stored_and_broadcast_events(db):
+    context = dict(_context(1, received=0), accessed_path="/x/a.docx", username="u", hostname="h")
+
+    EventService.create_events(db, [context])
+    envelope = build_envelope(context)
+    stamp(context, "broadcast")
+
+    assert "trace" not in db.query(AccessEvent).one().forensic_json
+    assert "trace" not in envelope["data"]
+    assert set(context["trace"]) == {"received", "broadcast"}
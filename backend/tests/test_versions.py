@@ -0,0 +1,85 @@
+import time
+from email.utils import formatdate
+
+from app.db.versions import TableVersions
+
+
+def test_etag_changes_with_each_write():
+    versions = TableVersions()
+    before = versions.validators(["honeyfiles"])
+
+    assert before.is_fresh({"if-none-match": before.etag})
+    versions.bump("honeyfiles")
+    after = versions.validators(["honeyfiles"])
+
+    assert after.etag != before.etag
+    assert not after.is_fresh({"if-none-match": before.etag})
+    assert after.is_fresh({"if-none-match": f'"other", {after.etag.removeprefix("W/")}'})
+    assert after.is_fresh({"if-none-match": "*"})
+
+
+def test_writes_in_the_same_second_are_never_served_as_not_modified():
+    versions = TableVersions()
+    cached = versions.validators(["access_events"])
+    versions.bump("access_events")
+    current = versions.validators(["access_events"])
+
+    # A client that only kept Last-Modified cannot tell the two apart at one-second resolution
+    assert not current.is_fresh({"if-modified-since": formatdate(time.time() + 60, usegmt=True)})
+    assert not current.is_fresh({"if-none-match": cached.etag,
+                                 "if-modified-since": cached.headers["Last-Modified"]})
+
+
+def test_time_bucket_counts_toward_last_modified():
+    versions = TableVersions()
+    bucket_start = time.time() + 3600
+
+    validators = versions.validators(["honeyfiles"], 42, changed_at=bucket_start)
+
+    assert validators.last_modified == bucket_start
+    assert validators.etag.endswith('-42"')
+
+
+def test_versions_move_at_commit_so_a_read_before_it_is_not_cached_as_current(db):
+    from app.db.database import SessionLocal, table_versions
+    from app.models.database_models import Honeyfile
+    from app.services.business import DASHBOARD_TABLES, DashboardService
+
+    window = DashboardService.cache_window()
+    DashboardService.get_dashboard_stats(db, window)
+    before = table_versions.validators(DASHBOARD_TABLES)
+
+    writer = SessionLocal()
+    try:
+        writer.add(Honeyfile(decoy_id="versions-race", file_name="q3.xlsx", file_type="xlsx",
+                             template_type="salaries", expected_hash="0" * 64))
+        writer.flush()
+
+        # A reader between the flush and the commit sees the old rows under the old version
+        assert table_versions.validators(DASHBOARD_TABLES).etag == before.etag
+        assert DashboardService.get_dashboard_stats(db, window)["total_honeyfiles"] == 0
+        db.rollback()
+
+        writer.commit()
+    finally:
+        writer.close()
+
+    assert table_versions.validators(DASHBOARD_TABLES).etag != before.etag
+    assert DashboardService.get_dashboard_stats(db, window)["total_honeyfiles"] == 1
+
+
+def test_rolled_back_writes_still_move_the_version(db):
+    from app.db.database import SessionLocal, table_versions
+    from app.models.database_models import Honeyfile
+
+    before = table_versions.validators(["honeyfiles"]).etag
+    writer = SessionLocal()
+    try:
+        writer.add(Honeyfile(decoy_id="versions-rollback", file_name="q3.xlsx", file_type="xlsx",
+                             template_type="salaries", expected_hash="0" * 64))
+        writer.flush()
+        writer.rollback()
+    finally:
+        writer.close()
+
+    assert table_versions.validators(["honeyfiles"]).etag != before